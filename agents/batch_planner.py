@@ -0,0 +1,165 @@
+# batch_planner.py - PLAN MANY TRIPS CONCURRENTLY, STREAMING RESULTS
+import asyncio
+import json
+import os
+from dotenv import load_dotenv
+from agents.lru_cache import LRUCache
+from agents.logs import get_logger
+
+load_dotenv()
+log = get_logger(__name__)
+
+# Plans in flight at once, and how many distinct interest sets keep their ranking
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+BATCH_RANKING_CACHE_SIZE = int(os.getenv("BATCH_RANKING_CACHE_SIZE", "1024"))
+# Rankings are computed this deep so trips of any length can share them (30 days = 7 cities)
+BATCH_RANKING_DEPTH = 8
+
+MAX_DAYS = 30
+
+
+class SharedRankings:
+    """
+    One destination ranking per distinct interest set across a batch.
+
+    The diverse selection for N cities is always a prefix of the selection
+    for more cities (the candidates, including the no-match fallback's, never
+    depend on N), so a single ranking BATCH_RANKING_DEPTH deep serves every
+    trip length. Concurrent requests for the same interests await
+    the same task.
+    """
+
+    def __init__(self, destination_agent, depth=BATCH_RANKING_DEPTH, max_entries=BATCH_RANKING_CACHE_SIZE):
+        self.destination_agent = destination_agent
+        self.depth = depth
+        self.rankings = LRUCache(max_entries=max_entries)  # interests -> (depth, task)
+        self.computed = 0
+        self.shared = 0
+
+    async def rank(self, interests, num_cities):
+        key = tuple(interests)
+        entry = self.rankings.get(key)
+        if entry is None or entry[0] < num_cities:
+            depth = max(self.depth, num_cities)
+            task = asyncio.ensure_future(self.destination_agent.rank_cities_with_db_async(interests, depth))
+            task.add_done_callback(lambda done: self._forget_failure(key, done))
+            self.rankings.set(key, (depth, task))
+            self.computed += 1
+        else:
+            task = entry[1]
+            self.shared += 1
+        return (await asyncio.shield(task))[:num_cities]
+
+    def _forget_failure(self, key, task):
+        if task.cancelled() or task.exception() is not None:
+            entry = self.rankings.get(key)
+            if entry is not None and entry[1] is task:
+                self.rankings.pop(key)
+
+
+class BatchPlanner:
+    """
+    Plans a stream of JSONL trip requests through one MasterAgent.
+
+    Each input line is {"user_input": ..., "days": ..., "id": optional}.
+    Up to `concurrency` plans run at once; results are yielded as soon as
+    each finishes, so memory doesn't grow with the batch. Requests share
+    rankings (SharedRankings), the plan cache, the interest-expansion
+    batcher and the LLM cache.
+    """
+
+    def __init__(self, master_agent, concurrency=BATCH_CONCURRENCY):
+        self.master_agent = master_agent
+        self.concurrency = max(1, concurrency)
+        self.rankings = SharedRankings(master_agent.destination_agent)
+
+    @staticmethod
+    def parse_request(line):
+        """The request object from one JSONL line; ValueError if it isn't one"""
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON: {e.msg}")
+        if not isinstance(data, dict):
+            raise ValueError("Each line must be a JSON object")
+        return data
+
+    @staticmethod
+    def validate_days(data):
+        """Trip length in days, validated like /plan-trip"""
+        try:
+            days = int(data.get("days", 3))
+        except (TypeError, ValueError):
+            raise ValueError("days must be a number")
+        if days < 1 or days > MAX_DAYS:
+            raise ValueError(f"Please choose between 1 and {MAX_DAYS} days.")
+        return days
+
+    async def _plan_line(self, line_number, line):
+        result = {"line": line_number}
+        try:
+            data = self.parse_request(line)
+            if data.get("id") is not None:
+                result["id"] = data["id"]
+            days = self.validate_days(data)
+        except ValueError as e:
+            result["error"] = str(e)
+            return result
+        user_input = str(data.get("user_input", "") or "")
+
+        try:
+            itinerary, matched_interests, activity_interest_map = await self.master_agent.generate_itinerary_async(
+                user_input=user_input, days=days, rankings=self.rankings
+            )
+        except Exception:
+            log.exception("[ERROR] Batch line failed", line=line_number)
+            result["error"] = "Error planning trip."
+            return result
+
+        result.update({
+            "itinerary": itinerary,
+            "matched_interests": matched_interests,
+            "activity_interest_map": activity_interest_map
+        })
+        return result
+
+    async def plan(self, lines):
+        """Yield one result dict per non-blank line, in completion order"""
+        pending = set()
+        try:
+            async for line_number, line in _numbered(lines):
+                pending.add(asyncio.ensure_future(self._plan_line(line_number, line)))
+                if len(pending) >= self.concurrency:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        yield task.result()
+
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        finally:
+            # Consumer went away (client disconnect) - don't leave plans running
+            for task in pending:
+                task.cancel()
+
+    def stats(self):
+        return {
+            "rankings_computed": self.rankings.computed,
+            "rankings_shared": self.rankings.shared
+        }
+
+
+async def _numbered(lines):
+    """(line number, text) for the non-blank lines of a sync or async iterable"""
+    line_number = 0
+    if hasattr(lines, '__aiter__'):
+        async for line in lines:
+            line_number += 1
+            if line.strip():
+                yield line_number, line
+    else:
+        for line in lines:
+            line_number += 1
+            if line.strip():
+                yield line_number, line
@@ -0,0 +1,123 @@
+# db_pool.py - READ-ONLY SQLITE CONNECTION POOL FOR THE CATALOG
+import os
+import sqlite3
+import threading
+import urllib.parse
+from contextlib import contextmanager
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CATALOG_DB_PATH = os.getenv("CATALOG_DB_PATH", "travel_data.db")
+# immutable=1 skips all locking - only safe when nothing rewrites the file while the app runs
+CATALOG_IMMUTABLE = os.getenv("CATALOG_IMMUTABLE", "false").lower() in ("1", "true", "yes")
+CATALOG_MMAP_SIZE = int(os.getenv("CATALOG_MMAP_SIZE", str(256 * 1024 * 1024)))  # bytes
+CATALOG_CACHED_STATEMENTS = int(os.getenv("CATALOG_CACHED_STATEMENTS", "256"))
+
+
+class ReadPool:
+    """
+    One read-only SQLite connection per thread.
+
+    Connections are opened lazily through a `mode=ro` (optionally
+    `immutable=1`) URI with memory-mapped I/O and a larger prepared-statement
+    cache, so worker threads read the catalog in parallel instead of queueing
+    on one shared cursor. The catalog itself is kept in WAL mode by
+    database/migrate_keywords.py, which lets setup scripts write while the app
+    reads.
+    """
+
+    def __init__(self, path=CATALOG_DB_PATH, immutable=CATALOG_IMMUTABLE,
+                 mmap_size=CATALOG_MMAP_SIZE, cached_statements=CATALOG_CACHED_STATEMENTS):
+        self.path = path
+        self.immutable = immutable
+        self.mmap_size = mmap_size
+        self.cached_statements = cached_statements
+        self.uri = self.make_uri(path, immutable)
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = {}  # thread ident -> connection
+
+        self.opened = 0
+        self.checkouts = 0
+        self.in_use = 0
+        self.peak_in_use = 0
+
+    @staticmethod
+    def make_uri(path, immutable=False):
+        """file: URI that opens the database read-only"""
+        uri = 'file:' + urllib.parse.quote(os.path.abspath(path)) + '?mode=ro'
+        if immutable:
+            uri += '&immutable=1'
+        return uri
+
+    def _connect(self):
+        if not os.path.exists(self.path):
+            raise sqlite3.OperationalError(f"unable to open database file: {self.path}")
+        conn = sqlite3.connect(
+            self.uri, uri=True, check_same_thread=False,
+            cached_statements=self.cached_statements
+        )
+        conn.execute(f'PRAGMA mmap_size={int(self.mmap_size)}')
+        conn.execute('PRAGMA query_only=1')
+        return conn
+
+    def connection(self):
+        """This thread's connection, opened on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            with self._lock:
+                self._prune_dead_threads()
+                self._connections[threading.get_ident()] = conn
+                self.opened += 1
+        return conn
+
+    def _prune_dead_threads(self):
+        # Connections of finished threads are closed when the next one opens
+        alive = {thread.ident for thread in threading.enumerate()}
+        for ident in [ident for ident in self._connections if ident not in alive]:
+            self._connections.pop(ident).close()
+
+    @contextmanager
+    def reading(self):
+        """Check out this thread's connection for the duration of a block"""
+        conn = self.connection()
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            if self.in_use > self.peak_in_use:
+                self.peak_in_use = self.in_use
+        try:
+            yield conn
+        finally:
+            with self._lock:
+                self.in_use -= 1
+
+    def execute(self, sql, params=()):
+        """Run one query and return all rows"""
+        with self.reading() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "connections": len(self._connections),
+                "opened": self.opened,
+                "checkouts": self.checkouts,
+                "in_use": self.in_use,
+                "peak_in_use": self.peak_in_use,
+                "immutable": self.immutable,
+                "mmap_size": self.mmap_size,
+                "cached_statements": self.cached_statements
+            }
+
+    def close(self):
+        """Close every connection (threads reopen on their next query)"""
+        with self._lock:
+            for conn in self._connections.values():
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
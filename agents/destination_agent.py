@@ -1,84 +1,193 @@
 # destination_agent.py - FINAL FIXED VERSION WITH DIVERSITY IMPROVEMENTS
-import sqlite3
+import asyncio
 import os
-from openai import OpenAI
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from agents.llm_client import create_client, create_async_client, LLM_BACKEND, LLM_TIMEOUT_ERRORS
+from agents.keyword_index import KeywordIndex
+from agents.scoring_engine import MatrixScoringEngine
+from agents.embeddings import EmbeddingIndex
+from agents.full_text import FullTextIndex
+from agents.db_pool import ReadPool
+from agents.diversity import interest_masks, select_covering
+from agents.metrics import timed_stage
+from agents.logs import get_logger, tracing
 
 load_dotenv()
+log = get_logger(__name__)
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
+# "index" (inverted keyword index) or "matrix" (NumPy city x keyword matrix)
+SCORING_ENGINE = os.getenv("SCORING_ENGINE", "index")
+
+# "fts" (FTS5 + BM25 over descriptions/activities) or "substring" (plain text scan)
+TEXT_SEARCH = os.getenv("TEXT_SEARCH", "fts")
+
+# "embedding" (local vector retrieval) or "llm" (gpt-4o-mini batch scoring)
+CITY_RETRIEVAL = os.getenv("CITY_RETRIEVAL", "embedding")
+
+# AI batch scoring: batches in flight at once, and seconds each batch may take
+AI_SCORING_CONCURRENCY = int(os.getenv("AI_SCORING_CONCURRENCY", "4"))
+AI_SCORING_TIMEOUT = float(os.getenv("AI_SCORING_TIMEOUT", "8"))
+
+# Cities the no-match fallback picks from - fixed (not num_cities), so the
+# ranking for N cities stays a prefix of the ranking for more
+FALLBACK_CANDIDATES = 10
+
 class DestinationAgent:
     """Agent responsible for ranking cities with SEMANTIC AI understanding"""
     
-    def __init__(self):
-        self.conn = sqlite3.connect('travel_data.db', check_same_thread=False)
-        self.cursor = self.conn.cursor()
-        
-        if not OPENAI_API_KEY:
+    def __init__(self, scoring_engine=None, client=None, async_client=None, db_pool=None, snapshot=None):
+        # Read-only connection per thread - concurrent plans query the catalog in parallel
+        self.db = db_pool or ReadPool()
+        
+        # Description/activity text matching through the FTS5 index when it exists
+        self.full_text = FullTextIndex.open(self.db) if TEXT_SEARCH == "fts" else None
+        if TEXT_SEARCH == "fts" and self.full_text is None:
+            log.warning("⚠️ Destination Agent: No full-text index (run database/build_search_index.py), using substring search")
+        
+        # Built once (or loaded from the ranking snapshot) - ranking only visits cities that can match
+        self.snapshot = snapshot
+        if snapshot is not None:
+            self.keyword_index = snapshot.keyword_index
+            self.keyword_index.full_text = self.full_text
+        else:
+            with self.db.reading() as conn:
+                self.keyword_index = KeywordIndex.from_cursor(conn.cursor(), full_text=self.full_text)
+        self.scorer = self._create_scorer(scoring_engine or SCORING_ENGINE)
+        log.info("✅ Destination Agent: Scoring engine built", engine=self.scoring_engine, cities=len(self.scorer))
+        
+        # Precomputed vectors replace per-request LLM scoring of weaker matches
+        self.retriever = None
+        if CITY_RETRIEVAL == "embedding":
+            try:
+                self.retriever = EmbeddingIndex.load()
+            except Exception as e:
+                log.warning("⚠️ Destination Agent: Could not load embeddings", error=str(e))
+            if self.retriever:
+                log.info("✅ Destination Agent: Embedding retrieval ready", embedder=self.retriever.embedder.name, cities=len(self.retriever))
+            else:
+                log.warning("⚠️ Destination Agent: No embeddings found (run database/build_embeddings.py), using AI scoring")
+        
+        # AI scoring batches run concurrently, each bounded by its own timeout
+        self.ai_timeout = AI_SCORING_TIMEOUT
+        self.ai_concurrency = AI_SCORING_CONCURRENCY
+        self._ai_pool = ThreadPoolExecutor(max_workers=self.ai_concurrency, thread_name_prefix="ai-scoring")
+        self._ai_semaphore = asyncio.Semaphore(self.ai_concurrency)
+        
+        if client is not None or async_client is not None:
+            # Injected clients (e.g. StubLLMClient for latency measurements)
+            self.client = client
+            self.async_client = async_client
+            log.info("✅ Destination Agent: Database + AI semantic matching ready (injected client)")
+            return
+        
+        if not OPENAI_API_KEY and LLM_BACKEND == "openai":
             raise ValueError("❌ OPENAI_API_KEY not set. Please configure environment variable.")
         
         try:
-            self.client = OpenAI(api_key=OPENAI_API_KEY)
-            print("✅ Destination Agent: Database + AI semantic matching ready")
+            # No SDK retries - each batch's timeout is its whole budget
+            self.client = create_client("destination_scoring", max_retries=0)
+            self.async_client = create_async_client("destination_scoring", max_retries=0)
+            log.info("✅ Destination Agent: Database + AI semantic matching ready")
         except Exception as e:
-            print(f"⚠️ Destination Agent: AI unavailable - {e}")
+            log.warning("⚠️ Destination Agent: AI unavailable", error=str(e))
             self.client = None
+            self.async_client = None
 
+    def _create_scorer(self, engine):
+        """Pick the candidate scoring engine"""
+        if engine == "matrix":
+            self.scoring_engine = "matrix"
+            if self.snapshot is not None:
+                return self.snapshot.matrix
+            return MatrixScoringEngine(self.keyword_index)
+        if engine != "index":
+            log.warning("⚠️ Destination Agent: Unknown scoring engine, using index", engine=engine)
+        self.scoring_engine = "index"
+        return self.keyword_index
+
+    @timed_stage("ranking")
     def rank_cities_with_semantic_ai(self, interests, num_cities):
         """Rank cities with improved keyword matching"""
-        print(f"🎯 Destination Agent: Ranking for: {interests}")
-        
-        self.cursor.execute('SELECT id, name, country, description, keywords FROM cities')
-        cities = self.cursor.fetchall()
+        high_matches, all_others = self._select_candidates(interests, num_cities)
         
-        print(f"   📊 Keyword matching {len(cities)} cities...")
-        
-        pre_scored = []
-        for city in cities:
-            city_id, name, country, description, keywords = city
-            keywords_list = [k.strip() for k in keywords.split(',')] if keywords else []
-            
-            exact_score = 0
-            matched = []
-            
-            for interest in interests:
-                interest_lower = interest.lower().strip()
-                
-                # 🔍 IMPROVED MATCHING - Multiple strategies
-                if self._keyword_matches(interest_lower, keywords_list, description):
-                    match_type, score = self._get_match_score(interest_lower, keywords_list, description)
-                    exact_score += score
-                    matched.append(interest)
-            
-            # Normalize to percentage
-            max_possible = len(interests) * 100
-            normalized_score = int((exact_score / max_possible) * 100) if max_possible > 0 else 0
-            
-            pre_scored.append({
-                'city': city,
-                'keyword_score': normalized_score,
-                'exact_score': exact_score,
-                'matched': list(set(matched))
-            })
+        # Embedding retrieval for lower matches - AI scoring when it finds nothing
+        ai_matches = self._embedding_matches(interests, high_matches, 40) if self.retriever is not None else []
+        if not ai_matches:
+            ai_candidates = self._ai_candidates(all_others, self.client)
+            ai_scores = self._ai_score_cities_detailed(self._city_summaries(ai_candidates), interests) if ai_candidates else []
+            ai_matches = self._ai_approved(ai_candidates, ai_scores)
         
-        pre_scored.sort(key=lambda x: (x['keyword_score'], x['exact_score']), reverse=True)
+        return self._finalize_ranking(interests, num_cities, high_matches, all_others, ai_matches)
+
+    @timed_stage("ranking")
+    async def rank_cities_with_db_async(self, interests, num_cities):
+        """Non-blocking ranking: CPU/SQLite work in a thread, AI calls awaited"""
+        high_matches, all_others = await asyncio.to_thread(self._select_candidates, interests, num_cities)
+        
+        ai_matches = []
+        if self.retriever is not None:
+            ai_matches = await asyncio.to_thread(self._embedding_matches, interests, high_matches, 40)
+        if not ai_matches:
+            ai_candidates = self._ai_candidates(all_others, self.async_client)
+            ai_scores = await self._ai_score_cities_detailed_async(self._city_summaries(ai_candidates), interests) if ai_candidates else []
+            ai_matches = self._ai_approved(ai_candidates, ai_scores)
+        
+        return await asyncio.to_thread(
+            self._finalize_ranking, interests, num_cities, high_matches, all_others, ai_matches
+        )
+
+    def _select_candidates(self, interests, num_cities):
+        """Keyword-score the catalog: (strong matches, best of the rest)"""
+        log.debug("🎯 Destination Agent: Ranking", interests=interests)
         
-        high_matches = [c for c in pre_scored if c['keyword_score'] >= 25]
-        all_others = [c for c in pre_scored if c['keyword_score'] < 25]
+        high_matches, all_others, high_count = self.scorer.select_candidates(
+            interests, high_limit=60, other_limit=max(40, num_cities)
+        )
         
-        print(f"   ✅ Found {len(high_matches)} strong keyword matches (≥25%)")
+        log.debug("📊 Keyword scoring done", engine=self.scoring_engine, cities=len(self.scorer), strong_matches=high_count)
+        return high_matches, all_others
+
+    def _ai_candidates(self, all_others, client):
+        """The weaker matches worth sending to the AI scorer"""
+        if not all_others or not client:
+            return []
+        log.debug("🤖 Using AI for other cities", count=min(40, len(all_others)))
+        return all_others[:40]
+
+    def _city_summaries(self, candidates):
+        """One-line summaries the AI scorer sees"""
+        return [f"{c['city'][1]}, {c['city'][2]}: {c['city'][3][:80]}" for c in candidates]
+
+    def _ai_approved(self, ai_candidates, ai_scores):
+        """Pair candidates with their AI score, keeping those that pass"""
+        ai_matches = []
+        for i, candidate in enumerate(ai_candidates):
+            ai_score = ai_scores[i] if i < len(ai_scores) else 0
+            
+            if ai_score >= 35:
+                ai_matches.append((candidate, ai_score))
+        return ai_matches
+
+    def _finalize_ranking(self, interests, num_cities, high_matches, all_others, ai_matches):
+        """Attach activities, compute final scores and pick a diverse set"""
+        # ⭐ One batched query for every candidate's activities (no N+1)
+        activities_by_city = self._load_activities(
+            [c['city'][0] for c in high_matches] + [c['city'][0] for c, _ in ai_matches]
+        )
+        text_hits = self._activity_text_hits(interests, activities_by_city)
         
         final_scored = []
         
         # Process high matches
-        for candidate in high_matches[:60]:
+        for candidate in high_matches:
             city_id, name, country, description, keywords = candidate['city']
             
-            self.cursor.execute('SELECT activity, keywords FROM activities WHERE city_id = ?', (city_id,))
-            activities_data = self.cursor.fetchall()
+            activities_data = activities_by_city[city_id]
             activities = [act[0] for act in activities_data]
             
-            activity_boost, activity_matches = self._score_activities(activities_data, interests)
+            activity_boost, activity_matches = self._score_activities(activities_data, interests, text_hits)
             final_score = min(100, candidate['keyword_score'] + activity_boost)
             
             final_scored.append({
@@ -92,52 +201,42 @@ class DestinationAgent:
                 "match_count": len(candidate['matched'])
             })
         
-        # AI scoring for lower matches
-        if all_others and self.client:
-            print(f"   🤖 Using AI for {min(40, len(all_others))} other cities")
-            ai_candidates = all_others[:40]
+        # Process AI-approved lower matches
+        for candidate, ai_score in ai_matches:
+            city_id, name, country, description, keywords = candidate['city']
             
-            city_summaries = [f"{c['city'][1]}, {c['city'][2]}: {c['city'][3][:80]}" 
-                            for c in ai_candidates]
+            activities_data = activities_by_city[city_id]
+            activities = [act[0] for act in activities_data]
             
-            ai_scores = self._ai_score_cities_detailed(city_summaries, interests)
+            activity_boost, activity_matches = self._score_activities(activities_data, interests, text_hits)
+            final_score = min(100, ai_score + activity_boost)
             
-            for i, candidate in enumerate(ai_candidates):
-                ai_score = ai_scores[i] if i < len(ai_scores) else 0
-                
-                if ai_score >= 35:
-                    city_id, name, country, description, keywords = candidate['city']
-                    
-                    self.cursor.execute('SELECT activity, keywords FROM activities WHERE city_id = ?', (city_id,))
-                    activities_data = self.cursor.fetchall()
-                    activities = [act[0] for act in activities_data]
-                    
-                    activity_boost, activity_matches = self._score_activities(activities_data, interests)
-                    final_score = min(100, ai_score + activity_boost)
-                    
-                    final_scored.append({
-                        "destination": name,
-                        "country": country,
-                        "description": description,
-                        "activities": activities,
-                        "score": final_score,
-                        "matched": candidate['matched'] if candidate['matched'] else interests[:1],
-                        "activity_matches": activity_matches,
-                        "match_count": max(1, len(candidate['matched']))
-                    })
+            final_scored.append({
+                "destination": name,
+                "country": country,
+                "description": description,
+                "activities": activities,
+                "score": final_score,
+                "matched": candidate['matched'] if candidate['matched'] else interests[:1],
+                "activity_matches": activity_matches,
+                "match_count": max(1, len(candidate['matched']))
+            })
         
         final_scored.sort(key=lambda x: (x["score"], x["match_count"]), reverse=True)
         final_scored = [city for city in final_scored if city["score"] >= 15]
         
         if not final_scored:
-            print(f"   ⚠️ No matches found, using top results")
+            log.info("⚠️ No matches found, using top results", interests=interests)
             final_scored = []
-            for candidate in (high_matches[:num_cities] if high_matches else pre_scored[:num_cities]):
+            fallback_size = max(FALLBACK_CANDIDATES, num_cities)
+            fallback = high_matches[:fallback_size] if high_matches else all_others[:fallback_size]
+            activities_by_city = self._load_activities([c['city'][0] for c in fallback])
+            text_hits = self._activity_text_hits(interests, activities_by_city)
+            for candidate in fallback:
                 city_id, name, country, description, keywords = candidate['city']
-                self.cursor.execute('SELECT activity, keywords FROM activities WHERE city_id = ?', (city_id,))
-                activities_data = self.cursor.fetchall()
+                activities_data = activities_by_city[city_id]
                 activities = [act[0] for act in activities_data]
-                activity_boost, activity_matches = self._score_activities(activities_data, interests)
+                activity_boost, activity_matches = self._score_activities(activities_data, interests, text_hits)
                 final_scored.append({
                     "destination": name,
                     "country": country,
@@ -149,181 +248,222 @@ class DestinationAgent:
                     "match_count": len(candidate['matched'])
                 })
         
-        print(f"   ⚡ Ranking complete! Top: {final_scored[0]['destination']} ({final_scored[0]['score']}%)")
-        print(f"   📊 Total cities: {len(final_scored)}")
+        log.info(
+            "⚡ Ranking complete",
+            top=final_scored[0]["destination"], score=final_scored[0]["score"], cities=len(final_scored)
+        )
         
         return self._apply_diversity(final_scored, interests, num_cities)
 
-    def _keyword_matches(self, interest, keywords_list, description):
-        """Check if interest matches any keyword or description"""
-        interest_lower = interest.lower()
-        
-        # Exact match
-        if interest_lower in keywords_list:
-            return True
-        
-        # Singular/plural variants
-        for kw in keywords_list:
-            if len(kw) < 2:
-                continue
-            # beach <-> beaches, mountain <-> mountains
-            if (interest_lower == kw + 's' or interest_lower + 's' == kw or
-                interest_lower == kw + 'es' or interest_lower + 'es' == kw):
-                return True
-            # ski <-> skiing, hike <-> hiking
-            if (interest_lower + 'ing' == kw or kw + 'ing' == interest_lower):
-                return True
-            # Contains match (for longer words)
-            if len(interest_lower) > 3 and len(kw) > 3:
-                if interest_lower in kw or kw in interest_lower:
-                    return True
-        
-        # Description match
-        if interest_lower in description.lower():
-            return True
-        
-        return False
+    @timed_stage("embedding_retrieval")
+    def _embedding_matches(self, interests, high_matches, k):
+        """Score cities outside the keyword matches by embedding similarity"""
+        results = self.retriever.search(
+            interests, k, exclude_ids=[c['city'][0] for c in high_matches]
+        )
+        log.debug("🧭 Embedding retrieval scored other cities", count=len(results))
+        
+        matches = []
+        for city_id, similarity in results:
+            pos = self.keyword_index.positions.get(city_id)
+            if pos is None:
+                continue  # Embeddings are older than the catalog
+            
+            # Calibrated per embedder onto the AI scorer's 0-100 scale and cut-off
+            score = self.retriever.score(similarity)
+            if score >= 35:
+                candidate = {
+                    'city': self.keyword_index.cities[pos],
+                    'matched': self.keyword_index.matched_interests(pos, interests)
+                }
+                matches.append((candidate, score))
+        
+        if not matches:
+            log.debug("🧭 No embedding match passed the cut-off, falling back to AI scoring")
+        return matches
 
-    def _get_match_score(self, interest, keywords_list, description):
-        """Get match score based on match type"""
-        # Exact match = 100
-        if interest in keywords_list:
-            return ("exact", 100)
-        
-        # Singular/plural = 95
-        for kw in keywords_list:
-            if (interest == kw + 's' or interest + 's' == kw or
-                interest == kw + 'es' or interest + 'es' == kw or
-                interest + 'ing' == kw or kw + 'ing' == interest):
-                return ("variant", 95)
-        
-        # Substring match = 70
-        for kw in keywords_list:
-            if len(interest) > 3 and len(kw) > 3:
-                if interest in kw or kw in interest:
-                    return ("partial", 70)
-        
-        # Description = 40
-        if interest in description.lower():
-            return ("description", 40)
-        
-        return ("none", 0)
+    def _load_activities(self, city_ids):
+        """Fetch (activity, keyword set, activity id) rows for many cities with one batched query"""
+        activities_by_city = {city_id: [] for city_id in city_ids}
+        ids = list(activities_by_city)
+        
+        # Stay well under SQLite's bound-parameter limit
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i+500]
+            placeholders = ','.join('?' * len(chunk))
+            rows = self.db.execute(
+                f'''SELECT a.id, a.city_id, a.activity, ak.keyword
+                    FROM activities a LEFT JOIN activity_keywords ak ON ak.activity_id = a.id
+                    WHERE a.city_id IN ({placeholders}) ORDER BY a.id''',
+                chunk
+            )
+            
+            # One row per (activity, keyword) - fold them back into keyword sets
+            current_id = None
+            for activity_id, city_id, activity, keyword in rows:
+                if activity_id != current_id:
+                    current_id = activity_id
+                    keywords = set()
+                    activities_by_city[city_id].append((activity, keywords, activity_id))
+                if keyword is not None:
+                    keywords.add(keyword)
+        
+        return activities_by_city
 
-    def _score_activities(self, activities_data, interests):
-        """Score activities and return which activities matched"""
+    def _activity_text_hits(self, interests, activities_by_city):
+        """{interest: {activity id: BM25 rank}} - one FTS query per interest, None without FTS"""
+        if self.full_text is None:
+            return None
+        city_ids = [city_id for city_id, activities in activities_by_city.items() if activities]
+        return {
+            interest.lower(): self.full_text.search_activities(interest, city_ids)
+            for interest in dict.fromkeys(interests)
+        }
+
+    def _score_activities(self, activities_data, interests, text_hits=None):
+        """Score activities and return which activities matched (most relevant first)"""
         boost = 0
-        activity_matches = {}
+        ranked_matches = {}
         
-        for activity_text, activity_keywords in activities_data:
-            act_kw_list = [k.strip() for k in activity_keywords.split(',')] if activity_keywords else []
+        for order, (activity_text, activity_keywords, activity_id) in enumerate(activities_data):
+            activity_lower = activity_text.lower()
             for interest in interests:
-                if interest.lower() in act_kw_list or interest.lower() in activity_text.lower():
+                interest_lower = interest.lower()
+                if text_hits is not None:
+                    text_rank = text_hits[interest_lower].get(activity_id)
+                elif interest_lower in activity_lower:
+                    text_rank = 0.0
+                else:
+                    text_rank = None
+                
+                if interest_lower in activity_keywords or text_rank is not None:
                     boost += 3
-                    if interest not in activity_matches:
-                        activity_matches[interest] = []
-                    activity_matches[interest].append(activity_text)
-        
+                    # BM25 ranks are negative (lower = better); keyword-only matches rank 0
+                    rank = text_rank if text_rank is not None else 0.0
+                    ranked_matches.setdefault(interest, []).append((rank, order, activity_text))
+        
+        activity_matches = {
+            interest: [text for _, _, text in sorted(matches)]
+            for interest, matches in ranked_matches.items()
+        }
         return min(20, boost), activity_matches
 
+    @timed_stage("ai_scoring")
     def _ai_score_cities_detailed(self, city_summaries, interests):
-        """AI scoring"""
+        """AI scoring - batches run concurrently, late or failed batches score 40"""
         if not self.client:
             return [40] * len(city_summaries)
         
+        interests_text = ", ".join(interests)
+        batches = [city_summaries[i:i+15] for i in range(0, len(city_summaries), 15)]
+        futures = [self._ai_pool.submit(self._ai_score_batch_safe, batch, interests_text) for batch in batches]
+        
+        # No deadline here: each worker's call carries its own timeout, so a
+        # batch is only timed from when it starts, not from when it was queued
+        return [score for future in futures for score in future.result()]
+
+    def _ai_score_batch_safe(self, batch, interests_text):
+        """_ai_score_batch for the worker pool - a late or failed batch scores 40"""
         try:
-            interests_text = ", ".join(interests)
-            all_scores = []
-            
-            for i in range(0, len(city_summaries), 15):
-                batch = city_summaries[i:i+15]
-                cities_text = "\n".join([f"{j+1}. {city}" for j, city in enumerate(batch)])
-                
-                response = self.client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[{
-                        "role": "system",
-                        "content": "Score cities 0-100 for interest match. Return only comma-separated numbers."
-                    }, {
-                        "role": "user",
-                        "content": f"Interests: {interests_text}\nCities:\n{cities_text}\n\nScores:"
-                    }],
-                    temperature=0.5,
-                    max_tokens=100
-                )
-                
-                scores_text = response.choices[0].message.content.strip()
-                scores = [min(100, int(s.strip())) for s in scores_text.replace('\n', ',').split(',') 
-                         if s.strip().isdigit()]
-                
-                while len(scores) < len(batch):
-                    scores.append(40)
-                
-                all_scores.extend(scores[:len(batch)])
-            
-            return all_scores
+            return self._ai_score_batch(batch, interests_text)
+        except LLM_TIMEOUT_ERRORS:
+            log.warning("⚠️ AI scoring batch missed its deadline, using default scores", timeout=self.ai_timeout)
         except Exception as e:
-            print(f"⚠️ AI scoring failed: {e}")
+            log.warning("⚠️ AI scoring failed", error=str(e))
+        return [40] * len(batch)
+
+    @timed_stage("ai_scoring")
+    async def _ai_score_cities_detailed_async(self, city_summaries, interests):
+        """Async AI scoring - same batching, limit and per-batch timeout"""
+        if not self.async_client:
             return [40] * len(city_summaries)
+        
+        interests_text = ", ".join(interests)
+        batches = [city_summaries[i:i+15] for i in range(0, len(city_summaries), 15)]
+        
+        async def score(batch):
+            async with self._ai_semaphore:
+                try:
+                    return await asyncio.wait_for(
+                        self._ai_score_batch_async(batch, interests_text), self.ai_timeout
+                    )
+                except LLM_TIMEOUT_ERRORS:
+                    log.warning("⚠️ AI scoring batch missed its deadline, using default scores", timeout=self.ai_timeout)
+                except Exception as e:
+                    log.warning("⚠️ AI scoring failed", error=str(e))
+                return [40] * len(batch)
+        
+        results = await asyncio.gather(*(score(batch) for batch in batches))
+        return [s for batch_scores in results for s in batch_scores]
 
+    def _ai_batch_messages(self, batch, interests_text):
+        """Prompt for scoring one batch of up to 15 city summaries"""
+        cities_text = "\n".join([f"{j+1}. {city}" for j, city in enumerate(batch)])
+        return [{
+            "role": "system",
+            "content": "Score cities 0-100 for interest match. Return only comma-separated numbers."
+        }, {
+            "role": "user",
+            "content": f"Interests: {interests_text}\nCities:\n{cities_text}\n\nScores:"
+        }]
+
+    def _parse_ai_scores(self, content, batch_size):
+        """Comma-separated numbers -> exactly batch_size scores (missing ones = 40)"""
+        scores_text = content.strip()
+        scores = [min(100, int(s.strip())) for s in scores_text.replace('\n', ',').split(',') 
+                 if s.strip().isdigit()]
+        
+        while len(scores) < batch_size:
+            scores.append(40)
+        
+        return scores[:batch_size]
+
+    def _ai_score_batch(self, batch, interests_text):
+        """Score one batch of up to 15 city summaries"""
+        response = self.client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=self._ai_batch_messages(batch, interests_text),
+            temperature=0.5,
+            max_tokens=100,
+            timeout=self.ai_timeout
+        )
+        return self._parse_ai_scores(response.choices[0].message.content, len(batch))
+
+    async def _ai_score_batch_async(self, batch, interests_text):
+        """Async variant of _ai_score_batch"""
+        response = await self.async_client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=self._ai_batch_messages(batch, interests_text),
+            temperature=0.5,
+            max_tokens=100,
+            timeout=self.ai_timeout
+        )
+        return self._parse_ai_scores(response.choices[0].message.content, len(batch))
+
+    @timed_stage("diversity")
     def _apply_diversity(self, scored_cities, interests, num_cities):
         """Select cities to maximize coverage of ALL interests"""
-        print("   🎯 Applying diversity logic to cover all interests...")
         
-        selected = []
-        interest_coverage = {interest: False for interest in interests}  # Track which interests are covered
-        
-        # Sort cities by how many UNCOVERED interests they match
-        remaining_cities = scored_cities.copy()
+        # Each city's matched interests as a bitmask - coverage gain is a popcount
+        masks, bits = interest_masks([city["matched"] for city in scored_cities], interests)
+        if not interests:
+            masks = [0] * len(masks)
+        picked, covered = select_covering(masks, [city["score"] for city in scored_cities], num_cities)
+        
+        selected = [scored_cities[i] for i in picked]
+        if tracing():
+            for position, city in enumerate(selected, 1):
+                log.debug(
+                    "🎯 Diversity pick", position=position, city=city["destination"],
+                    score=city["score"], matched=city["matched"], match_count=city["match_count"]
+                )
         
-        # Phase 1: Ensure each interest is covered at least once
-        while len(selected) < num_cities and interests:
-            best_city = None
-            best_new_coverage = 0
-            
-            for city in remaining_cities:
-                # Count how many uncovered interests this city would cover
-                uncovered_matched = [
-                    interest for interest in city["matched"] 
-                    if not interest_coverage.get(interest, False)
-                ]
-                new_coverage = len(uncovered_matched)
-                
-                # Prefer cities that cover multiple uncovered interests
-                if new_coverage > best_new_coverage:
-                    best_new_coverage = new_coverage
-                    best_city = city
-                elif new_coverage == best_new_coverage and new_coverage > 0:
-                    # Tie-break: higher score
-                    if not best_city or city["score"] > best_city["score"]:
-                        best_city = city
-            
-            if best_city:
-                selected.append(best_city)
-                remaining_cities.remove(best_city)
-                
-                # Update coverage
-                for interest in best_city["matched"]:
-                    interest_coverage[interest] = True
-                
-                print(f"   {len(selected)}️⃣ {best_city['destination']} ({best_city['score']}%): {best_city['matched']} [{best_city['match_count']} matches]")
-            else:
-                break  # No more cities that cover new interests
-        
-        # Phase 2: If we still need more cities, add best overall matches
-        while len(selected) < num_cities and remaining_cities:
-            # Sort remaining by score
-            remaining_cities.sort(key=lambda x: x["score"], reverse=True)
-            best_city = remaining_cities[0]
-            selected.append(best_city)
-            remaining_cities = remaining_cities[1:]
-            print(f"   {len(selected)}️⃣ {best_city['destination']} ({best_city['score']}%): {best_city['matched']} [{best_city['match_count']} matches]")
-        
-        # Print coverage
-        covered_interests = [interest for interest, covered in interest_coverage.items() if covered]
-        print(f"\n✅ Coverage: {covered_interests}")
+        # Log coverage
+        covered_interests = [interest for interest, bit in bits.items() if covered & bit]
+        log.debug("✅ Coverage", covered=covered_interests)
         uncovered = set(interests) - set(covered_interests)
         if uncovered:
-            print(f"⚠️ Uncovered: {list(uncovered)}")
+            log.info("⚠️ Uncovered interests", uncovered=sorted(uncovered))
         
         return selected
 
@@ -333,13 +473,15 @@ class DestinationAgent:
 
     def get_random_cities(self, num_cities):
         """Random cities"""
-        self.cursor.execute('SELECT id, name, country, description FROM cities ORDER BY RANDOM() LIMIT ?', (num_cities,))
-        cities = self.cursor.fetchall()
+        cities = self.db.execute(
+            'SELECT id, name, country, description FROM cities ORDER BY RANDOM() LIMIT ?', (num_cities,)
+        )
+        
+        activities_by_city = self._load_activities([city[0] for city in cities])
         
         result = []
         for city_id, name, country, desc in cities:
-            self.cursor.execute('SELECT activity FROM activities WHERE city_id = ?', (city_id,))
-            activities = [row[0] for row in self.cursor.fetchall()]
+            activities = [act[0] for act in activities_by_city[city_id]]
             
             result.append({
                 "destination": name,
@@ -354,6 +496,10 @@ class DestinationAgent:
         
         return result
 
+    async def get_random_cities_async(self, num_cities):
+        """Random cities without blocking the event loop"""
+        return await asyncio.to_thread(self.get_random_cities, num_cities)
+
     def __del__(self):
-        if hasattr(self, 'conn'):
-            self.conn.close()
\ No newline at end of file
+        if hasattr(self, 'db'):
+            self.db.close()
\ No newline at end of file
@@ -0,0 +1,78 @@
+# diversity.py - LAZY-GREEDY INTEREST COVERAGE OVER BITMASKS
+import heapq
+import operator
+from itertools import islice
+
+
+def interest_masks(matched_lists, interests):
+    """
+    One bitmask per city: bit i is set when the city matched interest i.
+
+    Returns (masks, bits) where bits maps each interest to its bit; interests
+    that only show up in a city's matched list get bits after the given ones.
+    """
+    bits = {interest: 1 << i for i, interest in enumerate(dict.fromkeys(interests))}
+    masks = []
+    by_matched = {}  # many candidates share the same matched list
+    for matched in matched_lists:
+        key = tuple(matched)
+        mask = by_matched.get(key)
+        if mask is None:
+            mask = 0
+            for interest in matched:
+                bit = bits.get(interest)
+                if bit is None:
+                    bit = bits[interest] = 1 << len(bits)
+                mask |= bit
+            by_matched[key] = mask
+        masks.append(mask)
+    return masks, bits
+
+
+def select_covering(masks, scores, k):
+    """
+    Pick up to k indices: coverage first, then best score.
+
+    Phase 1 repeatedly takes the city covering the most still-uncovered
+    interests (ties: higher score, then earlier index) until nothing adds
+    coverage. Phase 2 fills the remaining slots by score, earliest first.
+    Returns (picked indices, covered mask).
+    """
+    # Best-first order: higher score, then earlier index. Callers usually
+    # pass candidates already sorted by score, which skips the sort
+    n = len(masks)
+    if all(map(operator.ge, scores, islice(scores, 1, None))):
+        order = range(n)
+        ordered_masks = masks
+    else:
+        order = sorted(range(n), key=scores.__getitem__, reverse=True)
+        ordered_masks = list(map(masks.__getitem__, order))
+
+    # Cities with identical masks are interchangeable for coverage, and once
+    # one of them is picked the rest gain nothing - keep only the best of each
+    # (zip keeps the last value per key, so walk the order backwards)
+    best_by_mask = dict(zip(reversed(ordered_masks), reversed(order)))
+    best_by_mask.pop(0, None)
+
+    # Lazy greedy: stored gains only ever shrink, so a popped entry whose gain
+    # is still current beats everything left in the heap
+    heap = [(-mask.bit_count(), -scores[i], i, mask) for mask, i in best_by_mask.items()]
+    heapq.heapify(heap)
+
+    picked = []
+    covered = 0
+    while heap and len(picked) < k:
+        neg_gain, neg_score, i, mask = heapq.heappop(heap)
+        gain = (mask & ~covered).bit_count()
+        if gain == -neg_gain:
+            picked.append(i)
+            covered |= mask
+        elif gain:
+            heapq.heappush(heap, (-gain, neg_score, i, mask))
+
+    needed = k - len(picked)
+    if needed > 0:
+        chosen = set(picked)
+        picked.extend(islice((i for i in order if i not in chosen), needed))
+
+    return picked, covered
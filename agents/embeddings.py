@@ -0,0 +1,241 @@
+# embeddings.py - LOCAL EMBEDDING RETRIEVAL FOR CITY SCORING
+import json
+import os
+import re
+import time
+import zlib
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Where build_embeddings.py writes the vectors
+EMBEDDINGS_DIR = os.getenv("EMBEDDINGS_DIR", "embeddings")
+
+# "hashing" (offline, deterministic) or "sentence-transformers[:model-name]"
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "hashing")
+
+# Cities probed (with two of their own keywords) to calibrate similarity scores
+CALIBRATION_PROBES = 200
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+class HashingEmbedder:
+    """
+    Deterministic feature-hashing vectorizer - no model download, no network.
+
+    Words and character trigrams are hashed (crc32, stable across processes)
+    into a fixed number of signed buckets, then L2-normalized. Trigrams let
+    "hike" and "hiking" land close to each other.
+    """
+
+    def __init__(self, dim=1024):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _features(self, text):
+        for word in TOKEN_RE.findall(text.lower()):
+            yield 'w:' + word, 2.0
+            padded = f"#{word}#"
+            for i in range(len(padded) - 2):
+                yield 't:' + padded[i:i + 3], 1.0
+
+    def embed(self, texts):
+        """Return an (n, dim) float32 array of unit vectors"""
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, weight in self._features(text or ''):
+                h = zlib.crc32(feature.encode('utf-8'))
+                sign = 1.0 if (h >> 31) & 1 else -1.0
+                vectors[row, h % self.dim] += sign * weight
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+
+class SentenceTransformerEmbedder:
+    """Embeddings from a sentence-transformers model (loaded lazily)"""
+
+    def __init__(self, model_name="all-MiniLM-L6-v2"):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name)
+        self.name = f"sentence-transformers:{model_name}"
+
+    def embed(self, texts):
+        """Return an (n, dim) float32 array of unit vectors"""
+        return np.asarray(
+            self.model.encode(list(texts), normalize_embeddings=True, show_progress_bar=False),
+            dtype=np.float32
+        )
+
+
+def get_embedder(backend=None):
+    """Create the configured embedding backend"""
+    backend = backend or EMBEDDING_BACKEND
+    if backend.startswith("sentence-transformers"):
+        _, _, model_name = backend.partition(":")
+        return SentenceTransformerEmbedder(model_name or "all-MiniLM-L6-v2")
+    if backend.startswith("hashing"):
+        _, _, dim = backend.partition("-")
+        return HashingEmbedder(int(dim) if dim else 1024)
+    raise ValueError(f"Unknown embedding backend: {backend}")
+
+
+def city_text(name, country, description, keywords):
+    """Text used to embed a city"""
+    keywords_text = keywords.replace(',', ' ') if keywords else ''
+    return f"{name}, {country}. {description or ''} {keywords_text}"
+
+
+class EmbeddingIndex:
+    """
+    Precomputed city and activity vectors with cosine top-k retrieval.
+
+    Vectors are built offline (database/build_embeddings.py), saved as .npy
+    files and memory-mapped at startup, so workers share the pages and the
+    query path is one matrix-vector product per table.
+    """
+
+    def __init__(self, embedder, city_ids, city_vectors, activity_vectors, activity_city_rows, calibration=None):
+        self.embedder = embedder
+        self.city_ids = list(city_ids)
+        self._row_of = {city_id: row for row, city_id in enumerate(self.city_ids)}
+        self.city_vectors = city_vectors
+        self.activity_vectors = activity_vectors
+        self.activity_city_rows = activity_city_rows
+        
+        # {"baseline": similarity of a typical unrelated city, "match": of a typical keyword match}
+        self.calibration = calibration
+
+    def __len__(self):
+        return len(self.city_ids)
+
+    @classmethod
+    def build(cls, cities, activities, embedder):
+        """
+        Embed the catalog.
+
+        cities: rows of (id, name, country, description, keywords)
+        activities: rows of (city_id, activity)
+        """
+        city_ids = [city[0] for city in cities]
+        row_of = {city_id: row for row, city_id in enumerate(city_ids)}
+
+        city_vectors = embedder.embed([city_text(*city[1:5]) for city in cities])
+
+        activities = [(city_id, text) for city_id, text in activities if city_id in row_of]
+        activity_vectors = embedder.embed([text for _, text in activities])
+        activity_city_rows = np.asarray([row_of[city_id] for city_id, _ in activities], dtype=np.int32)
+
+        index = cls(embedder, city_ids, city_vectors, activity_vectors, activity_city_rows)
+        index.calibration = index._calibrate(cities)
+        return index
+
+    def _calibrate(self, cities):
+        """
+        Where this embedder's similarities sit for matching and unrelated cities.
+
+        Raw cosine values depend on the backend (hashing vectors of short
+        interest lists rarely pass 0.3), so each build probes a sample of
+        cities with two of their own keywords and records the median
+        similarity of the probed city and of the catalog as a whole.
+        """
+        probes = []
+        for row, city in enumerate(cities):
+            keywords = [k.strip() for k in (city[4] or '').split(',') if k.strip()]
+            if len(keywords) >= 2:
+                probes.append((row, keywords[:2]))
+        if not probes:
+            return None
+        step = max(1, len(probes) // CALIBRATION_PROBES)
+
+        matches, baselines = [], []
+        for row, interests in probes[::step][:CALIBRATION_PROBES]:
+            sims = self.similarities(interests)
+            matches.append(float(sims[row]))
+            baselines.append(float(np.median(sims)))
+
+        baseline, match = float(np.median(baselines)), float(np.median(matches))
+        if match <= baseline:
+            return None
+        return {"baseline": round(baseline, 4), "match": round(match, 4)}
+
+    def score(self, similarity):
+        """
+        A similarity on the AI scorer's 0-100 scale: 0 for a typical unrelated
+        city, 100 for a typical keyword match (see _calibrate)
+        """
+        low, high = self.calibration["baseline"], self.calibration["match"]
+        return int(round(max(0.0, min(1.0, (similarity - low) / (high - low))) * 100))
+
+    def save(self, directory=EMBEDDINGS_DIR):
+        """Write vectors and metadata to a directory"""
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, 'city_vectors.npy'), np.ascontiguousarray(self.city_vectors))
+        np.save(os.path.join(directory, 'activity_vectors.npy'), np.ascontiguousarray(self.activity_vectors))
+        np.save(os.path.join(directory, 'activity_city_rows.npy'), self.activity_city_rows)
+        with open(os.path.join(directory, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump({
+                'backend': self.embedder.name,
+                'dim': int(self.city_vectors.shape[1]),
+                'city_ids': self.city_ids,
+                'calibration': self.calibration,
+                'built_at': time.time(),
+            }, f)
+
+    @classmethod
+    def load(cls, directory=EMBEDDINGS_DIR, embedder=None):
+        """Memory-map a saved index; returns None if it is missing"""
+        meta_path = os.path.join(directory, 'meta.json')
+        if not os.path.exists(meta_path):
+            return None
+
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+
+        embedder = embedder or get_embedder(meta['backend'])
+        if embedder.name != meta['backend']:
+            raise ValueError(
+                f"Embeddings were built with {meta['backend']}, not {embedder.name} - rebuild them"
+            )
+        if not meta.get('calibration'):
+            raise ValueError("Embeddings have no score calibration - rebuild them")
+
+        return cls(
+            embedder,
+            meta['city_ids'],
+            np.load(os.path.join(directory, 'city_vectors.npy'), mmap_mode='r'),
+            np.load(os.path.join(directory, 'activity_vectors.npy'), mmap_mode='r'),
+            np.load(os.path.join(directory, 'activity_city_rows.npy'), mmap_mode='r'),
+            meta['calibration'],
+        )
+
+    def similarities(self, interests):
+        """
+        Mean cosine similarity of every city to the interests.
+
+        A city scores the better of its own text and its best activity.
+        """
+        query = self.embedder.embed(list(interests)).mean(axis=0)
+
+        sims = self.city_vectors @ query
+        if len(self.activity_city_rows):
+            activity_sims = self.activity_vectors @ query
+            np.maximum.at(sims, self.activity_city_rows, activity_sims)
+        return sims
+
+    def search(self, interests, k, exclude_ids=()):
+        """Top-k (city_id, similarity) pairs, best first"""
+        if not interests or k <= 0 or not self.city_ids:
+            return []
+
+        sims = self.similarities(interests)
+        rows = [self._row_of[city_id] for city_id in exclude_ids if city_id in self._row_of]
+        if rows:
+            sims[rows] = -np.inf
+
+        k = min(k, len(sims))
+        top = np.argpartition(-sims, k - 1)[:k]
+        top = top[np.argsort(-sims[top], kind='stable')]
+        return [(self.city_ids[row], float(sims[row])) for row in top if np.isfinite(sims[row])]
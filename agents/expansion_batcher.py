@@ -0,0 +1,211 @@
+# expansion_batcher.py - CROSS-REQUEST BATCHING OF UNKNOWN-TERM AI EXPANSION
+import asyncio
+import json
+import os
+from dotenv import load_dotenv
+from agents.lru_cache import LRUCache
+from agents.logs import get_logger
+
+load_dotenv()
+log = get_logger(__name__)
+
+# How long to collect terms from concurrent requests before calling the AI
+EXPANSION_BATCH_WINDOW_MS = float(os.getenv("EXPANSION_BATCH_WINDOW_MS", "15"))
+# Flush early once this many distinct terms are waiting
+EXPANSION_BATCH_MAX_TERMS = int(os.getenv("EXPANSION_BATCH_MAX_TERMS", "32"))
+EXPANSION_TIMEOUT = float(os.getenv("EXPANSION_TIMEOUT", "8"))
+
+# Keywords kept per term and per request
+MAX_KEYWORDS = 5
+
+SYSTEM_PROMPT = """You help identify travel-relevant keywords for niche interests.
+
+Examples:
+- "Pokemon" → anime, japanese, gaming, akihabara, tokyo
+- "Ferrari" → cars, italian, automotive, luxury, racing
+- "Star Wars" → movies, tunisia, ireland, filming locations
+- "K-pop" → korean, music, seoul, entertainment
+
+You get a JSON list of terms. Return ONLY a JSON object mapping every term
+exactly as given to a list of up to 5 lowercase travel keywords."""
+
+
+class ExpansionBatcher:
+    """
+    Expands unknown interest terms with one structured completion per burst.
+
+    Async callers within the same `window` share a single JSON-mode call;
+    each gets back only the expansions of its own terms. Terms already
+    being resolved are joined rather than asked again, and answers are
+    kept in an LRU cache per term. A failed or malformed answer falls back
+    to the raw term and is not cached.
+    """
+
+    def __init__(self, client=None, async_client=None, window_ms=EXPANSION_BATCH_WINDOW_MS,
+                 max_terms=EXPANSION_BATCH_MAX_TERMS, timeout=EXPANSION_TIMEOUT, cache_size=4096):
+        self.client = client
+        self.async_client = async_client
+        self.window = window_ms / 1000
+        self.max_terms = max_terms
+        self.timeout = timeout
+        self.term_cache = LRUCache(max_entries=cache_size)
+
+        self._pending = {}    # term -> Future, waiting for the window to close
+        self._inflight = {}   # term -> Future, part of a call in progress
+        self._flush_handle = None
+        self._tasks = set()   # running _resolve tasks - the loop only keeps weak references
+
+        self.batches = 0
+        self.batched_terms = 0
+
+    def _messages(self, terms):
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": f"Terms: {json.dumps(terms)}"}
+        ]
+
+    def _complete_kwargs(self, terms):
+        return {
+            "model": "gpt-4o-mini",
+            "messages": self._messages(terms),
+            "temperature": 0.7,
+            "max_tokens": 20 + 25 * len(terms),
+            "response_format": {"type": "json_object"},
+            "timeout": self.timeout,
+        }
+
+    def _parse(self, terms, content):
+        """{term: [keywords]} for the terms the answer covers"""
+        data = json.loads(content)
+        if not isinstance(data, dict):
+            raise ValueError("expected a JSON object")
+
+        # Be lenient about the case the model echoes terms back in
+        by_lower = {str(k).strip().lower(): v for k, v in data.items()}
+        expansions = {}
+        for term in terms:
+            values = by_lower.get(term.lower())
+            if isinstance(values, str):
+                values = values.split(',')
+            if not isinstance(values, list):
+                continue
+            keywords = [str(v).strip().lower() for v in values if str(v).strip()]
+            if keywords:
+                expansions[term] = list(dict.fromkeys(keywords))[:MAX_KEYWORDS]
+        return expansions
+
+    def _resolved(self, terms, content):
+        """Parse an answer, cache what it covered and fill the gaps with raw terms"""
+        try:
+            expansions = self._parse(terms, content)
+        except (ValueError, TypeError) as e:
+            log.warning("⚠️ AI expansion returned malformed JSON", error=str(e))
+            expansions = {}
+
+        for term, keywords in expansions.items():
+            self.term_cache.set(term, tuple(keywords))
+        log.debug("→ AI expansion", expansions=expansions)
+        return {term: expansions.get(term, [term]) for term in terms}
+
+    def expand(self, terms):
+        """Blocking expansion for sync callers (no cross-request window)"""
+        result, missing = self._from_cache(terms)
+        if not missing:
+            return result
+
+        try:
+            response = self.client.chat.completions.create(**self._complete_kwargs(missing))
+            result.update(self._resolved(missing, response.choices[0].message.content))
+        except Exception as e:
+            log.warning("⚠️ AI expansion failed", error=str(e))
+            result.update({term: [term] for term in missing})
+        return result
+
+    async def expand_async(self, terms):
+        """Expansion that joins other requests' terms into one AI call"""
+        result, missing = self._from_cache(terms)
+        if not missing:
+            return result
+
+        loop = asyncio.get_running_loop()
+        waiting = {}
+        for term in missing:
+            future = self._pending.get(term) or self._inflight.get(term)
+            if future is None:
+                future = loop.create_future()
+                self._pending[term] = future
+            waiting[term] = future
+
+        if len(self._pending) >= self.max_terms:
+            self._flush()
+        elif self._pending and self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.window, self._flush)
+
+        for term, future in waiting.items():
+            result[term] = list(await asyncio.shield(future))
+        return result
+
+    def _from_cache(self, terms):
+        result = {}
+        missing = []
+        for term in dict.fromkeys(terms):
+            cached = self.term_cache.get(term)
+            if cached is not None:
+                result[term] = list(cached)
+            else:
+                missing.append(term)
+        return result, missing
+
+    def _flush(self):
+        """Close the window: send everything pending as one call"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        batch, self._pending = self._pending, {}
+        if not batch:
+            return
+        self._inflight.update(batch)
+        self.batches += 1
+        self.batched_terms += len(batch)
+        task = asyncio.ensure_future(self._resolve(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._resolve_done)
+
+    async def _resolve(self, batch):
+        terms = list(batch)
+        expansions = {}
+        try:
+            response = await self.async_client.chat.completions.create(**self._complete_kwargs(terms))
+            expansions = self._resolved(terms, response.choices[0].message.content)
+        except Exception as e:
+            log.warning("⚠️ AI expansion failed", error=str(e))
+        finally:
+            # Every waiter gets an answer, even if this task is cancelled
+            for term, future in batch.items():
+                self._inflight.pop(term, None)
+                if not future.done():
+                    future.set_result(expansions.get(term, [term]))
+
+    def _resolve_done(self, task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            log.error("❌ AI expansion batch crashed", exc_info=task.exception())
+
+    def stats(self):
+        """Batch counts plus the per-term cache counters"""
+        stats = self.term_cache.stats()
+        stats["batches"] = self.batches
+        stats["batched_terms"] = self.batched_terms
+        return stats
+
+
+def merge_expansions(terms, expansions, limit=MAX_KEYWORDS):
+    """One request's keywords: its terms' expansions interleaved, deduplicated"""
+    lists = [expansions.get(term, [term]) for term in terms]
+    merged = []
+    for i in range(max((len(l) for l in lists), default=0)):
+        for keywords in lists:
+            if i < len(keywords) and keywords[i] not in merged:
+                merged.append(keywords[i])
+    return merged[:limit]
@@ -1,14 +1,17 @@
 # explanation_agent.py
+from agents.logs import get_logger
+
+log = get_logger(__name__)
 
 class ExplanationAgent:
     """Agent responsible for generating explanations of why destinations were selected"""
     
     def __init__(self):
-        print("✅ Explanation Agent: Initialized")
+        log.info("✅ Explanation Agent: Initialized")
 
     def generate_explanations(self, itinerary, matched_interests_list):
         """Generate explanations for each destination in the itinerary"""
-        print(f"✅ Explanation Agent: Generating explanations for {len(itinerary)} destinations...")
+        log.debug("✅ Explanation Agent: Generating explanations", destinations=len(itinerary))
         explanations = []
         
         for i, city in enumerate(itinerary):
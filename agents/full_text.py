@@ -0,0 +1,81 @@
+# full_text.py - FTS5/BM25 SEARCH OVER CITY DESCRIPTIONS AND ACTIVITIES
+import functools
+import re
+import sqlite3
+from agents.db_pool import ReadPool
+
+WORD_RE = re.compile(r"\w+")
+
+
+class FullTextIndex:
+    """
+    Queries the cities_fts / activities_fts tables built by
+    database/build_search_index.py.
+
+    Each interest becomes one FTS5 phrase query, so multi-word interests
+    ("street food") match as a phrase and porter stemming lets "beach"
+    find "beaches". Results come back in BM25 order, best first.
+    """
+
+    def __init__(self, db_pool=None, cache_size=1024):
+        self.db = db_pool or ReadPool()
+        self._city_hits = functools.lru_cache(maxsize=cache_size)(self._search_cities)
+        self._city_sets = functools.lru_cache(maxsize=cache_size)(
+            lambda interest: frozenset(self._city_hits(interest))
+        )
+
+    @classmethod
+    def open(cls, db_pool=None):
+        """A FullTextIndex, or None if the FTS tables haven't been built"""
+        try:
+            index = cls(db_pool)
+            index.db.execute('SELECT rowid FROM cities_fts LIMIT 1')
+            index.db.execute('SELECT rowid FROM activities_fts LIMIT 1')
+            return index
+        except sqlite3.Error:
+            return None
+
+    @staticmethod
+    def match_query(interest):
+        """FTS5 phrase query for an interest, or None if it has no words"""
+        words = WORD_RE.findall(interest.lower())
+        if not words:
+            return None
+        return '"' + ' '.join(words) + '"'
+
+    def _search_cities(self, interest):
+        query = self.match_query(interest)
+        if query is None:
+            return ()
+        rows = self.db.execute(
+            'SELECT rowid FROM cities_fts WHERE cities_fts MATCH ? ORDER BY rank', (query,)
+        )
+        return tuple(row[0] for row in rows)
+
+    def search_cities(self, interest):
+        """Ids of cities whose description matches, best BM25 first"""
+        return self._city_hits(interest)
+
+    def city_matches(self, interest):
+        """Same ids as search_cities, as a set for membership tests"""
+        return self._city_sets(interest)
+
+    def search_activities(self, interest, city_ids):
+        """{activity id: BM25 rank} for matching activities of the given cities (lower is better)"""
+        query = self.match_query(interest)
+        if query is None or not city_ids:
+            return {}
+
+        ids = list(city_ids)
+        ranks = {}
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i+500]
+            placeholders = ','.join('?' * len(chunk))
+            rows = self.db.execute(
+                f'''SELECT activities_fts.rowid, activities_fts.rank
+                    FROM activities_fts JOIN activities a ON a.id = activities_fts.rowid
+                    WHERE activities_fts MATCH ? AND a.city_id IN ({placeholders})''',
+                [query] + chunk
+            )
+            ranks.update(rows)
+        return ranks
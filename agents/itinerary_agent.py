@@ -1,12 +1,29 @@
 # itinerary_agent.py - WITH IMPROVED GEOGRAPHIC SORTING AND .ENV SUPPORT
-from openai import OpenAI
+import asyncio
+import json
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from agents.llm_client import create_client, create_async_client, LLM_BACKEND, LLM_TIMEOUT_ERRORS
+from agents.db_pool import ReadPool
+from agents.routing import optimize_route
+from agents.metrics import timed_stage, STAGE_SECONDS
+from agents.logs import get_logger, tracing
 import os
 
 # Load environment variables from .env file
 load_dotenv()
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+log = get_logger(__name__)
+
+# How many per-city suggestions are generated at once, and how long each may take
+SUGGESTION_CONCURRENCY = int(os.getenv("SUGGESTION_CONCURRENCY", "4"))
+SUGGESTION_TIMEOUT = float(os.getenv("SUGGESTION_TIMEOUT", "10"))
+
+# Capital coordinates for cities the database has no latitude/longitude for
+COORDINATES_PATH = os.path.join('database', 'coordinates.json')
 
 class ItineraryAgent:
     """Agent responsible for building day-by-day itineraries and distributing days across cities"""
@@ -42,96 +59,100 @@ class ItineraryAgent:
         'Pacific Islands': ['Seychelles', 'Mauritius', 'Maldives'],
     }
     
-    def __init__(self):
+    # country -> region; built back to front so a country listed twice keeps its first region
+    COUNTRY_REGIONS = {country: region for region, countries in reversed(REGIONS.items()) for country in countries}
+    
+    def __init__(self, db_pool=None, snapshot=None):
+        # (city, country) -> (lat, lng), and country -> capital (lat, lng) as a fallback
+        if snapshot is not None:
+            self.coordinates = snapshot.coordinates
+        else:
+            self.coordinates = self._load_coordinates(db_pool or ReadPool())
+        self.country_coordinates = self._load_country_coordinates()
+        
+        self.suggestion_timeout = SUGGESTION_TIMEOUT
+        self.suggestion_concurrency = SUGGESTION_CONCURRENCY
+        self._suggestion_pool = ThreadPoolExecutor(
+            max_workers=self.suggestion_concurrency, thread_name_prefix="itinerary-ai"
+        )
+        self._suggestion_semaphore = asyncio.Semaphore(self.suggestion_concurrency)
+        
         # Initialize OpenAI client
-        if not OPENAI_API_KEY:
-            print("[WARNING] Itinerary Agent: OPENAI_API_KEY not set, AI features disabled")
+        if not OPENAI_API_KEY and LLM_BACKEND == "openai":
+            log.warning("[WARNING] Itinerary Agent: OPENAI_API_KEY not set, AI features disabled")
             self.client = None
+            self.async_client = None
         else:
             try:
-                self.client = OpenAI(api_key=OPENAI_API_KEY)
-                print("✅ Itinerary Agent: AI initialized")
+                # No SDK retries - each suggestion's timeout is its whole budget
+                self.client = create_client("itinerary", max_retries=0)
+                self.async_client = create_async_client("itinerary", max_retries=0)
+                log.info("✅ Itinerary Agent: AI initialized")
             except Exception as e:
-                print(f"[WARNING] Itinerary Agent: Could not initialize AI - {e}")
+                log.warning("[WARNING] Itinerary Agent: Could not initialize AI", error=str(e))
                 self.client = None
+                self.async_client = None
+
+    def _load_coordinates(self, db_pool):
+        try:
+            rows = db_pool.execute(
+                'SELECT name, country, latitude, longitude FROM cities '
+                'WHERE latitude IS NOT NULL AND longitude IS NOT NULL'
+            )
+        except sqlite3.Error as e:
+            log.warning("[WARNING] Itinerary Agent: No city coordinates (run database/add_coordinates.py)", error=str(e))
+            return {}
+        return {(name, country): (lat, lng) for name, country, lat, lng in rows}
+
+    def _load_country_coordinates(self):
+        try:
+            with open(COORDINATES_PATH, 'r', encoding='utf-8') as f:
+                return {country: tuple(point) for country, point in json.load(f)['countries'].items()}
+        except (OSError, ValueError, KeyError) as e:
+            log.warning("[WARNING] Itinerary Agent: Could not load country coordinates", error=str(e))
+            return {}
 
     def get_region(self, country):
         """Get the geographic region for a country"""
-        for region, countries in self.REGIONS.items():
-            if country in countries:
-                return region
-        return 'Other'
+        return self.COUNTRY_REGIONS.get(country, 'Other')
+
+    def get_coordinates(self, city):
+        """(lat, lng) of a city, its country's capital, or None"""
+        point = self.coordinates.get((city["destination"], city["country"]))
+        if point is None:
+            point = self.country_coordinates.get(city["country"])
+        return point
 
+    @timed_stage("routing")
     def sort_by_geography(self, cities):
         """Sort cities to minimize travel distance between them"""
         if len(cities) <= 1:
             return cities
         
-        print(f"\n[GEO] Sorting {len(cities)} cities by travel efficiency...")
+        # Cities we can't place on the map go last, best score first
+        located = [city for city in cities if self.get_coordinates(city) is not None]
+        unlocated = sorted((city for city in cities if self.get_coordinates(city) is None),
+                           key=lambda x: x["score"], reverse=True)
         
-        # Start with the city that has highest score
         sorted_cities = []
-        remaining = cities.copy()
-        
-        # Pick starting city (highest score)
-        start_city = max(remaining, key=lambda x: x["score"])
-        sorted_cities.append(start_city)
-        remaining.remove(start_city)
-        
-        # Greedy algorithm: always go to nearest region/country
-        while remaining:
-            current = sorted_cities[-1]
-            current_region = self.get_region(current["country"])
-            
-            # Find next city in same region, then same continent, then nearest region
-            same_region = [c for c in remaining if self.get_region(c["country"]) == current_region]
-            if same_region:
-                # Within same region, pick by score
-                same_region.sort(key=lambda x: x["score"], reverse=True)
-                next_city = same_region[0]
-            else:
-                # Go to next closest region
-                remaining.sort(key=lambda x: (
-                    0 if self.get_region(x["country"]) in self.get_nearby_regions(current_region) else 1,
-                    -x["score"]  # Higher score first
-                ))
-                next_city = remaining[0]
-            
-            sorted_cities.append(next_city)
-            remaining.remove(next_city)
-            print(f"[GEO]   → Added {next_city['destination']} ({self.get_region(next_city['country'])})")
+        if located:
+            # The highest-scoring city stays first; nearest neighbour + 2-opt orders the rest
+            start = max(range(len(located)), key=lambda i: located[i]["score"])
+            route, distance_km = optimize_route([self.get_coordinates(city) for city in located], start)
+            sorted_cities = [located[i] for i in route]
+            log.debug("[GEO] Route length", km=round(distance_km))
+        sorted_cities.extend(unlocated)
         
-        print(f"[GEO] Geographic sorting complete! Optimized route:")
-        for i, city in enumerate(sorted_cities):
-            print(f"[GEO]   {i+1}. {city['destination']}, {city['country']} ({self.get_region(city['country'])})")
-        print()
+        log.info("[GEO] Route optimized", cities=len(sorted_cities), unlocated=len(unlocated))
+        if tracing():
+            for i, city in enumerate(sorted_cities):
+                log.debug(
+                    "[GEO] Stop", position=i + 1, city=city["destination"],
+                    country=city["country"], region=self.get_region(city["country"])
+                )
         
         return sorted_cities
 
-    def get_nearby_regions(self, region):
-        """Define which regions are near each other"""
-        region_groups = {
-            'Southeast Asia': ['East Asia', 'South Asia', 'Oceania'],
-            'East Asia': ['Southeast Asia', 'South Asia'],
-            'South Asia': ['Southeast Asia', 'Middle East'],
-            'Oceania': ['Southeast Asia'],
-            'Middle East': ['South Asia', 'Africa North', 'Eastern Europe'],
-            'Africa North': ['Middle East', 'Africa West', 'Africa East', 'Africa South'],
-            'Africa West': ['Africa North', 'Africa East', 'Africa South'],
-            'Africa East': ['Africa North', 'Africa West', 'Africa South', 'Middle East'],
-            'Africa South': ['Africa North', 'Africa West', 'Africa East'],
-            'Western Europe': ['Central Europe', 'Southern Europe', 'Northern Europe'],
-            'Central Europe': ['Western Europe', 'Southern Europe', 'Eastern Europe', 'Northern Europe'],
-            'Southern Europe': ['Western Europe', 'Central Europe', 'Eastern Europe', 'Middle East'],
-            'Northern Europe': ['Western Europe', 'Central Europe', 'Eastern Europe'],
-            'Eastern Europe': ['Central Europe', 'Southern Europe', 'Northern Europe', 'Middle East'],
-            'North America': ['Central America', 'Caribbean'],
-            'Central America': ['North America', 'South America', 'Caribbean'],
-            'Caribbean': ['North America', 'Central America', 'South America'],
-            'South America': ['Central America', 'Caribbean'],
-        }
-        return region_groups.get(region, [])
-
     def calculate_days_per_city(self, total_days):
         """Calculate optimal number of cities and days per city"""
         if total_days <= 3:
@@ -147,12 +168,55 @@ class ItineraryAgent:
             num_cities = max(4, total_days // 4)
             days_per_city = total_days / num_cities
         
-        print(f"[PLAN] Itinerary Agent: Planning {num_cities} cities with ~{days_per_city:.1f} days each")
+        log.debug("[PLAN] Itinerary Agent: Days per city", cities=num_cities, days_per_city=round(days_per_city, 1))
         return days_per_city, num_cities
 
     def build_itinerary(self, ranked_cities, total_days, interests):
         """Build complete itinerary with day distribution and geographic sorting"""
-        print(f"\n[BUILD] Itinerary Agent: Building {total_days}-day itinerary...")
+        sorted_cities, city_days_list = self._plan_stays(ranked_cities, total_days)
+        
+        # Generate itinerary suggestions for multi-day stays (concurrently)
+        suggestions = self._generate_suggestions(sorted_cities, city_days_list, interests)
+        
+        return self._assemble_itinerary(sorted_cities, city_days_list, suggestions)
+
+    async def build_itinerary_async(self, ranked_cities, total_days, interests):
+        """Async build_itinerary - AI suggestions are awaited instead of blocking"""
+        sorted_cities, city_days_list = self._plan_stays(ranked_cities, total_days)
+        
+        suggestions = await self._generate_suggestions_async(sorted_cities, city_days_list, interests)
+        
+        return self._assemble_itinerary(sorted_cities, city_days_list, suggestions)
+
+    async def stream_itinerary_async(self, ranked_cities, total_days, interests):
+        """
+        build_itinerary_async in stages for progressive rendering: yields
+        ("route", itinerary lists without suggestions) as soon as the cities
+        are ordered, then ("suggestion", (index, text)) per city as its AI
+        plan finishes.
+        """
+        sorted_cities, city_days_list = self._plan_stays(ranked_cities, total_days)
+        
+        yield "route", self._assemble_itinerary(sorted_cities, city_days_list, [None] * len(sorted_cities))
+        
+        async def indexed(index, city_data, city_days):
+            return index, await self._suggest_async(city_data, city_days, interests)
+        
+        start = time.perf_counter()
+        tasks = [asyncio.ensure_future(indexed(i, city_data, city_days))
+                 for i, (city_data, city_days) in enumerate(zip(sorted_cities, city_days_list))]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield "suggestion", await next_done
+            STAGE_SECONDS.labels("suggestions").observe(time.perf_counter() - start)
+        finally:
+            # Client went away - stop generating suggestions nobody will see
+            for task in tasks:
+                task.cancel()
+
+    def _plan_stays(self, ranked_cities, total_days):
+        """Pick and order the cities, then decide how many days each one gets"""
+        log.debug("[BUILD] Itinerary Agent: Building itinerary", days=total_days)
         
         days_per_city, num_cities = self.calculate_days_per_city(total_days)
         
@@ -162,10 +226,7 @@ class ItineraryAgent:
         # Sort by geography to minimize travel
         sorted_cities = self.sort_by_geography(selected_cities)
         
-        itinerary = []
-        matched_interests_list = []
-        activity_interest_map_list = []
-        
+        city_days_list = []
         days_assigned = 0
         
         for i, city_data in enumerate(sorted_cities):
@@ -181,12 +242,17 @@ class ItineraryAgent:
                         city_days += 1
             
             days_assigned += city_days
-            
-            # Generate itinerary suggestion for multi-day stays
-            itinerary_suggestion = self._generate_itinerary_suggestion(
-                city_data, city_days, interests
-            )
-            
+            city_days_list.append(city_days)
+        
+        return sorted_cities, city_days_list
+
+    def _assemble_itinerary(self, sorted_cities, city_days_list, suggestions):
+        """Combine cities, day counts and suggestions into the response lists"""
+        itinerary = []
+        matched_interests_list = []
+        activity_interest_map_list = []
+        
+        for city_data, city_days, itinerary_suggestion in zip(sorted_cities, city_days_list, suggestions):
             itinerary.append({
                 "destination": city_data["destination"],
                 "country": city_data["country"],
@@ -202,9 +268,46 @@ class ItineraryAgent:
             matched_interests_list.append(city_data["matched"])
             activity_interest_map_list.append(city_data.get("activity_matches", {}))
         
-        print(f"✅ Itinerary Agent: Created geographically optimized itinerary for {len(itinerary)} cities")
+        log.info("✅ Itinerary Agent: Created itinerary", cities=len(itinerary))
         return itinerary, matched_interests_list, activity_interest_map_list
 
+    @timed_stage("suggestions")
+    def _generate_suggestions(self, sorted_cities, city_days_list, interests):
+        """Suggestions for every city in route order - AI calls run in parallel"""
+        if not self.client:
+            return [self._generate_itinerary_suggestion(city_data, city_days, interests)
+                    for city_data, city_days in zip(sorted_cities, city_days_list)]
+        
+        futures = [
+            self._suggestion_pool.submit(self._generate_itinerary_suggestion, city_data, city_days, interests)
+            for city_data, city_days in zip(sorted_cities, city_days_list)
+        ]
+        
+        # No deadline here: each worker's call carries its own timeout, so a
+        # city is only timed from when it starts, not from when it was queued
+        return [future.result() for future in futures]
+
+    @timed_stage("suggestions")
+    async def _generate_suggestions_async(self, sorted_cities, city_days_list, interests):
+        """Async _generate_suggestions - bounded by a semaphore, each city has its own timeout"""
+        # gather keeps the results in route order
+        return await asyncio.gather(*(
+            self._suggest_async(city_data, city_days, interests)
+            for city_data, city_days in zip(sorted_cities, city_days_list)
+        ))
+
+    async def _suggest_async(self, city_data, city_days, interests):
+        """One city's suggestion, falling back to the generic plan on timeout"""
+        async with self._suggestion_semaphore:
+            try:
+                return await asyncio.wait_for(
+                    self._generate_itinerary_suggestion_async(city_data, city_days, interests),
+                    self.suggestion_timeout
+                )
+            except LLM_TIMEOUT_ERRORS:
+                log.warning("[WARNING] Itinerary Agent: AI timed out, using generic", city=city_data["destination"])
+                return self._generate_generic(city_data["destination"], city_days)
+
     def _generate_itinerary_suggestion(self, city_data, days, interests):
         """Generate day-by-day itinerary suggestion"""
         if days == 1:
@@ -215,34 +318,75 @@ class ItineraryAgent:
         else:
             return self._generate_generic(city_data["destination"], days)
 
-    def _generate_with_ai(self, city_data, days, interests):
-        """Use AI to generate personalized itinerary with ALL days"""
-        try:
-            activities_sample = ', '.join(city_data['activities'][:3]) if city_data['activities'] else 'typical activities'
-            
-            prompt = f"""Create a {days}-day itinerary for {city_data['destination']} based on these interests: {', '.join(interests[:4])}.
+    async def _generate_itinerary_suggestion_async(self, city_data, days, interests):
+        """Async variant of _generate_itinerary_suggestion"""
+        if days == 1:
+            return None
+        
+        if self.async_client:
+            return await self._generate_with_ai_async(city_data, days, interests)
+        else:
+            return self._generate_generic(city_data["destination"], days)
+
+    def _itinerary_prompt(self, city_data, days, interests):
+        """Prompt asking for a plan that covers every day"""
+        activities_sample = ', '.join(city_data['activities'][:3]) if city_data['activities'] else 'typical activities'
+        
+        return f"""Create a {days}-day itinerary for {city_data['destination']} based on these interests: {', '.join(interests[:4])}.
 
 Available activities: {activities_sample}
 
 Format: Day 1: [activity]. Day 2: [activity]. Day 3: [activity]...
 Cover ALL {days} days. Keep each day to 8-10 words maximum."""
 
+    def _generate_with_ai(self, city_data, days, interests):
+        """Use AI to generate personalized itinerary with ALL days"""
+        try:
             response = self.client.chat.completions.create(
                 model="gpt-4o-mini",
                 messages=[{
                     "role": "user",
-                    "content": prompt
+                    "content": self._itinerary_prompt(city_data, days, interests)
                 }],
                 temperature=0.8,
-                max_tokens=120
+                max_tokens=120,
+                timeout=self.suggestion_timeout
             )
             
             suggestion = response.choices[0].message.content.strip()
-            print(f"[AI] Itinerary Agent: Generated {days}-day plan for {city_data['destination']}")
+            log.debug("[AI] Itinerary Agent: Generated plan", city=city_data["destination"], days=days)
             return suggestion
                 
+        except LLM_TIMEOUT_ERRORS:
+            log.warning("[WARNING] Itinerary Agent: AI timed out, using generic", city=city_data["destination"])
+            return self._generate_generic(city_data["destination"], days)
+        except Exception as e:
+            log.warning("[WARNING] Itinerary Agent: AI failed, using generic", city=city_data["destination"], error=str(e))
+            return self._generate_generic(city_data["destination"], days)
+
+    async def _generate_with_ai_async(self, city_data, days, interests):
+        """Async variant of _generate_with_ai"""
+        try:
+            response = await self.async_client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[{
+                    "role": "user",
+                    "content": self._itinerary_prompt(city_data, days, interests)
+                }],
+                temperature=0.8,
+                max_tokens=120,
+                timeout=self.suggestion_timeout
+            )
+            
+            suggestion = response.choices[0].message.content.strip()
+            log.debug("[AI] Itinerary Agent: Generated plan", city=city_data["destination"], days=days)
+            return suggestion
+                
+        except LLM_TIMEOUT_ERRORS:
+            log.warning("[WARNING] Itinerary Agent: AI timed out, using generic", city=city_data["destination"])
+            return self._generate_generic(city_data["destination"], days)
         except Exception as e:
-            print(f"[WARNING] Itinerary Agent: AI failed - {e}, using generic")
+            log.warning("[WARNING] Itinerary Agent: AI failed, using generic", city=city_data["destination"], error=str(e))
             return self._generate_generic(city_data["destination"], days)
 
     def _generate_generic(self, city_name, days):
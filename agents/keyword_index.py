@@ -0,0 +1,244 @@
+# keyword_index.py - IN-MEMORY INVERTED KEYWORD INDEX FOR CITY RANKING
+import bisect
+import sqlite3
+
+# Match weights (same tiers DestinationAgent has always used)
+EXACT_WEIGHT = 100        # interest == keyword
+VARIANT_WEIGHT = 95       # beach <-> beaches, ski <-> skiing
+PARTIAL_WEIGHT = 70       # substring either way (both longer than 3 chars)
+DESCRIPTION_WEIGHT = 40   # interest appears in the city description
+
+# Minimum normalized keyword score for a "strong" match
+HIGH_MATCH_THRESHOLD = 25
+
+
+class KeywordIndex:
+    """
+    Inverted index over the city catalog, built once at startup.
+
+    Maps every keyword, its plural/-ing variants and its substrings to the
+    cities carrying it, so ranking only touches cities that can match instead
+    of scanning the whole catalog for every request.
+    """
+
+    def __init__(self, cities, full_text=None):
+        # Rows of (id, name, country, description, keywords) in catalog order;
+        # keywords is a tuple (city_keywords table) or a comma-separated string
+        self.cities = list(cities)
+        
+        # FullTextIndex for the description tier (None = substring search)
+        self.full_text = full_text
+
+        self.postings = {}       # keyword -> tuple of city positions
+        self.variant_of = {}     # plural/singular/-ing form -> set of keywords
+        self.substring_of = {}   # substring (len > 3) -> set of keywords containing it
+
+        self.positions = {}      # city id -> position
+        self.city_keywords = []  # position -> set of keywords
+
+        postings = {}
+        for pos, city in enumerate(self.cities):
+            keywords = city[4]
+            if isinstance(keywords, str):
+                keywords_list = [k.strip() for k in keywords.split(',')]
+            else:
+                keywords_list = list(keywords or ())
+            self.positions[city[0]] = pos
+            self.city_keywords.append(frozenset(keywords_list))
+            for kw in dict.fromkeys(keywords_list):
+                postings.setdefault(kw, []).append(pos)
+        self.postings = {kw: tuple(positions) for kw, positions in postings.items()}
+
+        for kw in self.postings:
+            self._index_keyword(kw)
+
+        # Descriptions are concatenated into one lowercase blob so the
+        # description tier is a C-level str.find instead of a Python loop
+        self._description_blob, self._description_starts = self._build_description_blob()
+
+    @classmethod
+    def from_cursor(cls, cursor, full_text=None):
+        """Build the index from the cities and city_keywords tables"""
+        try:
+            cursor.execute('SELECT city_id, keyword FROM city_keywords')
+        except sqlite3.OperationalError:
+            # Database predates migrate_keywords.py - split the TEXT column instead
+            cursor.execute('SELECT id, name, country, description, keywords FROM cities')
+            return cls(cursor.fetchall(), full_text=full_text)
+
+        keywords_by_city = {}
+        for city_id, keyword in cursor.fetchall():
+            keywords_by_city.setdefault(city_id, []).append(keyword)
+
+        cursor.execute('SELECT id, name, country, description FROM cities')
+        return cls(
+            ((city_id, name, country, description, tuple(keywords_by_city.get(city_id, ())))
+             for city_id, name, country, description in cursor.fetchall()),
+            full_text=full_text
+        )
+
+    def __len__(self):
+        return len(self.cities)
+
+    def _index_keyword(self, kw):
+        """Register the variant and substring forms a keyword answers to"""
+        if len(kw) >= 2:
+            forms = {kw + 's', kw + 'es', kw + 'ing'}
+            if kw.endswith('s'):
+                forms.add(kw[:-1])
+            if kw.endswith('es'):
+                forms.add(kw[:-2])
+            if kw.endswith('ing'):
+                forms.add(kw[:-3])
+            for form in forms:
+                self.variant_of.setdefault(form, set()).add(kw)
+
+        if len(kw) > 3:
+            for sub in self._substrings(kw):
+                self.substring_of.setdefault(sub, set()).add(kw)
+
+    def _build_description_blob(self):
+        """Concatenate lowercase descriptions, remembering where each city starts"""
+        parts = []
+        starts = []
+        offset = 0
+        for city in self.cities:
+            text = (city[3] or '').lower()
+            starts.append(offset)
+            parts.append(text)
+            offset += len(text) + 1
+        return '\x00'.join(parts), starts
+
+    @staticmethod
+    def _substrings(word):
+        """All substrings of a word longer than 3 characters"""
+        n = len(word)
+        return {word[i:j] for i in range(n) for j in range(i + 4, n + 1)}
+
+    def description_matches(self, interest):
+        """Positions of cities whose description contains the interest"""
+        if self.full_text is not None:
+            # One BM25-ordered FTS5 query (stemmed, phrase-aware)
+            positions = self.positions
+            return [positions[city_id] for city_id in self.full_text.search_cities(interest)
+                    if city_id in positions]
+        
+        matches = []
+        if not interest or '\x00' in interest:
+            return matches
+
+        blob = self._description_blob
+        starts = self._description_starts
+        idx = blob.find(interest)
+        while idx != -1:
+            pos = bisect.bisect_right(starts, idx) - 1
+            matches.append(pos)
+            # Skip to the next description - one hit per city is enough
+            if pos + 1 >= len(starts):
+                break
+            idx = blob.find(interest, starts[pos + 1])
+        return matches
+
+    def keyword_tiers(self, interest):
+        """Return [(weight, keywords)] for one (lowercased) interest, best tier first"""
+        exact = [interest] if interest in self.postings else []
+        variants = list(self.variant_of.get(interest, ()))
+
+        partials = []
+        if len(interest) > 3:
+            partial_keywords = set(self.substring_of.get(interest, ()))
+            for sub in self._substrings(interest):
+                if sub in self.postings:
+                    partial_keywords.add(sub)
+            partials = list(partial_keywords)
+
+        return [(EXACT_WEIGHT, exact), (VARIANT_WEIGHT, variants), (PARTIAL_WEIGHT, partials)]
+
+    def lookup(self, interest):
+        """Return {city position: weight} for one (lowercased) interest"""
+        weights = {}
+
+        # Tiers are applied best-first so setdefault keeps the highest weight
+        for weight, keywords in self.keyword_tiers(interest):
+            for kw in keywords:
+                for pos in self.postings[kw]:
+                    weights.setdefault(pos, weight)
+
+        for pos in self.description_matches(interest):
+            weights.setdefault(pos, DESCRIPTION_WEIGHT)
+
+        return weights
+
+    def matched_interests(self, pos, interests):
+        """Which interests match one city (any tier)"""
+        keywords = self.city_keywords[pos]
+        matched = []
+        for interest in interests:
+            interest_lower = interest.lower().strip()
+            if any(keywords.intersection(kws) for _, kws in self.keyword_tiers(interest_lower)):
+                matched.append(interest)
+            elif interest_lower and self._description_contains(pos, interest_lower):
+                matched.append(interest)
+        return list(dict.fromkeys(matched))
+
+    def _description_contains(self, pos, interest):
+        """Description tier test for a single city"""
+        if self.full_text is not None:
+            return self.cities[pos][0] in self.full_text.city_matches(interest)
+        return interest in (self.cities[pos][3] or '').lower()
+
+    def select_candidates(self, interests, high_limit, other_limit):
+        """
+        Score the catalog against the interests.
+
+        Returns (high_matches, others, high_count): the best `high_limit`
+        cities scoring >= HIGH_MATCH_THRESHOLD, the best `other_limit` of the
+        rest (unmatched cities follow in catalog order), and the total number
+        of strong matches.
+        """
+        totals = {}
+        matched = {}
+        for interest in interests:
+            for pos, weight in self.lookup(interest.lower().strip()).items():
+                totals[pos] = totals.get(pos, 0) + weight
+                matched.setdefault(pos, []).append(interest)
+
+        max_possible = len(interests) * 100
+
+        def normalize(exact_score):
+            return int((exact_score / max_possible) * 100) if max_possible > 0 else 0
+
+        def candidate(pos):
+            exact_score = totals.get(pos, 0)
+            return {
+                'city': self.cities[pos],
+                'keyword_score': normalize(exact_score),
+                'exact_score': exact_score,
+                'matched': list(dict.fromkeys(matched.get(pos, [])))
+            }
+
+        # Highest score first, catalog order breaks ties
+        ranked = sorted(totals, key=lambda pos: (-totals[pos], pos))
+
+        high_matches = []
+        others = []
+        high_count = 0
+        for pos in ranked:
+            if normalize(totals[pos]) >= HIGH_MATCH_THRESHOLD:
+                high_count += 1
+                if len(high_matches) < high_limit:
+                    high_matches.append(candidate(pos))
+            elif len(others) < other_limit:
+                others.append(candidate(pos))
+            else:
+                break
+
+        # Cities that matched nothing keep their catalog order
+        if len(others) < other_limit:
+            for pos in range(len(self.cities)):
+                if pos not in totals:
+                    others.append(candidate(pos))
+                    if len(others) >= other_limit:
+                        break
+
+        return high_matches, others, high_count
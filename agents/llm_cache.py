@@ -0,0 +1,207 @@
+# llm_cache.py - PERSISTENT SQLITE CACHE FOR LLM COMPLETIONS
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from types import SimpleNamespace
+from dotenv import load_dotenv
+from agents.logs import get_logger
+
+load_dotenv()
+log = get_logger(__name__)
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() not in ("0", "false", "no")
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.db")
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))  # seconds
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "50000"))
+
+# Don't rewrite last_access on every hit - once a minute is plenty for LRU
+TOUCH_INTERVAL = 60
+# Check the size cap every N writes instead of counting rows on each one
+EVICTION_CHECK_EVERY = 100
+
+
+class LLMCache:
+    """
+    Completion cache shared by every agent, worker process and restart.
+
+    Entries are keyed by a hash of model, messages and sampling parameters,
+    expire after `ttl` seconds, and the least recently used ones are evicted
+    once the table grows past `max_entries`. SQLite in WAL mode lets several
+    uvicorn workers read and write the same file.
+    """
+
+    def __init__(self, path=LLM_CACHE_PATH, ttl=LLM_CACHE_TTL, max_entries=LLM_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS completions (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                content TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        ''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_completions_last_access ON completions(last_access)')
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._writes = 0
+
+    @staticmethod
+    def make_key(model, messages, params):
+        """Stable hash of everything that determines a completion"""
+        payload = json.dumps(
+            {"model": model, "messages": messages, "params": params},
+            sort_keys=True, ensure_ascii=False, default=str
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """Return cached content, or None on a miss"""
+        now = time.time()
+        try:
+            with self._lock:
+                row = self.conn.execute(
+                    'SELECT content, created_at, last_access FROM completions WHERE key = ?', (key,)
+                ).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+
+                content, created_at, last_access = row
+                if now - created_at > self.ttl:
+                    self.conn.execute('DELETE FROM completions WHERE key = ?', (key,))
+                    self.misses += 1
+                    return None
+
+                if now - last_access > TOUCH_INTERVAL:
+                    self.conn.execute('UPDATE completions SET last_access = ? WHERE key = ?', (now, key))
+                self.hits += 1
+                return content
+        except sqlite3.Error as e:
+            log.warning("⚠️ LLM cache read failed", error=str(e))
+            self.misses += 1
+            return None
+
+    def set(self, key, model, content):
+        """Store a completion, evicting old entries when over the size cap"""
+        now = time.time()
+        try:
+            with self._lock:
+                self.conn.execute(
+                    'INSERT OR REPLACE INTO completions (key, model, content, created_at, last_access) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    (key, model, content, now, now)
+                )
+                self._writes += 1
+                if self._writes % EVICTION_CHECK_EVERY == 1:
+                    self._evict(now)
+        except sqlite3.Error as e:
+            log.warning("⚠️ LLM cache write failed", error=str(e))
+
+    def _evict(self, now):
+        """Drop expired entries, then least recently used ones over the cap"""
+        expired = self.conn.execute('DELETE FROM completions WHERE created_at < ?', (now - self.ttl,)).rowcount
+        count = self.conn.execute('SELECT COUNT(*) FROM completions').fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self.conn.execute(
+                'DELETE FROM completions WHERE key IN '
+                '(SELECT key FROM completions ORDER BY last_access LIMIT ?)',
+                (overflow,)
+            )
+        self.evictions += max(0, expired) + max(0, overflow)
+
+    def stats(self):
+        """Hit/miss counters for this process plus the shared entry count"""
+        with self._lock:
+            entries = self.conn.execute('SELECT COUNT(*) FROM completions').fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+
+class CachingClient:
+    """Wraps a chat client so identical completions are served from an LLMCache"""
+
+    def __init__(self, client, cache):
+        self.client = client
+        self.cache = cache
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    @staticmethod
+    def _key(model, messages, kwargs):
+        # The timeout changes how long we wait, not what comes back
+        params = {k: v for k, v in kwargs.items() if k != "timeout"}
+        return LLMCache.make_key(model, messages, params)
+
+    @staticmethod
+    def _cached_response(model, content):
+        return SimpleNamespace(
+            model=model,
+            cached=True,
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(prompt_tokens=0, completion_tokens=0)
+        )
+
+    def _create(self, model, messages, **kwargs):
+        key = self._key(model, messages, kwargs)
+
+        content = self.cache.get(key)
+        if content is not None:
+            return self._cached_response(model, content)
+
+        response = self.client.chat.completions.create(model=model, messages=messages, **kwargs)
+        content = response.choices[0].message.content
+        if content:
+            self.cache.set(key, model, content)
+        return response
+
+
+class AsyncCachingClient(CachingClient):
+    """CachingClient for async clients - SQLite access runs off the event loop"""
+
+    async def _create(self, model, messages, **kwargs):
+        key = self._key(model, messages, kwargs)
+
+        content = await asyncio.to_thread(self.cache.get, key)
+        if content is not None:
+            return self._cached_response(model, content)
+
+        response = await self.client.chat.completions.create(model=model, messages=messages, **kwargs)
+        content = response.choices[0].message.content
+        if content:
+            await asyncio.to_thread(self.cache.set, key, model, content)
+        return response
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """Process-wide LLMCache instance (None when caching is disabled)"""
+    global _default_cache
+    if not LLM_CACHE_ENABLED:
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = LLMCache()
+        return _default_cache
@@ -0,0 +1,173 @@
+# llm_client.py - OPENAI CLIENT FACTORY + LOCAL STUB FOR LATENCY TESTING
+import asyncio
+import json
+import os
+import re
+import time
+from types import SimpleNamespace
+from openai import OpenAI, AsyncOpenAI, APITimeoutError, DEFAULT_MAX_RETRIES
+from dotenv import load_dotenv
+from agents.llm_cache import CachingClient, AsyncCachingClient, get_llm_cache
+from agents.metrics import LLM_CALLS, LLM_FAILURES, LLM_SECONDS, record_llm_usage
+
+load_dotenv()
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+
+# "openai" (real API) or "stub" (local canned responses, no network)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "openai")
+
+# Simulated round-trip time of the stub backend
+LLM_STUB_LATENCY_MS = float(os.getenv("LLM_STUB_LATENCY_MS", "0"))
+
+# What a call that ran past its `timeout` raises: the SDK's error, or the stub's
+LLM_TIMEOUT_ERRORS = (APITimeoutError, TimeoutError)
+
+
+def _stub_response(messages):
+    """Produce a plausible completion for the prompts the agents send"""
+    prompt = messages[-1]["content"]
+
+    # DestinationAgent batch scoring: one number per numbered city
+    if prompt.rstrip().endswith("Scores:"):
+        count = len(re.findall(r"^\d+\. ", prompt, flags=re.MULTILINE))
+        return ", ".join(["55"] * count)
+
+    # ItineraryAgent day plans
+    match = re.search(r"Create a (\d+)-day itinerary for (.+?) based on", prompt)
+    if match:
+        days, city = int(match.group(1)), match.group(2)
+        return " ".join(f"Day {day}: Explore {city} highlights." for day in range(1, days + 1))
+
+    # PreferenceAgent batched expansion: JSON object, each term maps to itself
+    if prompt.startswith("Terms: "):
+        terms = json.loads(prompt[len("Terms: "):])
+        return json.dumps({term: [term] for term in terms})
+
+    # Anything else: echo the terms back as keywords
+    _, _, terms = prompt.partition(":")
+    return terms.strip() or "culture"
+
+
+class StubLLMClient:
+    """
+    Drop-in stand-in for OpenAI() that answers locally after a fixed delay.
+
+    Only implements chat.completions.create. Honours the per-call `timeout`
+    argument the way the real client does, by raising once it has elapsed.
+    """
+
+    def __init__(self, latency=0.0, responder=None):
+        self.latency = latency
+        self.responder = responder or _stub_response
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model, messages, timeout=None, **kwargs):
+        self.calls += 1
+        if timeout is not None and self.latency > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"Stub LLM call exceeded {timeout}s")
+        if self.latency:
+            time.sleep(self.latency)
+        return self._respond(model, messages)
+
+    def _respond(self, model, messages):
+        content = self.responder(messages)
+        return SimpleNamespace(
+            model=model,
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(
+                prompt_tokens=sum(len(m["content"].split()) for m in messages),
+                completion_tokens=len(content.split())
+            )
+        )
+
+
+class AsyncStubLLMClient(StubLLMClient):
+    """Async variant of StubLLMClient - the delay is an asyncio.sleep"""
+
+    async def _create(self, model, messages, timeout=None, **kwargs):
+        self.calls += 1
+        if timeout is not None and self.latency > timeout:
+            await asyncio.sleep(timeout)
+            raise TimeoutError(f"Stub LLM call exceeded {timeout}s")
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._respond(model, messages)
+
+
+class MeteredClient:
+    """
+    Wraps a chat client to count calls, tokens, failures and latency for
+    one call site on /metrics. Sits under the LLM cache, so only real
+    completions are counted.
+    """
+
+    def __init__(self, client, site):
+        self.client = client
+        self.site = site
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model, messages, **kwargs):
+        LLM_CALLS.labels(self.site).inc()
+        start = time.perf_counter()
+        try:
+            response = self.client.chat.completions.create(model=model, messages=messages, **kwargs)
+        except BaseException as e:
+            LLM_FAILURES.labels(self.site, type(e).__name__).inc()
+            raise
+        finally:
+            LLM_SECONDS.labels(self.site).observe(time.perf_counter() - start)
+        record_llm_usage(self.site, response)
+        return response
+
+
+class AsyncMeteredClient(MeteredClient):
+    """MeteredClient for async clients - timeouts and cancellations count as failures"""
+
+    async def _create(self, model, messages, **kwargs):
+        LLM_CALLS.labels(self.site).inc()
+        start = time.perf_counter()
+        try:
+            response = await self.client.chat.completions.create(model=model, messages=messages, **kwargs)
+        except BaseException as e:
+            LLM_FAILURES.labels(self.site, type(e).__name__).inc()
+            raise
+        finally:
+            LLM_SECONDS.labels(self.site).observe(time.perf_counter() - start)
+        record_llm_usage(self.site, response)
+        return response
+
+
+def create_client(site="default", max_retries=DEFAULT_MAX_RETRIES):
+    """
+    Create the configured chat client, or None if AI is unavailable.
+
+    The SDK retries timed-out calls, so a call-site that needs its per-call
+    `timeout` to be the whole budget passes max_retries=0.
+    """
+    if LLM_BACKEND == "stub":
+        client = StubLLMClient(latency=LLM_STUB_LATENCY_MS / 1000)
+    elif OPENAI_API_KEY:
+        client = OpenAI(api_key=OPENAI_API_KEY, max_retries=max_retries)
+    else:
+        return None
+    client = MeteredClient(client, site)
+
+    # Identical completions are served from the shared on-disk cache
+    cache = get_llm_cache()
+    return CachingClient(client, cache) if cache else client
+
+
+def create_async_client(site="default", max_retries=DEFAULT_MAX_RETRIES):
+    """Async counterpart of create_client() for the request-serving pipeline"""
+    if LLM_BACKEND == "stub":
+        client = AsyncStubLLMClient(latency=LLM_STUB_LATENCY_MS / 1000)
+    elif OPENAI_API_KEY:
+        client = AsyncOpenAI(api_key=OPENAI_API_KEY, max_retries=max_retries)
+    else:
+        return None
+    client = AsyncMeteredClient(client, site)
+
+    cache = get_llm_cache()
+    return AsyncCachingClient(client, cache) if cache else client
@@ -0,0 +1,187 @@
+# logs.py - QUEUE-BACKED STRUCTURED LOGGING WITH PER-REQUEST TRACING
+import atexit
+import contextlib
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import uuid
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# DEBUG shows per-candidate tracing for every request; INFO is one line per step
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# "text" (one readable line per record) or "json" (one object per line)
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+# Let a request turn on DEBUG tracing for itself with an "X-Trace: 1" header
+LOG_REQUEST_TRACE = os.getenv("LOG_REQUEST_TRACE", "true").lower() not in ("0", "false", "no")
+
+ROOT_LOGGER = "voyage"
+
+# Attributes every LogRecord has - anything else on a record is a structured field
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+_request_id = contextvars.ContextVar("request_id", default=None)
+_trace = contextvars.ContextVar("trace", default=False)
+
+_listener = None
+
+
+class TraceLogger(logging.LoggerAdapter):
+    """
+    Logger that takes structured fields as keyword arguments and lets a
+    traced request through below the configured level.
+
+        log.info("Ranked cities", count=5, top="Paris")
+        log.debug("Picked city", city=name)   # only at DEBUG or in a traced request
+    """
+
+    def __init__(self, logger):
+        super().__init__(logger, {})
+
+    def isEnabledFor(self, level):
+        return self.logger.isEnabledFor(level) or _trace.get()
+
+    def process(self, msg, kwargs):
+        fields = {k: kwargs.pop(k) for k in list(kwargs) if k not in ("exc_info", "stack_info", "stacklevel", "extra")}
+        if fields:
+            kwargs["extra"] = {**kwargs.get("extra", {}), **fields}
+        return msg, kwargs
+
+    def log(self, level, msg, *args, **kwargs):
+        if self.isEnabledFor(level):
+            msg, kwargs = self.process(msg, kwargs)
+            # Logger.log would re-check the level and drop traced DEBUG records
+            self.logger._log(level, msg, args, **kwargs)
+
+
+def get_logger(name):
+    """TraceLogger under the app's logger tree ("agents.x" -> "voyage.x")"""
+    short = name.rsplit(".", 1)[-1] if name != "__main__" else "main"
+    return TraceLogger(logging.getLogger(f"{ROOT_LOGGER}.{short}"))
+
+
+def tracing():
+    """True when DEBUG records are wanted - guard expensive trace-only work with it"""
+    return _trace.get() or logging.getLogger(ROOT_LOGGER).isEnabledFor(logging.DEBUG)
+
+
+@contextlib.contextmanager
+def request_context(request_id=None, trace=False):
+    """Tag records logged inside with a request id, optionally tracing at DEBUG"""
+    id_token = _request_id.set(request_id or uuid.uuid4().hex[:12])
+    trace_token = _trace.set(bool(trace))
+    try:
+        yield _request_id.get()
+    finally:
+        _trace.reset(trace_token)
+        _request_id.reset(id_token)
+
+
+class _ContextFilter(logging.Filter):
+    """Stamps the request id on records in the thread that logged them"""
+
+    def filter(self, record):
+        record.request_id = _request_id.get()
+        return True
+
+
+def _fields(record):
+    return {k: v for k, v in vars(record).items() if k not in _RECORD_ATTRIBUTES}
+
+
+class TextFormatter(logging.Formatter):
+    """time LEVEL logger [request] message key=value ..."""
+
+    def format(self, record):
+        line = f"{self.formatTime(record)} {record.levelname:<7} {record.name}"
+        if getattr(record, "request_id", None):
+            line += f" [{record.request_id}]"
+        line += f" {record.getMessage()}"
+        fields = _fields(record)
+        if fields:
+            line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, fields included"""
+
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        entry.update(_fields(record))
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def configure_logging(level=LOG_LEVEL, fmt=LOG_FORMAT, stream=None):
+    """
+    Route the app's records through a queue to a background writer thread.
+
+    Callers only format and enqueue; the QueueListener thread does the I/O.
+    Safe to call again (e.g. to switch streams) - the old listener is flushed.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+
+    records = queue.SimpleQueue()
+    handler = logging.handlers.QueueHandler(records)
+    handler.addFilter(_ContextFilter())
+
+    logger = logging.getLogger(ROOT_LOGGER)
+    logger.handlers[:] = [handler]
+    logger.setLevel(level)
+    logger.propagate = False
+
+    _listener = logging.handlers.QueueListener(records, output)
+    _listener.start()
+    return logger
+
+
+@atexit.register
+def _flush_logs():
+    if _listener is not None:
+        _listener.stop()
+
+
+class RequestContextMiddleware:
+    """
+    ASGI middleware giving each HTTP request an id (X-Request-ID, generated
+    if absent, echoed on the response) and DEBUG tracing when it sends
+    "X-Trace: 1" and LOG_REQUEST_TRACE allows it.
+    """
+
+    def __init__(self, app, allow_trace=LOG_REQUEST_TRACE):
+        self.app = app
+        self.allow_trace = allow_trace
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or ())
+        request_id = headers.get(b"x-request-id", b"").decode("latin-1")[:64] or None
+        trace = self.allow_trace and headers.get(b"x-trace", b"").decode("latin-1").lower() in ("1", "true", "yes")
+
+        with request_context(request_id, trace) as request_id:
+            async def send_with_id(message):
+                if message["type"] == "http.response.start":
+                    message["headers"] = list(message.get("headers", [])) + [(b"x-request-id", request_id.encode("latin-1"))]
+                await send(message)
+
+            await self.app(scope, receive, send_with_id)
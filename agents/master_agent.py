@@ -1,8 +1,18 @@
 # master_agent.py - FIXED VERSION WITH ACTIVITY MATCHES
+import asyncio
+import copy
+import time
 from agents.preference_agent import PreferenceAgent
 from agents.destination_agent import DestinationAgent
 from agents.itinerary_agent import ItineraryAgent
 from agents.explanation_agent import ExplanationAgent
+from agents.plan_cache import PlanCache, PLAN_CACHE_ENABLED
+from agents.llm_cache import get_llm_cache
+from agents.metrics import register_cache, lru_cache_stats
+from agents.logs import get_logger, tracing
+from agents.snapshot import load_snapshot
+
+log = get_logger(__name__)
 
 class MasterAgent:
     """
@@ -16,17 +26,51 @@ class MasterAgent:
     """
     
     def __init__(self, nlp=None):
-        print("\n🚀 Initializing Multi-Agent Travel Planner System...")
-        print("=" * 60)
+        log.info("🚀 Initializing Multi-Agent Travel Planner System...")
+        start = time.perf_counter()
+        
+        # Prebuilt indexes from database/build_snapshot.py (None = build from SQLite)
+        self.snapshot = load_snapshot()
         
         # Initialize all specialized agents
-        self.preference_agent = PreferenceAgent()
-        self.destination_agent = DestinationAgent()
-        self.itinerary_agent = ItineraryAgent()
+        self.preference_agent = PreferenceAgent(snapshot=self.snapshot)
+        self.destination_agent = DestinationAgent(snapshot=self.snapshot)
+        self.itinerary_agent = ItineraryAgent(snapshot=self.snapshot)
         self.explanation_agent = ExplanationAgent()
         
-        print("=" * 60)
-        print("✅ All agents initialized successfully!\n")
+        # Finished plans by (interests, days) - shared by identical requests
+        self.plan_cache = PlanCache() if PLAN_CACHE_ENABLED else None
+        
+        self._register_cache_metrics()
+        
+        self.startup_ms = round((time.perf_counter() - start) * 1000, 1)
+        log.info("✅ All agents initialized successfully!", startup_ms=self.startup_ms)
+
+    def readiness(self):
+        """How this worker started: index source, snapshot version and startup time (for /ready)"""
+        return {
+            "index_source": "snapshot" if self.snapshot is not None else "database",
+            "snapshot": self.snapshot.info() if self.snapshot is not None else None,
+            "startup_ms": self.startup_ms,
+        }
+
+    def _register_cache_metrics(self):
+        """Export every cache's hit ratio on /metrics"""
+        if self.plan_cache is not None:
+            register_cache("plan", self.plan_cache.cache.stats)
+        register_cache("preferences", self.preference_agent.cache.stats)
+        register_cache("expansion_terms", self.preference_agent.expansion_batcher.term_cache.stats)
+        
+        llm_cache = get_llm_cache()
+        if llm_cache is not None:
+            register_cache("llm_completions", llm_cache.stats)
+        
+        full_text = self.destination_agent.full_text
+        if full_text is not None:
+            register_cache("fts_city_hits", lru_cache_stats(full_text._city_hits))
+        description_hits = getattr(self.destination_agent.scorer, "_description_hits", None)
+        if description_hits is not None:
+            register_cache("description_hits", lru_cache_stats(description_hits))
 
     def generate_itinerary(self, user_input, days):
         """
@@ -38,44 +82,183 @@ class MasterAgent:
         3. DestinationAgent ranks cities based on ALL interests
         4. ItineraryAgent builds complete day-by-day itinerary
         """
-        print(f"\n{'='*60}")
-        print(f"🎯 MASTER AGENT: Planning {days}-day trip")
-        print(f"📝 User Input: '{user_input}'")
-        print(f"{'='*60}\n")
+        self._log_request(user_input, days)
         
         # Step 1: Extract user preferences (AI Agent)
         if not user_input or user_input.strip() == "":
-            print("⚠️ No user input provided, using default recommendations")
+            log.warning("⚠️ No user input provided, using default recommendations")
             interests = []
         else:
             interests = self.preference_agent.extract_preferences(user_input)
         
+        # Steps 2-4, shared with identical requests via the plan cache
+        # (random picks for empty input are never cached)
+        if self.plan_cache is not None and interests:
+            key = self.plan_cache.make_key(interests, days)
+            itinerary, matched_interests, activity_map = self.plan_cache.get_or_compute(
+                key, lambda: self._build_plan(interests, days)
+            )
+        else:
+            itinerary, matched_interests, activity_map = self._build_plan(interests, days)
+        
+        self._log_itinerary(itinerary)
+        return itinerary, matched_interests, activity_map
+
+    def _build_plan(self, interests, days):
+        """Rank cities and build the itinerary for extracted interests"""
         # Step 2: Calculate optimal city distribution
         days_per_city, num_cities = self.itinerary_agent.calculate_days_per_city(days)
         
         # Step 3: Rank cities based on ALL preferences (Database Agent)
         # ⭐ FIX: Pass ALL interests including 'cars', 'beach', etc.
         if interests:
-            print(f"🔍 Using ALL {len(interests)} interests for diversity ranking")
-            print(f"📋 Full interest list: {interests}\n")
+            log.info("🔍 Ranking for all interests", interests=interests)
             ranked_cities = self.destination_agent.rank_cities_with_db(interests, num_cities)
         else:
             ranked_cities = self.destination_agent.get_random_cities(num_cities)
         
         # Step 4: Build complete itinerary with day distribution (AI Agent)
-        itinerary, matched_interests, activity_map = self.itinerary_agent.build_itinerary(
-            ranked_cities, days, interests
-        )
+        return self.itinerary_agent.build_itinerary(ranked_cities, days, interests)
+
+    async def generate_itinerary_async(self, user_input, days, rankings=None):
+        """
+        Non-blocking generate_itinerary for the web server.
+        
+        Same flow; AI calls are awaited and CPU/SQLite work runs in worker
+        threads, so one slow request doesn't stall the event loop. Batch
+        runs pass `rankings` (a SharedRankings) to reuse destination rankings.
+        """
+        self._log_request(user_input, days)
         
-        print(f"\n{'='*60}")
-        print(f"✅ MASTER AGENT: Trip planning complete!")
-        print(f"📋 Generated itinerary:")
-        for city in itinerary:
-            activity_count = sum(len(activities) for activities in city.get("activity_matches", {}).values())
-            print(f"   • {city['destination']}, {city['country']}: {city['days']} days (Score: {city['score']}%, Activities: {activity_count})")
-        print(f"{'='*60}\n")
+        if not user_input or user_input.strip() == "":
+            log.warning("⚠️ No user input provided, using default recommendations")
+            interests = []
+        else:
+            interests = await self.preference_agent.extract_preferences_async(user_input)
+        
+        if self.plan_cache is not None and interests:
+            key = self.plan_cache.make_key(interests, days)
+            itinerary, matched_interests, activity_map = await self.plan_cache.get_or_compute_async(
+                key, lambda: self._build_plan_async(interests, days, rankings)
+            )
+        else:
+            itinerary, matched_interests, activity_map = await self._build_plan_async(interests, days, rankings)
         
+        self._log_itinerary(itinerary)
         return itinerary, matched_interests, activity_map
+
+    async def _build_plan_async(self, interests, days, rankings=None):
+        """Async _build_plan"""
+        days_per_city, num_cities = self.itinerary_agent.calculate_days_per_city(days)
+        
+        ranked_cities = await self._rank_async(interests, num_cities, rankings)
+        
+        return await self.itinerary_agent.build_itinerary_async(ranked_cities, days, interests)
+
+    async def _rank_async(self, interests, num_cities, rankings=None):
+        """Ranked cities for the interests (random picks without any)"""
+        if not interests:
+            return await self.destination_agent.get_random_cities_async(num_cities)
+        
+        log.info("🔍 Ranking for all interests", interests=interests)
+        if rankings is not None:
+            return await rankings.rank(interests, num_cities)
+        return await self.destination_agent.rank_cities_with_db_async(interests, num_cities)
+
+    async def stream_itinerary_async(self, user_input, days):
+        """
+        generate_itinerary_async as a stream of (event, data) pairs for
+        progressive rendering: "interests", then "cities" (ranked and routed,
+        no suggestions yet), then one "suggestion" per city, then "done".
+        """
+        self._log_request(user_input, days)
+        
+        if not user_input or user_input.strip() == "":
+            log.warning("⚠️ No user input provided, using default recommendations")
+            interests = []
+        else:
+            interests = await self.preference_agent.extract_preferences_async(user_input)
+        yield "interests", {"interests": interests}
+        
+        key = self.plan_cache.make_key(interests, days) if self.plan_cache is not None and interests else None
+        plan = self.plan_cache.get(key) if key is not None else None
+        events = asyncio.Queue()
+        if plan is None:
+            compute = lambda: self._stream_plan_async(interests, days, events)
+            if key is not None:
+                # Share the computation with identical /plan-trip and stream requests
+                task, started = self.plan_cache.start_or_join_async(key, compute)
+            else:
+                task, started = asyncio.ensure_future(compute()), True
+            if not started:
+                plan = copy.deepcopy(await asyncio.shield(task))
+        
+        if plan is not None:
+            # Cached or computed by another request - arrives complete
+            itinerary, matched_interests, activity_map = plan
+            yield "cities", {
+                "itinerary": itinerary,
+                "matched_interests": matched_interests,
+                "activity_interest_map": activity_map
+            }
+        else:
+            try:
+                while True:
+                    event = await events.get()
+                    if event is None:
+                        break
+                    yield event
+                itinerary, matched_interests, activity_map = await asyncio.shield(task)
+            finally:
+                # Nobody else waits on an uncached plan - stop its AI calls once the client goes away
+                if key is None:
+                    task.cancel()
+        
+        self._log_itinerary(itinerary)
+        yield "done", {}
+
+    async def _stream_plan_async(self, interests, days, events):
+        """
+        _build_plan_async that also puts the stream's "cities" and
+        "suggestion" events on the `events` queue as they happen, then None.
+        """
+        try:
+            days_per_city, num_cities = self.itinerary_agent.calculate_days_per_city(days)
+            ranked_cities = await self._rank_async(interests, num_cities)
+            
+            async for stage, data in self.itinerary_agent.stream_itinerary_async(ranked_cities, days, interests):
+                if stage == "route":
+                    itinerary, matched_interests, activity_map = data
+                    # A copy - the suggestions below are filled in before the stream sends it
+                    events.put_nowait(("cities", copy.deepcopy({
+                        "itinerary": itinerary,
+                        "matched_interests": matched_interests,
+                        "activity_interest_map": activity_map
+                    })))
+                else:
+                    index, suggestion = data
+                    itinerary[index]["itinerary_suggestion"] = suggestion
+                    events.put_nowait(("suggestion", {"index": index, "itinerary_suggestion": suggestion}))
+            
+            return itinerary, matched_interests, activity_map
+        finally:
+            events.put_nowait(None)
+
+    def _log_request(self, user_input, days):
+        log.info("🎯 MASTER AGENT: Planning trip", days=days, user_input=user_input)
+
+    def _log_itinerary(self, itinerary):
+        log.info(
+            "✅ MASTER AGENT: Trip planning complete!",
+            cities=[f"{city['destination']}, {city['country']}" for city in itinerary]
+        )
+        if tracing():
+            for city in itinerary:
+                activity_count = sum(len(activities) for activities in city.get("activity_matches", {}).values())
+                log.debug(
+                    "• Itinerary stop", city=city['destination'], country=city['country'],
+                    days=city['days'], score=city['score'], activities=activity_count
+                )
     
     def plan_trip(self, user_input, days=3):
         """
@@ -90,12 +273,15 @@ class MasterAgent:
         # Generate explanations (Explanation Agent)
         explanations = self.explanation_agent.generate_explanations(itinerary, matched_interests)
         
-        # DEBUG: Print activity matches to see what's happening
-        print("\n🔍 DEBUG - Activity Matches:")
-        for i, city in enumerate(itinerary):
-            activity_matches = city.get("activity_matches", {})
-            activity_count = sum(len(activities) for activities in activity_matches.values())
-            print(f"  {city['destination']}: {activity_count} activities matched across {len(activity_matches)} interests")
+        # DEBUG: Log activity matches to see what's happening
+        if tracing():
+            for city in itinerary:
+                activity_matches = city.get("activity_matches", {})
+                activity_count = sum(len(activities) for activities in activity_matches.values())
+                log.debug(
+                    "🔍 Activity matches", city=city['destination'],
+                    activities=activity_count, interests=len(activity_matches)
+                )
         
         return {
             "preferences": preferences,
@@ -0,0 +1,152 @@
+# metrics.py - PROMETHEUS METRICS FOR THE PLANNING PIPELINE
+import functools
+import inspect
+import time
+from prometheus_client import Counter, Gauge, Histogram, REGISTRY, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+# Pipeline stages timed by STAGE_SECONDS
+STAGES = (
+    "preferences", "ranking", "ai_scoring", "embedding_retrieval",
+    "diversity", "routing", "suggestions"
+)
+
+# Endpoints get their own label; everything else is "other" to bound cardinality
+ENDPOINTS = ("/plan-trip", "/plan-trip/stream", "/plan-trips")
+
+STAGE_SECONDS = Histogram(
+    "voyage_stage_seconds", "Time spent in each planning stage", ["stage"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+
+LLM_CALLS = Counter("voyage_llm_calls_total", "LLM completions requested (cache hits excluded)", ["site"])
+LLM_FAILURES = Counter("voyage_llm_failures_total", "LLM completions that raised", ["site", "error"])
+LLM_TOKENS = Counter("voyage_llm_tokens_total", "Tokens used by LLM completions", ["site", "kind"])
+LLM_SECONDS = Histogram(
+    "voyage_llm_call_seconds", "LLM completion round-trip time", ["site"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30)
+)
+
+REQUESTS_IN_FLIGHT = Gauge("voyage_requests_in_flight", "HTTP requests being served", ["endpoint"])
+REQUEST_SECONDS = Histogram(
+    "voyage_request_seconds", "HTTP request time, including streamed bodies", ["endpoint"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+REQUESTS = Counter("voyage_requests_total", "HTTP responses by status", ["endpoint", "status"])
+
+for _stage in STAGES:
+    STAGE_SECONDS.labels(_stage)
+
+
+def timed_stage(stage):
+    """Decorator timing every call of a (sync or async) function as a stage"""
+    histogram = STAGE_SECONDS.labels(stage)
+
+    def decorate(function):
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def timed_async(*args, **kwargs):
+                with histogram.time():
+                    return await function(*args, **kwargs)
+            return timed_async
+
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            with histogram.time():
+                return function(*args, **kwargs)
+        return timed
+    return decorate
+
+
+def record_llm_usage(site, response):
+    """Count a completion's tokens (responses without usage are skipped)"""
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return
+    LLM_TOKENS.labels(site, "prompt").inc(getattr(usage, "prompt_tokens", 0) or 0)
+    LLM_TOKENS.labels(site, "completion").inc(getattr(usage, "completion_tokens", 0) or 0)
+
+
+class CacheCollector:
+    """
+    Exports hit/miss counters of the in-process caches at scrape time.
+
+    Caches register a stats() callable returning at least "hits" and
+    "misses" (LRUCache, LLMCache, ...), so lookups pay nothing extra.
+    """
+
+    def __init__(self):
+        self.caches = {}
+
+    def register(self, name, stats):
+        self.caches[name] = stats
+
+    def collect(self):
+        hits = CounterMetricFamily("voyage_cache_hits", "Cache hits", labels=["cache"])
+        misses = CounterMetricFamily("voyage_cache_misses", "Cache misses", labels=["cache"])
+        ratio = GaugeMetricFamily("voyage_cache_hit_ratio", "Hits / lookups since start", labels=["cache"])
+        for name, stats in list(self.caches.items()):
+            try:
+                data = stats()
+            except Exception:
+                continue  # A broken cache shouldn't take the whole scrape down
+            lookups = data["hits"] + data["misses"]
+            hits.add_metric([name], data["hits"])
+            misses.add_metric([name], data["misses"])
+            ratio.add_metric([name], data["hits"] / lookups if lookups else 0.0)
+        yield hits
+        yield misses
+        yield ratio
+
+
+CACHES = CacheCollector()
+REGISTRY.register(CACHES)
+
+
+def register_cache(name, stats):
+    """Export a cache's hit ratio on /metrics (re-registering a name replaces it)"""
+    CACHES.register(name, stats)
+
+
+def lru_cache_stats(cached_function):
+    """stats() for a functools.lru_cache-wrapped function"""
+    def stats():
+        info = cached_function.cache_info()
+        return {"hits": info.hits, "misses": info.misses}
+    return stats
+
+
+def render():
+    """(body, content type) for the /metrics endpoint"""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+class MetricsMiddleware:
+    """ASGI middleware tracking in-flight requests, latency and status per endpoint"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        endpoint = scope["path"] if scope["path"] in ENDPOINTS else "other"
+        status = "500"
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        in_flight = REQUESTS_IN_FLIGHT.labels(endpoint)
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            in_flight.dec()
+            REQUEST_SECONDS.labels(endpoint).observe(time.perf_counter() - start)
+            REQUESTS.labels(endpoint, status).inc()
@@ -0,0 +1,86 @@
+# phrase_matcher.py - AHO-CORASICK MATCHING OF MULTI-WORD PHRASES OVER TOKENS
+from collections import deque
+
+
+class PhraseMatcher:
+    """
+    Aho-Corasick automaton whose alphabet is words rather than characters.
+
+    Phrases ("street food", "pad thai", "beach") are added with a payload,
+    compiled once with build(), and every occurrence in a token list is then
+    found in a single left-to-right pass. A None token is a hard boundary
+    (comma, full stop) that no phrase spans.
+    """
+
+    def __init__(self):
+        self._goto = [{}]     # state -> {token: next state}
+        self._fail = [0]      # state -> failure state
+        self._output = [[]]   # state -> [(phrase length, payload)] ending here
+        self._built = False
+
+    def __len__(self):
+        return sum(1 for outputs in self._output if outputs)
+
+    def add(self, phrase, payload):
+        """Register a phrase (whitespace-separated words)"""
+        tokens = phrase.split()
+        if not tokens:
+            return
+        state = 0
+        for token in tokens:
+            nxt = self._goto[state].get(token)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][token] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = nxt
+        self._output[state].append((len(tokens), payload))
+        self._built = False
+
+    def build(self):
+        """Compute failure links breadth-first and merge suffix outputs"""
+        queue = deque(self._goto[0].values())
+        for state in queue:
+            self._fail[state] = 0
+
+        while queue:
+            state = queue.popleft()
+            for token, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and token not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(token, 0)
+                self._output[nxt] = self._output[nxt] + self._output[self._fail[nxt]]
+        self._built = True
+        return self
+
+    def find_all(self, tokens):
+        """Every (start, end, payload) occurrence, end exclusive"""
+        if not self._built:
+            self.build()
+
+        matches = []
+        state = 0
+        for i, token in enumerate(tokens):
+            if token is None:
+                state = 0
+                continue
+            while state and token not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(token, 0)
+            for length, payload in self._output[state]:
+                matches.append((i + 1 - length, i + 1, payload))
+        return matches
+
+    def find(self, tokens):
+        """Leftmost-longest, non-overlapping occurrences in token order"""
+        selected = []
+        covered_until = 0
+        for start, end, payload in sorted(self.find_all(tokens), key=lambda m: (m[0], -m[1])):
+            if start >= covered_until:
+                selected.append((start, end, payload))
+                covered_until = end
+        return selected
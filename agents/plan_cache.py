@@ -0,0 +1,127 @@
+# plan_cache.py - WHOLE-PLAN CACHE WITH SINGLE-FLIGHT DEDUPLICATION
+import asyncio
+import copy
+import os
+import threading
+from concurrent.futures import Future
+from dotenv import load_dotenv
+from agents.lru_cache import LRUCache
+
+load_dotenv()
+
+PLAN_CACHE_ENABLED = os.getenv("PLAN_CACHE_ENABLED", "true").lower() not in ("0", "false", "no")
+PLAN_CACHE_SIZE = int(os.getenv("PLAN_CACHE_SIZE", "512"))
+PLAN_CACHE_TTL = float(os.getenv("PLAN_CACHE_TTL", "600"))  # seconds
+
+
+def catalog_version(db_path='travel_data.db'):
+    """Changes whenever the catalog database (or its WAL) is written"""
+    version = []
+    for path in (db_path, db_path + '-wal'):
+        try:
+            stat = os.stat(path)
+            version.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            version.append(None)
+    return tuple(version)
+
+
+class PlanCache:
+    """
+    Caches finished plans and collapses concurrent identical computations.
+
+    Keys include the catalog version, so rebuilding the database makes old
+    plans unreachable; they then age out of the LRU. While a plan is being
+    computed, identical requests wait for that computation instead of
+    starting their own (single-flight). Failures are not cached.
+    """
+
+    def __init__(self, max_entries=PLAN_CACHE_SIZE, ttl=PLAN_CACHE_TTL, db_path='travel_data.db'):
+        self.cache = LRUCache(max_entries=max_entries, ttl=ttl)
+        self.db_path = db_path
+
+        self._lock = threading.Lock()
+        self._inflight = {}        # key -> concurrent.futures.Future (sync callers)
+        self._inflight_async = {}  # key -> asyncio.Task (async callers)
+        self.shared = 0            # requests that joined someone else's computation
+
+    def make_key(self, interests, days):
+        """Same interests (in any order) + days + catalog version"""
+        return (catalog_version(self.db_path), tuple(sorted(interests)), days)
+
+    def get(self, key):
+        """A copy of the cached plan, or None"""
+        cached = self.cache.get(key)
+        return copy.deepcopy(cached) if cached is not None else None
+
+    def set(self, key, plan):
+        """Store a plan computed outside get_or_compute (e.g. streamed)"""
+        self.cache.set(key, copy.deepcopy(plan))
+
+    def get_or_compute(self, key, compute):
+        """Return the cached plan, or compute it once for all concurrent callers"""
+        cached = self.cache.get(key)
+        if cached is not None:
+            return copy.deepcopy(cached)
+
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+            else:
+                self.shared += 1
+
+        if not leader:
+            return copy.deepcopy(future.result())
+
+        try:
+            result = compute()
+            self.cache.set(key, result)
+            future.set_result(result)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+        return copy.deepcopy(result)
+
+    async def get_or_compute_async(self, key, compute):
+        """Async get_or_compute - `compute` is a coroutine function"""
+        cached = self.cache.get(key)
+        if cached is not None:
+            return copy.deepcopy(cached)
+
+        task, _ = self.start_or_join_async(key, compute)
+        return copy.deepcopy(await asyncio.shield(task))
+
+    def start_or_join_async(self, key, compute):
+        """
+        The task computing `key` and whether this call started it: joins the
+        in-flight computation if there is one, else starts compute(). The
+        result is cached when the task finishes; await it through
+        asyncio.shield and copy it before changing it.
+        """
+        task = self._inflight_async.get(key)
+        if task is not None:
+            self.shared += 1
+            return task, False
+
+        # A separate task, so one caller going away doesn't cancel the others
+        task = asyncio.ensure_future(compute())
+        self._inflight_async[key] = task
+        task.add_done_callback(lambda done: self._finish_async(key, done))
+        return task, True
+
+    def _finish_async(self, key, task):
+        self._inflight_async.pop(key, None)
+        if not task.cancelled() and task.exception() is None:
+            self.cache.set(key, task.result())
+
+    def stats(self):
+        """LRU counters plus how many requests were deduplicated in flight"""
+        stats = self.cache.stats()
+        stats["shared_inflight"] = self.shared
+        return stats
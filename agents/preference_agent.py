@@ -1,31 +1,96 @@
 # preference_agent.py - IMPROVED KEYWORD NORMALIZATION
-from openai import OpenAI
 from dotenv import load_dotenv
+from agents.llm_client import create_client, create_async_client, LLM_BACKEND
+from agents.lru_cache import LRUCache
+from agents.expansion_batcher import ExpansionBatcher, merge_expansions
+from agents.phrase_matcher import PhraseMatcher
+from agents.spell_corrector import SymSpellCorrector
+from agents.metrics import timed_stage
+from agents.logs import get_logger
 import os
+import re
+import sqlite3
 
 # Load environment variables from .env file
 load_dotenv()
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+log = get_logger(__name__)
+
+# Extracted-interest cache: max distinct queries kept, and their lifetime in seconds
+PREFERENCE_CACHE_SIZE = int(os.getenv("PREFERENCE_CACHE_SIZE", "2048"))
+PREFERENCE_CACHE_TTL = float(os.getenv("PREFERENCE_CACHE_TTL", "3600"))
+
+# Largest number of edits a typo correction may make (long words only; 0 disables)
+TYPO_MAX_EDIT_DISTANCE = int(os.getenv("TYPO_MAX_EDIT_DISTANCE", "2"))
+
+# Common verbs and fillers that never describe an interest
+STOP_WORDS = frozenset({
+    'and', 'the', 'like', 'love', 'want', 'need', 'going', 'drinking', 
+    'playing', 'eating', 'watching', 'play', 'drink', 'eat', 'watch', 'go'
+})
+
+# Travel terms the ranking handles even where no city lists them as a keyword
+# (they still hit descriptions and partial matches); the catalog adds the rest
+CURATED_KEYWORDS = frozenset({
+    # IMPORTANT: Keep exact food terms
+    'sushi', 'ramen', 'pasta', 'pizza', 'tacos', 'curry',
+    # Japanese
+    'japanese', 'japan', 'asian', 'anime', 'tokyo', 'osaka', 'kyoto',
+    # Food (general)
+    'food', 'culinary', 'street food',
+    # Beaches (PLURAL - what's in database)
+    'beaches', 'ocean', 'tropical', 'coastal', 'swimming',
+    # Hiking/Nature
+    'hiking', 'mountains', 'nature', 'outdoor', 'trekking',
+    # Winter
+    'skiing', 'ski', 'snow', 'winter', 'cold', 'ice',
+    # Culture
+    'culture', 'history', 'museums', 'art', 'temples',
+    # Nightlife
+    'nightlife', 'bars', 'clubs', 'party', 'entertainment',
+    # Shopping
+    'shopping', 'markets', 'boutiques',
+    # Countries/regions
+    'italian', 'french', 'spanish', 'mexican', 'thai', 'korean',
+    # Cars
+    'cars', 'automotive', 'racing', 'motor', 'vehicles',
+    # Beverages
+    'wine', 'coffee', 'tea', 'chocolate',
+    # Activities
+    'adventure', 'relaxation', 'luxury', 'budget',
+    'diving', 'surfing', 'snorkeling', 'golf',
+    # Entertainment
+    'gaming', 'movies', 'music', 'concerts',
+})
+
+# Words, plus single punctuation marks that act as phrase boundaries
+TOKEN_RE = re.compile(r"[\w'-]+|[^\w\s]")
 
 class PreferenceAgent:
     """Agent responsible for extracting and understanding user preferences using SEMANTIC AI"""
     
-    def __init__(self):
+    def __init__(self, snapshot=None):
         # Initialize OpenAI client
-        if not OPENAI_API_KEY:
-            print("⚠️ Preference Agent: OPENAI_API_KEY not set, AI features disabled")
+        if not OPENAI_API_KEY and LLM_BACKEND == "openai":
+            log.warning("⚠️ Preference Agent: OPENAI_API_KEY not set, AI features disabled")
             self.client = None
+            self.async_client = None
         else:
             try:
-                self.client = OpenAI(api_key=OPENAI_API_KEY)
-                print("✅ Preference Agent: AI initialized with SEMANTIC understanding")
+                self.client = create_client("preferences")
+                self.async_client = create_async_client("preferences")
+                log.info("✅ Preference Agent: AI initialized with SEMANTIC understanding")
             except Exception as e:
-                print(f"❌ Preference Agent: Could not initialize AI - {e}")
+                log.error("❌ Preference Agent: Could not initialize AI", error=str(e))
                 self.client = None
+                self.async_client = None
+        
+        # Unknown terms from concurrent requests are expanded together
+        self.expansion_batcher = ExpansionBatcher(client=self.client, async_client=self.async_client)
         
-        # Cache for fast repeated queries
-        self.cache = {}
+        # Bounded cache for fast repeated queries, keyed on canonical token sets
+        self.cache = LRUCache(max_entries=PREFERENCE_CACHE_SIZE, ttl=PREFERENCE_CACHE_TTL)
         
         # ⭐ IMPROVED: Map variations to database keywords
         self.keyword_normalization = {
@@ -95,46 +160,111 @@ class PreferenceAgent:
             "wine": ["wine", "vineyard", "french", "italian"],
             "coffee": ["coffee", "cafe", "breakfast", "morning"],
         }
+        
+        # Vocabulary from the catalog, compiled with the maps above into one matcher
+        self.vocabulary = self._load_vocabulary(snapshot)
+        self.phrase_matcher = self._build_phrase_matcher()
+        self.spell_corrector = self._build_spell_corrector()
+        log.info("📚 Preference Agent: Vocabulary loaded", keywords=len(self.vocabulary), phrases=len(self.phrase_matcher))
 
+    @timed_stage("preferences")
     def extract_preferences(self, user_input):
         """Extract user preferences - normalize keywords for better matching"""
-        print(f"🧠 Preference Agent: Analyzing input...")
+        cache_key, cached, known_keywords, unknown_words = self._analyze_input(user_input)
+        if cached is not None:
+            return cached
         
-        # Check cache first
-        cache_key = user_input.lower().strip()
-        if cache_key in self.cache:
-            print(f"   ⚡ Using cached result")
-            return self.cache[cache_key]
+        # Use AI ONLY for unknown words
+        ai_expansions = None
+        if unknown_words and self.client:
+            log.debug("🤖 Using AI for unknown terms", terms=unknown_words)
+            ai_expansions = self._expand_unknown_with_ai(unknown_words)
         
-        # Extract words from input - FILTER OUT common verbs
-        stop_words = {
-            'and', 'the', 'like', 'love', 'want', 'need', 'going', 'drinking', 
-            'playing', 'eating', 'watching', 'play', 'drink', 'eat', 'watch', 'go'
-        }
-        words = [w.strip().lower() for w in user_input.replace(',', ' ').split() 
-                 if len(w.strip()) > 2 and w.strip() not in stop_words]
+        return self._combine_interests(cache_key, known_keywords, unknown_words, ai_expansions)
+
+    @timed_stage("preferences")
+    async def extract_preferences_async(self, user_input):
+        """Non-blocking extract_preferences for the async pipeline"""
+        cache_key, cached, known_keywords, unknown_words = self._analyze_input(user_input)
+        if cached is not None:
+            return cached
         
-        # Check which words are KNOWN keywords vs UNKNOWN
-        known_keywords = self._check_database_keywords(words)
-        unknown_words = [w for w in words if w not in known_keywords and w not in [self.keyword_normalization.get(w, w) for w in known_keywords]]
+        ai_expansions = None
+        if unknown_words and self.async_client:
+            log.debug("🤖 Using AI for unknown terms", terms=unknown_words)
+            ai_expansions = await self._expand_unknown_with_ai_async(unknown_words)
         
+        return self._combine_interests(cache_key, known_keywords, unknown_words, ai_expansions)
+
+    def _analyze_input(self, user_input):
+        """Split input into known keywords and unknown words (or return the cached result)"""
+        
+        tokens = self._correct_typos(self._tokenize(user_input))
+        
+        # One pass over the tokens resolves words, phrases, normalizations and expansions
+        known_keywords, covered, phrases = self._match_phrases(tokens)
+        
+        # Whatever no phrase covered is UNKNOWN
+        unknown_words = list(dict.fromkeys(
+            w for i, w in enumerate(tokens) if i not in covered and self._is_candidate_word(w)
+        ))
+        
+        # Check cache first - "hiking and sushi" and "sushi, hiking" share an entry
+        cache_key = self._cache_key(phrases + unknown_words)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            log.debug("⚡ Preference Agent: Using cached result", interests=list(cached))
+            return cache_key, list(cached), None, None
+        
+        return cache_key, None, known_keywords, unknown_words
+
+    def _tokenize(self, user_input):
+        """Lowercase word tokens; punctuation becomes a None phrase boundary"""
+        tokens = []
+        for token in TOKEN_RE.findall(user_input.lower()):
+            token = token.strip("'-")
+            tokens.append(token if token and (token[0].isalnum() or token[0] == '_') else None)
+        return tokens
+
+    def _correct_typos(self, tokens):
+        """Replace misspelled words ("hikking", "sushii") with the closest known word"""
+        corrected = list(tokens)
+        fixes = {}
+        for i, token in enumerate(tokens):
+            if not self._is_candidate_word(token) or token in self._protected_words:
+                continue
+            fix = self.spell_corrector.correct(token)
+            if fix and fix != token:
+                corrected[i] = fix
+                fixes[token] = fix
+        if fixes:
+            log.debug("✏️ Corrected typos", fixes=fixes)
+        return corrected
+
+    def _is_candidate_word(self, token):
+        """Words long enough to be an interest on their own - FILTER OUT common verbs"""
+        return token is not None and len(token) > 2 and token not in STOP_WORDS
+
+    def _cache_key(self, units):
+        """Order-insensitive canonical form of the matched phrases and leftover words"""
+        return tuple(sorted(set(units)))
+
+    def _combine_interests(self, cache_key, known_keywords, unknown_words, ai_expansions):
+        """Merge known keywords with AI expansions (or raw unknown words) and cache"""
         result = []
         
         # ⭐ CRITICAL: Add KNOWN keywords directly WITHOUT AI expansion
         if known_keywords:
             result.extend(known_keywords)
-            print(f"   ✅ Found exact keywords: {known_keywords}")
+            log.debug("✅ Found exact keywords", keywords=known_keywords)
         
-        # Use AI ONLY for unknown words
-        if unknown_words and self.client:
-            print(f"   🤖 Using AI for unknown terms: {unknown_words}")
-            ai_expansions = self._expand_unknown_with_ai(unknown_words)
+        if ai_expansions is not None:
             # Only add AI expansions that aren't already in result
             for exp in ai_expansions:
                 if exp not in result:
                     result.append(exp)
         elif unknown_words:
-            print(f"   ⚠️ Unknown terms (no AI): {unknown_words}")
+            log.debug("⚠️ Unknown terms (no AI)", terms=unknown_words)
             for word in unknown_words:
                 if word not in result:
                     result.append(word)
@@ -143,113 +273,96 @@ class PreferenceAgent:
         final = result[:7]
         
         # Cache the result
-        self.cache[cache_key] = final
-        print(f"   📋 Final interests: {final}")
+        self.cache.set(cache_key, tuple(final))
+        log.info("🧠 Preference Agent: Interests extracted", interests=final)
         return final
 
-    def _check_database_keywords(self, words):
-        """Check which words are actual keywords in the database"""
-        # Common travel keywords that exist in database
-        known_db_keywords = {
-            # IMPORTANT: Keep exact food terms
-            'sushi', 'ramen', 'pasta', 'pizza', 'tacos', 'curry',
-            # Japanese
-            'japanese', 'japan', 'asian', 'anime', 'tokyo', 'osaka', 'kyoto',
-            # Food (general)
-            'food', 'culinary', 'street food',
-            # Beaches (PLURAL - what's in database)
-            'beaches', 'ocean', 'tropical', 'coastal', 'swimming',
-            # Hiking/Nature
-            'hiking', 'mountains', 'nature', 'outdoor', 'trekking',
-            # Winter
-            'skiing', 'ski', 'snow', 'winter', 'cold', 'ice',
-            # Culture
-            'culture', 'history', 'museums', 'art', 'temples',
-            # Nightlife
-            'nightlife', 'bars', 'clubs', 'party', 'entertainment',
-            # Shopping
-            'shopping', 'markets', 'boutiques',
-            # Countries/regions
-            'italian', 'french', 'spanish', 'mexican', 'thai', 'korean',
-            # Cars
-            'cars', 'automotive', 'racing', 'motor', 'vehicles',
-            # Beverages
-            'wine', 'coffee', 'tea', 'chocolate',
-            # Activities
-            'adventure', 'relaxation', 'luxury', 'budget',
-            'diving', 'surfing', 'snorkeling', 'golf',
-            # Entertainment
-            'gaming', 'movies', 'music', 'concerts',
-        }
+    def _load_vocabulary(self, snapshot=None, db_path='travel_data.db'):
+        """Every keyword used by cities and activities, plus CURATED_KEYWORDS"""
+        vocabulary = set(CURATED_KEYWORDS)
+        if snapshot is not None:
+            return frozenset(vocabulary | snapshot.vocabulary)
+        try:
+            conn = sqlite3.connect(db_path)
+            try:
+                rows = conn.execute(
+                    'SELECT DISTINCT keyword FROM city_keywords UNION SELECT DISTINCT keyword FROM activity_keywords'
+                )
+                vocabulary.update(keyword for (keyword,) in rows)
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            log.warning("⚠️ Preference Agent: Catalog vocabulary unavailable", error=str(e))
+        return frozenset(vocabulary)
+
+    def _build_phrase_matcher(self):
+        """Compile vocabulary, keyword_normalization and expansions into a PhraseMatcher"""
+        matcher = PhraseMatcher()
+        vocabulary = self.vocabulary
         
-        found = []
-        for word in words:
-            word_lower = word.lower()
+        for phrase in vocabulary | set(self.keyword_normalization) | set(self.expansions):
+            # ⭐ NORMALIZE: beach -> beaches, hiking -> hiking,trekking,...
+            normalized = self.keyword_normalization.get(phrase, phrase)
+            direct = [kw.strip() for kw in normalized.split(',') if kw.strip() in vocabulary]
+            if not direct and phrase in vocabulary:
+                direct = [phrase]
+            expanded = [exp for exp in self.expansions.get(phrase, []) if exp in vocabulary]
             
-            # ⭐ NORMALIZE: Check if word should be converted (beach -> beaches)
-            normalized_word = self.keyword_normalization.get(word_lower, word_lower)
-            
-            # If the normalized word contains multiple keywords (comma separated)
-            if ',' in normalized_word:
-                keywords = [kw.strip() for kw in normalized_word.split(',')]
-                for kw in keywords:
-                    if kw in known_db_keywords and kw not in found:
-                        found.append(kw)
-            # Exact match in known keywords (using normalized form)
-            elif normalized_word in known_db_keywords and normalized_word not in found:
-                found.append(normalized_word)
-            # Check original word too
-            elif word_lower in known_db_keywords and word_lower not in found:
-                found.append(word_lower)
+            tokens = [t for t in self._tokenize(phrase) if t]
+            if (direct or expanded) and tokens:
+                matcher.add(' '.join(tokens), (phrase, direct, expanded))
+        
+        return matcher.build()
+
+    def _build_spell_corrector(self):
+        """SymSpell index over every single word the phrase matcher knows"""
+        single_words = set()
+        self._protected_words = set()  # words of multi-word phrases are left alone
+        for phrase in self.vocabulary | set(self.keyword_normalization) | set(self.expansions):
+            tokens = [t for t in self._tokenize(phrase) if t]
+            if len(tokens) == 1:
+                single_words.add(tokens[0])
+            else:
+                self._protected_words.update(tokens)
+        self._protected_words -= single_words
+        return SymSpellCorrector(single_words, max_distance=TYPO_MAX_EDIT_DISTANCE)
+
+    def _match_phrases(self, tokens):
+        """
+        Known keywords in the tokens: (keywords, covered token positions, matched phrases).
+        
+        Longest phrases win ("street food" over "food"); direct matches come
+        first in input order, then their expansions.
+        """
+        direct_found = []
+        expanded_found = []
+        covered = set()
+        phrases = []
         
-        # Check expansions dict
-        for word in words:
-            word_lower = word.lower()
-            if word_lower in self.expansions:
-                for exp in self.expansions[word_lower]:
-                    if exp in known_db_keywords and exp not in found:
-                        found.append(exp)
+        for start, end, (phrase, direct, expanded) in self.phrase_matcher.find(tokens):
+            # A lone word still has to look like an interest ("eat" is a verb here)
+            if end - start == 1 and tokens[start] in STOP_WORDS:
+                continue
+            covered.update(range(start, end))
+            phrases.append(phrase)
+            direct_found.extend(direct)
+            expanded_found.extend(expanded)
         
-        return found
+        return list(dict.fromkeys(direct_found + expanded_found)), covered, phrases
+
+    def _check_database_keywords(self, words):
+        """Check which words are actual keywords in the database"""
+        return self._match_phrases(words)[0]
 
     def _expand_unknown_with_ai(self, unknown_words):
         """Use AI ONLY to expand unknown/niche terms like 'Pokemon', 'Ferrari'"""
-        try:
-            unknown_text = ", ".join(unknown_words)
-            
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[{
-                    "role": "system",
-                    "content": """You help identify travel-relevant keywords for niche interests.
-
-Examples:
-- "Pokemon" → anime, japanese, gaming, akihabara, tokyo
-- "Ferrari" → cars, italian, automotive, luxury, racing
-- "Star Wars" → movies, tunisia, ireland, filming locations
-- "K-pop" → korean, music, seoul, entertainment
+        expansions = self.expansion_batcher.expand(unknown_words)
+        return merge_expansions(unknown_words, expansions)
 
-Return ONLY comma-separated travel keywords (no brackets, quotes)."""
-                    },
-                    {
-                        "role": "user",
-                        "content": f"What travel keywords match: {unknown_text}"
-                    }
-                ],
-                temperature=0.7,
-                max_tokens=40
-            )
-            
-            content = response.choices[0].message.content.strip()
-            content = content.replace('[', '').replace(']', '').replace('"', '').replace("'", '')
-            keywords = [k.strip().lower() for k in content.split(',') if k.strip()]
-            
-            print(f"      → AI expansion: {unknown_words} → {keywords}")
-            return keywords[:5]
-                
-        except Exception as e:
-            print(f"      ⚠️ AI expansion failed: {e}")
-            return unknown_words
+    async def _expand_unknown_with_ai_async(self, unknown_words):
+        """Async variant - concurrent requests share one batched AI call"""
+        expansions = await self.expansion_batcher.expand_async(unknown_words)
+        return merge_expansions(unknown_words, expansions)
 
     def _extract_with_semantic_ai(self, user_input):
         """Legacy method - now handled by extract_preferences"""
@@ -257,6 +370,4 @@ Return ONLY comma-separated travel keywords (no brackets, quotes)."""
 
     def _extract_fallback(self, user_input):
         """Fallback without AI - just use known keywords"""
-        words = [w.strip().lower() for w in user_input.replace(',', ' ').split() 
-                 if len(w.strip()) > 2]
-        return self._check_database_keywords(words)[:5]
\ No newline at end of file
+        return self._check_database_keywords(self._tokenize(user_input))[:5]
\ No newline at end of file
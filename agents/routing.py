@@ -0,0 +1,66 @@
+# routing.py - HAVERSINE DISTANCES AND NEAREST-NEIGHBOUR + 2-OPT ROUTES
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def haversine_matrix(coordinates):
+    """Great-circle distances in km between every pair of (lat, lng) points"""
+    points = np.radians(np.asarray(coordinates, dtype=np.float64).reshape(-1, 2))
+    lat = points[:, 0][:, None]
+    lng = points[:, 1][:, None]
+    a = (np.sin((lat - lat.T) / 2) ** 2
+         + np.cos(lat) * np.cos(lat.T) * np.sin((lng - lng.T) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def route_length(route, distances):
+    """Total km of an open route (no return leg)"""
+    return float(sum(distances[a, b] for a, b in zip(route, route[1:])))
+
+
+def nearest_neighbour_route(distances, start=0):
+    """Open route from `start`, always moving to the closest unvisited point"""
+    n = len(distances)
+    route = [start]
+    visited = np.zeros(n, dtype=bool)
+    visited[start] = True
+    for _ in range(n - 1):
+        row = np.where(visited, np.inf, distances[route[-1]])
+        nxt = int(np.argmin(row))  # ties go to the earlier index
+        route.append(nxt)
+        visited[nxt] = True
+    return route
+
+
+def two_opt(route, distances, epsilon=1e-9):
+    """
+    Improve an open route by reversing segments until no reversal helps.
+
+    The first stop never moves, so the route keeps its starting city.
+    """
+    route = list(route)
+    n = len(route)
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, n - 1):
+            for j in range(i + 1, n):
+                before, first, last = route[i - 1], route[i], route[j]
+                delta = distances[before, last] - distances[before, first]
+                if j + 1 < n:
+                    after = route[j + 1]
+                    delta += distances[first, after] - distances[last, after]
+                if delta < -epsilon:
+                    route[i:j + 1] = reversed(route[i:j + 1])
+                    improved = True
+    return route
+
+
+def optimize_route(coordinates, start=0):
+    """Nearest-neighbour route from `start`, refined with 2-opt; returns (order, km)"""
+    if len(coordinates) <= 1:
+        return list(range(len(coordinates))), 0.0
+    distances = haversine_matrix(coordinates)
+    route = two_opt(nearest_neighbour_route(distances, start), distances)
+    return route, route_length(route, distances)
@@ -0,0 +1,138 @@
+# scoring_engine.py - VECTORIZED NUMPY SCORING ENGINE FOR CITY RANKING
+import functools
+import itertools
+import numpy as np
+
+from agents.keyword_index import DESCRIPTION_WEIGHT, HIGH_MATCH_THRESHOLD
+
+
+class MatrixScoringEngine:
+    """
+    Scores the whole catalog at once with a sparse city x keyword matrix.
+
+    The matrix is stored column-wise (CSC): for every keyword, the positions
+    of the cities carrying it. An interest selects keyword columns per match
+    tier (exact/variant/partial, see KeywordIndex.keyword_tiers); each city
+    keeps the best tier it hits, plus the description tier, and the
+    per-interest vectors are summed. Top-k selection uses argpartition, so
+    there is no full sort of the catalog.
+
+    Produces the same keyword_score / exact_score / ordering as
+    KeywordIndex.select_candidates and can be swapped in for it.
+    """
+
+    def __init__(self, keyword_index, description_cache_size=1024):
+        self.index = keyword_index
+        self.cities = keyword_index.cities
+        self.num_cities = len(self.cities)
+
+        # CSC layout: column j holds indices[indptr[j]:indptr[j+1]]
+        keywords = list(keyword_index.postings)
+        self.columns = {kw: col for col, kw in enumerate(keywords)}
+        lengths = np.fromiter((len(keyword_index.postings[kw]) for kw in keywords),
+                              dtype=np.int64, count=len(keywords))
+        self.indptr = np.zeros(len(keywords) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=self.indptr[1:])
+        self.indices = np.fromiter(
+            itertools.chain.from_iterable(keyword_index.postings[kw] for kw in keywords),
+            dtype=np.int32, count=int(self.indptr[-1])
+        )
+
+        # Catalog-order tie-break: earlier cities rank higher on equal scores
+        self._tie_break = np.arange(self.num_cities - 1, -1, -1, dtype=np.int64)
+
+        # Description hits are the only substring scan left - cache them per interest
+        self._description_hits = functools.lru_cache(maxsize=description_cache_size)(
+            self._find_description_hits
+        )
+
+    def __len__(self):
+        return self.num_cities
+
+    def __getstate__(self):
+        # The lru_cache wrapper can't be pickled (ranking snapshots) - it's rebuilt empty
+        state = self.__dict__.copy()
+        state["description_cache_size"] = self._description_hits.cache_info().maxsize
+        del state["_description_hits"]
+        return state
+
+    def __setstate__(self, state):
+        cache_size = state.pop("description_cache_size")
+        self.__dict__.update(state)
+        self._description_hits = functools.lru_cache(maxsize=cache_size)(self._find_description_hits)
+
+    def _find_description_hits(self, interest):
+        """Description tier positions as an index array"""
+        return np.asarray(self.index.description_matches(interest), dtype=np.int32)
+
+    def _column_rows(self, keywords):
+        """Concatenated row indices of the given keyword columns"""
+        slices = [self.indices[self.indptr[col]:self.indptr[col + 1]]
+                  for col in (self.columns[kw] for kw in keywords)]
+        if not slices:
+            return None
+        return slices[0] if len(slices) == 1 else np.concatenate(slices)
+
+    def interest_vector(self, interest):
+        """Best match weight per city for one (lowercased) interest"""
+        scores = np.zeros(self.num_cities, dtype=np.int16)
+
+        hits = self._description_hits(interest)
+        if hits.size:
+            scores[hits] = DESCRIPTION_WEIGHT
+
+        # Weakest tier first so stronger tiers overwrite it
+        for weight, keywords in reversed(self.index.keyword_tiers(interest)):
+            rows = self._column_rows(keywords)
+            if rows is not None:
+                scores[rows] = weight
+
+        return scores
+
+    def _top_k(self, positions, keys, k):
+        """The k positions with the largest keys, best first"""
+        if k <= 0 or positions.size == 0:
+            return positions[:0]
+        if positions.size > k:
+            part = np.argpartition(-keys, k - 1)[:k]
+            positions, keys = positions[part], keys[part]
+        return positions[np.argsort(-keys, kind='stable')]
+
+    def select_candidates(self, interests, high_limit, other_limit):
+        """Same contract as KeywordIndex.select_candidates"""
+        vectors = [self.interest_vector(interest.lower().strip()) for interest in interests]
+
+        totals = np.zeros(self.num_cities, dtype=np.int64)
+        for vector in vectors:
+            totals += vector
+
+        max_possible = len(interests) * 100
+        if max_possible > 0:
+            # Same float expression as the scalar path so the 25% cut-off agrees
+            normalized = ((totals / max_possible) * 100).astype(np.int64)
+        else:
+            normalized = np.zeros(self.num_cities, dtype=np.int64)
+
+        # Unique sort key: exact score first, then catalog order
+        keys = totals * self.num_cities + self._tie_break
+
+        high_mask = normalized >= HIGH_MATCH_THRESHOLD
+        high_positions = np.flatnonzero(high_mask)
+        other_positions = np.flatnonzero(~high_mask)
+
+        high_top = self._top_k(high_positions, keys[high_positions], high_limit)
+        other_top = self._top_k(other_positions, keys[other_positions], other_limit)
+
+        def candidate(pos):
+            return {
+                'city': self.cities[pos],
+                'keyword_score': int(normalized[pos]),
+                'exact_score': int(totals[pos]),
+                'matched': list(dict.fromkeys(
+                    interest for interest, vector in zip(interests, vectors) if vector[pos]
+                ))
+            }
+
+        high_matches = [candidate(int(pos)) for pos in high_top]
+        others = [candidate(int(pos)) for pos in other_top]
+        return high_matches, others, int(high_positions.size)
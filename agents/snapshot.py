@@ -0,0 +1,179 @@
+# snapshot.py - VERSIONED ON-DISK SNAPSHOT OF THE RANKING INDEXES
+"""
+The ranking artifacts - keyword vocabulary, inverted keyword index, city x
+keyword score matrix and city coordinates - are built from travel_data.db
+by database/build_snapshot.py and saved to one file, so a worker starts by
+unpickling them instead of re-reading and re-indexing the catalog.
+
+The file is a one-line JSON header followed by a pickle. The header carries
+the snapshot format and the catalog revision it was built from; the revision
+is a counter in travel_data.db that triggers bump on every write to the
+catalog tables, so a snapshot is only used if nothing changed since it was
+built. Anything else falls back to building from SQLite.
+
+Like travel_data.db itself the file is produced locally by setup and trusted.
+"""
+import gc
+import json
+import os
+import pickle
+import sqlite3
+import time
+from dotenv import load_dotenv
+from agents.db_pool import ReadPool, CATALOG_DB_PATH
+from agents.keyword_index import KeywordIndex
+from agents.scoring_engine import MatrixScoringEngine
+from agents.logs import get_logger
+
+load_dotenv()
+log = get_logger(__name__)
+
+RANKING_SNAPSHOT_ENABLED = os.getenv("RANKING_SNAPSHOT_ENABLED", "true").lower() not in ("0", "false", "no")
+RANKING_SNAPSHOT_PATH = os.getenv("RANKING_SNAPSHOT_PATH", os.path.join("snapshots", "ranking.pkl"))
+
+# Bump whenever KeywordIndex / MatrixScoringEngine / the stored fields change shape
+SNAPSHOT_FORMAT = 1
+
+# Tables whose writes invalidate a snapshot
+TRACKED_TABLES = ("cities", "activities", "city_keywords", "activity_keywords")
+
+
+def install_revision_tracking(conn):
+    """Create the catalog_revision counter and the triggers that bump it (idempotent)"""
+    conn.execute('CREATE TABLE IF NOT EXISTS catalog_revision (id INTEGER PRIMARY KEY CHECK (id = 1), revision INTEGER NOT NULL)')
+    conn.execute('INSERT OR IGNORE INTO catalog_revision (id, revision) VALUES (1, 0)')
+    existing = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    for table in TRACKED_TABLES:
+        if table not in existing:
+            continue
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            trigger = f"trg_{table}_revision_{event.lower()}"
+            conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+            conn.execute(
+                f"CREATE TRIGGER {trigger} AFTER {event} ON {table} BEGIN "
+                f"UPDATE catalog_revision SET revision = revision + 1 WHERE id = 1; END"
+            )
+    conn.commit()
+
+
+def catalog_revision(db_path=CATALOG_DB_PATH):
+    """Current catalog revision, or None if the database doesn't track one"""
+    try:
+        conn = sqlite3.connect(ReadPool.make_uri(db_path), uri=True)
+        try:
+            row = conn.execute('SELECT revision FROM catalog_revision WHERE id = 1').fetchone()
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return None
+    return row[0] if row else None
+
+
+class RankingSnapshot:
+    """The prebuilt ranking artifacts for one catalog revision"""
+
+    def __init__(self, revision, keyword_index, matrix, coordinates, vocabulary, built_at=None):
+        self.revision = revision
+        self.keyword_index = keyword_index  # KeywordIndex (full_text attached after loading)
+        self.matrix = matrix                # MatrixScoringEngine over keyword_index
+        self.coordinates = coordinates      # (city, country) -> (lat, lng)
+        self.vocabulary = vocabulary        # every city/activity keyword in the catalog
+        self.built_at = built_at or time.time()
+        self.load_ms = None
+
+    @property
+    def version(self):
+        return f"{SNAPSHOT_FORMAT}.{self.revision}"
+
+    def info(self):
+        """Summary for /ready"""
+        return {
+            "version": self.version,
+            "format": SNAPSHOT_FORMAT,
+            "catalog_revision": self.revision,
+            "built_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(self.built_at)),
+            "cities": len(self.keyword_index),
+            "load_ms": self.load_ms,
+        }
+
+    @classmethod
+    def build(cls, db_path=CATALOG_DB_PATH):
+        """Read the catalog and build every artifact"""
+        conn = sqlite3.connect(ReadPool.make_uri(db_path), uri=True)
+        try:
+            revision = conn.execute('SELECT revision FROM catalog_revision WHERE id = 1').fetchone()[0]
+            keyword_index = KeywordIndex.from_cursor(conn.cursor())
+            coordinates = {
+                (name, country): (lat, lng) for name, country, lat, lng in conn.execute(
+                    'SELECT name, country, latitude, longitude FROM cities '
+                    'WHERE latitude IS NOT NULL AND longitude IS NOT NULL'
+                )
+            }
+            vocabulary = frozenset(keyword for (keyword,) in conn.execute(
+                'SELECT DISTINCT keyword FROM city_keywords UNION SELECT DISTINCT keyword FROM activity_keywords'
+            ))
+        finally:
+            conn.close()
+        return cls(revision, keyword_index, MatrixScoringEngine(keyword_index), coordinates, vocabulary)
+
+    def save(self, path=RANKING_SNAPSHOT_PATH):
+        """Write header + pickle atomically, so a starting worker never reads half a file"""
+        header = {"format": SNAPSHOT_FORMAT, "revision": self.revision, "built_at": self.built_at}
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(json.dumps(header).encode('utf-8') + b'\n')
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path=RANKING_SNAPSHOT_PATH, db_path=CATALOG_DB_PATH):
+        """
+        The snapshot at `path` if it matches the current catalog, else None.
+
+        Only the header is read when the snapshot is stale, so a mismatch
+        costs microseconds before the caller falls back to SQLite.
+        """
+        start = time.perf_counter()
+        try:
+            with open(path, 'rb') as f:
+                header = json.loads(f.readline())
+                if header.get("format") != SNAPSHOT_FORMAT:
+                    log.warning("⚠️ Ranking snapshot has an old format, rebuilding from the database",
+                                path=path, format=header.get("format"))
+                    return None
+                revision = catalog_revision(db_path)
+                if revision is None or header.get("revision") != revision:
+                    log.warning("⚠️ Ranking snapshot is stale (run database/build_snapshot.py)",
+                                path=path, snapshot_revision=header.get("revision"), catalog_revision=revision)
+                    return None
+                # Unpickling allocates a container per city; with the cyclic GC on it
+                # rescans them over and over, which about doubles the load time
+                gc_enabled = gc.isenabled()
+                gc.disable()
+                try:
+                    snapshot = pickle.load(f)
+                finally:
+                    if gc_enabled:
+                        gc.enable()
+        except FileNotFoundError:
+            log.info("Ranking snapshot not found (run database/build_snapshot.py)", path=path)
+            return None
+        except (OSError, ValueError, pickle.UnpicklingError, EOFError, AttributeError) as e:
+            log.warning("⚠️ Ranking snapshot unreadable, rebuilding from the database", path=path, error=str(e))
+            return None
+        snapshot.load_ms = round((time.perf_counter() - start) * 1000, 1)
+        return snapshot
+
+
+def load_snapshot(path=RANKING_SNAPSHOT_PATH, db_path=CATALOG_DB_PATH):
+    """RankingSnapshot for the current catalog, or None (disabled, missing or stale)"""
+    if not RANKING_SNAPSHOT_ENABLED:
+        return None
+    snapshot = RankingSnapshot.load(path, db_path)
+    if snapshot is not None:
+        log.info("✅ Ranking snapshot loaded", version=snapshot.version,
+                 cities=len(snapshot.keyword_index), load_ms=snapshot.load_ms)
+    return snapshot
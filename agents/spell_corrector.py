@@ -0,0 +1,109 @@
+# spell_corrector.py - SYMMETRIC-DELETE (SYMSPELL-STYLE) TYPO CORRECTION
+def edit_distance(a, b, max_distance):
+    """
+    Optimal string alignment distance (Levenshtein plus adjacent swaps).
+
+    Only the diagonal band of width max_distance is computed; returns
+    max_distance + 1 as soon as the distance is known to exceed it.
+    """
+    too_far = max_distance + 1
+    n, m = len(a), len(b)
+    if abs(n - m) > max_distance:
+        return too_far
+
+    previous2 = None
+    previous = [j if j <= max_distance else too_far for j in range(m + 1)]
+    for i in range(1, n + 1):
+        current = [too_far] * (m + 1)
+        if i <= max_distance:
+            current[0] = i
+        row_min = current[0]
+        for j in range(max(1, i - max_distance), min(m, i + max_distance) + 1):
+            best = previous[j - 1] if a[i - 1] == b[j - 1] else previous[j - 1] + 1
+            if previous[j] + 1 < best:
+                best = previous[j] + 1
+            if current[j - 1] + 1 < best:
+                best = current[j - 1] + 1
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1] and previous2[j - 2] + 1 < best:
+                best = previous2[j - 2] + 1
+            current[j] = best if best < too_far else too_far
+            if best < row_min:
+                row_min = best
+        if row_min > max_distance:
+            return too_far
+        previous2, previous = previous, current
+    return previous[m]
+
+
+class SymSpellCorrector:
+    """
+    Corrects misspelled words against a fixed vocabulary.
+
+    Every word's deletions up to `max_distance` characters are precomputed
+    into a dictionary, so a lookup only generates the query's own deletions
+    and verifies the few candidates that share one - no scan of the
+    vocabulary. The allowed distance grows with word length: short words
+    are never corrected, medium words allow one edit, long ones two.
+    """
+
+    def __init__(self, words, max_distance=2, min_length=5, long_word_length=9):
+        self.words = frozenset(words)
+        self.max_distance = max_distance
+        self.min_length = min_length
+        self.long_word_length = long_word_length
+
+        self._deletes = {}  # deletion variant -> set of vocabulary words
+        for word in self.words:
+            for variant in self._variants(word, max_distance):
+                self._deletes.setdefault(variant, set()).add(word)
+
+        self.corrections = 0
+
+    def __len__(self):
+        return len(self.words)
+
+    @staticmethod
+    def _variants(word, distance):
+        """The word and every string reachable by deleting up to `distance` characters"""
+        variants = {word}
+        frontier = {word}
+        for _ in range(distance):
+            frontier = {w[:i] + w[i + 1:] for w in frontier if len(w) > 1 for i in range(len(w))}
+            variants |= frontier
+        return variants
+
+    def allowed_distance(self, word):
+        """Edit budget for a word of this length"""
+        if len(word) < self.min_length:
+            return 0
+        if len(word) < self.long_word_length:
+            return min(1, self.max_distance)
+        return self.max_distance
+
+    def correct(self, word):
+        """Closest vocabulary word within the edit budget, or None"""
+        if word in self.words:
+            return word
+
+        budget = self.allowed_distance(word)
+        if budget == 0:
+            return None
+
+        candidates = set()
+        for variant in self._variants(word, budget):
+            candidates.update(self._deletes.get(variant, ()))
+
+        best = None
+        best_key = None
+        for candidate in candidates:
+            distance = edit_distance(word, candidate, budget)
+            if distance > budget:
+                continue
+            # Fewest edits, then closest length, then alphabetical for determinism
+            key = (distance, abs(len(candidate) - len(word)), candidate)
+            if best_key is None or key < best_key:
+                best, best_key = candidate, key
+
+        if best is not None:
+            self.corrections += 1
+        return best
@@ -0,0 +1,284 @@
+# bench_stages.py - PER-STAGE TIMINGS AND ALLOCATIONS ON SYNTHETIC CATALOGS
+"""
+Runs each planning stage over a fixed query corpus against synthetic
+catalogs of several sizes, with the stub LLM instead of OpenAI:
+
+    preferences  PreferenceAgent.extract_preferences
+    ranking      DestinationAgent.rank_cities_with_semantic_ai
+    diversity    DestinationAgent._apply_diversity
+    routing      ItineraryAgent.sort_by_geography
+    itinerary    ItineraryAgent.build_itinerary
+
+Per stage and catalog size it reports wall-clock percentiles and, from a
+separate tracemalloc pass, peak and retained memory per call. Results are
+written as JSON so runs can be diffed across engines and commits.
+
+    python benchmarks/bench_stages.py --sizes 500,10000 -o bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+# Run from the project root with agent imports working
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+# Offline and uncached by default - agents read these at import time
+os.environ.setdefault("LLM_BACKEND", "stub")
+os.environ.setdefault("LLM_CACHE_ENABLED", "false")
+# Saved embeddings belong to the real catalog; --retrieval embedding builds them per catalog
+os.environ.setdefault("CITY_RETRIEVAL", "llm")
+
+from benchmarks.synthetic_catalog import generate_catalog
+from agents import destination_agent as destination_module
+from agents.db_pool import ReadPool
+from agents.destination_agent import DestinationAgent
+from agents.embeddings import EmbeddingIndex, get_embedder
+from agents.itinerary_agent import ItineraryAgent
+from agents.llm_client import LLM_STUB_LATENCY_MS
+from agents.logs import configure_logging
+from agents.preference_agent import PreferenceAgent
+
+DEFAULT_SIZES = "500,10000,100000"
+QUERIES_PATH = os.path.join("benchmarks", "queries.json")
+CATALOG_DIR = os.path.join("benchmarks", "catalogs")
+STAGES = ("preferences", "ranking", "diversity", "routing", "itinerary")
+
+
+def log(message):
+    print(message, file=sys.stderr, flush=True)
+
+
+def catalog_path(size, seed):
+    """Synthetic catalog for a size, generated on first use"""
+    path = os.path.join(CATALOG_DIR, f"catalog_{size}_seed{seed}.db")
+    if not os.path.exists(path):
+        log(f"[CATALOG] Generating {size} cities...")
+        generate_catalog(path, size, seed)
+    return path
+
+
+def embedding_index(path, size, seed):
+    """EmbeddingIndex for a synthetic catalog, saved next to it"""
+    directory = os.path.join(CATALOG_DIR, f"embeddings_{size}_seed{seed}")
+    try:
+        index = EmbeddingIndex.load(directory)
+    except ValueError:
+        index = None  # Saved by an older build (e.g. no score calibration) - rebuild it
+    if index is None:
+        log(f"[CATALOG] Embedding {size} cities...")
+        pool = ReadPool(path)
+        index = EmbeddingIndex.build(
+            pool.execute('SELECT id, name, country, description, keywords FROM cities ORDER BY id'),
+            pool.execute('SELECT city_id, activity FROM activities ORDER BY id'),
+            get_embedder()
+        )
+        pool.close()
+        index.save(directory)
+        index = EmbeddingIndex.load(directory)
+    return index
+
+
+def clear_caches(preference_agent, destination_agent):
+    """Drop per-request caches so every timed call does the full work"""
+    preference_agent.cache.clear()
+    preference_agent.expansion_batcher.term_cache.clear()
+    full_text = destination_agent.full_text
+    if full_text is not None:
+        full_text._city_hits.cache_clear()
+        full_text._city_sets.cache_clear()
+    description_hits = getattr(destination_agent.scorer, "_description_hits", None)
+    if description_hits is not None:
+        description_hits.cache_clear()
+
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def measure(function, calls, repeat, reset):
+    """Timings over `repeat` passes of the calls, then one tracemalloc pass"""
+    timings = []
+    for _ in range(repeat):
+        for args in calls:
+            reset()
+            start = time.perf_counter()
+            function(*args)
+            timings.append((time.perf_counter() - start) * 1000)
+
+    peaks, retained_bytes, retained_blocks = [], [], []
+    tracemalloc.start()
+    try:
+        for args in calls:
+            reset()
+            before = tracemalloc.take_snapshot()
+            tracemalloc.reset_peak()
+            start_bytes = tracemalloc.get_traced_memory()[0]
+            function(*args)
+            current, peak = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot()
+            peaks.append(peak - start_bytes)
+            retained_bytes.append(current - start_bytes)
+            retained_blocks.append(sum(stat.count_diff for stat in after.compare_to(before, "filename")))
+            del before, after
+    finally:
+        tracemalloc.stop()
+
+    timings.sort()
+    return {
+        "calls": len(timings),
+        "time_ms": {
+            "mean": round(statistics.fmean(timings), 3),
+            "p50": round(percentile(timings, 0.5), 3),
+            "p95": round(percentile(timings, 0.95), 3),
+            "min": round(timings[0], 3),
+            "max": round(timings[-1], 3),
+        },
+        "alloc": {
+            "peak_kb_mean": round(statistics.fmean(peaks) / 1024, 1),
+            "peak_kb_max": round(max(peaks) / 1024, 1),
+            "retained_kb_mean": round(statistics.fmean(retained_bytes) / 1024, 1),
+            "retained_blocks_mean": round(statistics.fmean(retained_blocks), 1),
+        },
+    }
+
+
+def bench_catalog(size, args, queries, stages):
+    """All selected stages against one catalog size"""
+    path = catalog_path(size, args.seed)
+
+    start = time.perf_counter()
+    pool = ReadPool(path)
+    preference_agent = PreferenceAgent()
+    destination_agent = DestinationAgent(scoring_engine=args.engine, db_pool=pool)
+    itinerary_agent = ItineraryAgent(db_pool=pool)
+    setup_ms = (time.perf_counter() - start) * 1000
+
+    if args.retrieval == "embedding":
+        destination_agent.retriever = embedding_index(path, size, args.seed)
+    else:
+        destination_agent.retriever = None
+
+    reset = lambda: clear_caches(preference_agent, destination_agent)
+
+    # Each stage's inputs come from running the previous stage once
+    interests = [preference_agent.extract_preferences(q["user_input"]) for q in queries]
+    num_cities = [itinerary_agent.calculate_days_per_city(q["days"])[1] for q in queries]
+
+    diversity_inputs = []
+    apply_diversity = destination_agent._apply_diversity
+
+    def record_diversity(scored_cities, query_interests, count):
+        diversity_inputs.append((list(scored_cities), query_interests, count))
+        return apply_diversity(scored_cities, query_interests, count)
+
+    destination_agent._apply_diversity = record_diversity
+    try:
+        ranked = [destination_agent.rank_cities_with_semantic_ai(i, n) for i, n in zip(interests, num_cities)]
+    finally:
+        del destination_agent._apply_diversity
+
+    calls = {
+        "preferences": (preference_agent.extract_preferences, [(q["user_input"],) for q in queries]),
+        "ranking": (destination_agent.rank_cities_with_semantic_ai, list(zip(interests, num_cities))),
+        "diversity": (destination_agent._apply_diversity, diversity_inputs),
+        "routing": (itinerary_agent.sort_by_geography, [(r[:n],) for r, n in zip(ranked, num_cities)]),
+        "itinerary": (
+            itinerary_agent.build_itinerary,
+            [(r, q["days"], i) for r, q, i in zip(ranked, queries, interests)]
+        ),
+    }
+
+    results = []
+    for stage in stages:
+        function, stage_calls = calls[stage]
+        result = measure(function, stage_calls, args.repeat, reset)
+        results.append({"catalog_size": size, "stage": stage, **result})
+
+    pool.close()
+
+    log(f"[BENCH] {size} cities (setup {setup_ms:.0f} ms)")
+    for result in results:
+        t, a = result["time_ms"], result["alloc"]
+        log(f"   {result['stage']:<12} p50 {t['p50']:>9.3f} ms  p95 {t['p95']:>9.3f} ms  "
+            f"peak {a['peak_kb_mean']:>9.1f} KB  retained {a['retained_blocks_mean']:>8.1f} blocks")
+    return {"catalog_size": size, "setup_ms": round(setup_ms, 1)}, results
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark each planning stage on synthetic catalogs.")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help=f"Catalog sizes (default {DEFAULT_SIZES})")
+    parser.add_argument("--stages", default=",".join(STAGES), help="Stages to run (default all)")
+    parser.add_argument("--engine", default=destination_module.SCORING_ENGINE, choices=("index", "matrix"))
+    parser.add_argument("--retrieval", default="llm", choices=("llm", "embedding"))
+    parser.add_argument("--repeat", type=int, default=5, help="Timed passes over the query corpus")
+    parser.add_argument("--queries", default=QUERIES_PATH)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", help="Write JSON here (default stdout)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Show agent logs (INFO and up) on stderr")
+    args = parser.parse_args()
+    if args.verbose:
+        configure_logging(stream=sys.stderr)
+
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    stages = [stage.strip() for stage in args.stages.split(",") if stage.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"Unknown stages: {', '.join(sorted(unknown))}")
+
+    with open(args.queries, "r", encoding="utf-8") as f:
+        queries = json.load(f)
+
+    catalogs, results = [], []
+    for size in sizes:
+        catalog, size_results = bench_catalog(size, args, queries, stages)
+        catalogs.append(catalog)
+        results.extend(size_results)
+
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "scoring_engine": args.engine,
+            "text_search": destination_module.TEXT_SEARCH,
+            "retrieval": args.retrieval,
+            "llm_backend": os.environ["LLM_BACKEND"],
+            "llm_latency_ms": LLM_STUB_LATENCY_MS,
+            "queries": len(queries),
+            "repeat": args.repeat,
+            "seed": args.seed,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        "catalogs": catalogs,
+        "results": results,
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        log(f"[SUCCESS] Results written to {args.output}")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
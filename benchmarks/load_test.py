@@ -0,0 +1,286 @@
+# load_test.py - END-TO-END LOAD DRIVER FOR THE FASTAPI APP
+"""
+Replays the query corpus against /plan-trip at a fixed concurrency and
+reports throughput, latency percentiles, error rates and event-loop lag.
+
+By default main:app runs in-process (httpx ASGI transport), so the lag
+monitor shares the server's event loop and shows how long request handling
+blocks it. --uvicorn starts a local uvicorn worker instead, and --url
+targets a server that is already running (lag is then the driver's own).
+The stub LLM answers every AI call after --llm-latency-ms.
+
+    python benchmarks/load_test.py --concurrency 32 --requests 500
+    python benchmarks/load_test.py --uvicorn --concurrency 64 --duration 30 -o load.json
+"""
+import argparse
+import asyncio
+import contextlib
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+QUERIES_PATH = os.path.join("benchmarks", "queries.json")
+LAG_INTERVAL = 0.01
+
+
+def log(message):
+    print(message, file=sys.stderr, flush=True)
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return round(sorted_values[index], 3)
+
+
+def summarize(values):
+    values = sorted(values)
+    return {
+        "mean": round(statistics.fmean(values), 3) if values else None,
+        "p50": percentile(values, 0.5),
+        "p90": percentile(values, 0.9),
+        "p99": percentile(values, 0.99),
+        "max": round(values[-1], 3) if values else None,
+    }
+
+
+class LoopLagMonitor:
+    """Samples how late the event loop wakes a sleeper - time other callbacks held it"""
+
+    def __init__(self, interval=LAG_INTERVAL):
+        self.interval = interval
+        self.samples = []
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - start - self.interval) * 1000)
+
+    def start(self):
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+
+
+def configure_stub(args):
+    """Environment for the app under test - set before main is imported or uvicorn starts"""
+    env = {
+        "LLM_BACKEND": "stub",
+        "LLM_STUB_LATENCY_MS": str(args.llm_latency_ms),
+        "LLM_CACHE_ENABLED": "false",
+    }
+    if args.no_plan_cache:
+        env["PLAN_CACHE_ENABLED"] = "false"
+    if not args.verbose:
+        env["LOG_LEVEL"] = "WARNING"
+    os.environ.update(env)
+    return env
+
+
+@contextlib.asynccontextmanager
+async def in_process_client(args):
+    configure_stub(args)
+    # main logs to stdout - keep it clear of the JSON report
+    with contextlib.redirect_stdout(sys.stderr):
+        import main
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=args.timeout) as client:
+        yield client
+
+
+@contextlib.asynccontextmanager
+async def uvicorn_client(args):
+    configure_stub(args)
+    command = [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1",
+               "--port", str(args.port), "--log-level", "warning"]
+    output = None if args.verbose else subprocess.DEVNULL
+    server = subprocess.Popen(command, env=os.environ.copy(), stdout=output, stderr=output)
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout) as client:
+            deadline = time.monotonic() + 120
+            while True:
+                if server.poll() is not None:
+                    raise RuntimeError(f"uvicorn exited with code {server.returncode}")
+                try:
+                    if (await client.get("/health")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if time.monotonic() > deadline:
+                    raise RuntimeError("uvicorn did not become healthy within 120s")
+                await asyncio.sleep(0.25)
+            yield client
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+@contextlib.asynccontextmanager
+async def remote_client(args):
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout) as client:
+        yield client
+
+
+async def send(client, endpoint, query):
+    """(latency ms, outcome) - outcome is the status code or the exception name"""
+    start = time.perf_counter()
+    try:
+        response = await client.post(endpoint, json=query)
+        await response.aread()
+        outcome = response.status_code
+    except httpx.HTTPError as e:
+        outcome = type(e).__name__
+    return (time.perf_counter() - start) * 1000, outcome
+
+
+async def run_load(client, args, queries):
+    """Closed loop: `concurrency` workers each send their next request as soon as one finishes"""
+    mix = itertools.cycle(queries)
+    latencies, outcomes = [], {}
+    remaining = args.requests
+    deadline = time.perf_counter() + args.duration if args.duration else None
+
+    def next_query():
+        nonlocal remaining
+        if deadline is not None:
+            return next(mix) if time.perf_counter() < deadline else None
+        if remaining <= 0:
+            return None
+        remaining -= 1
+        return next(mix)
+
+    async def worker():
+        while True:
+            query = next_query()
+            if query is None:
+                return
+            latency, outcome = await send(client, args.endpoint, query)
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+            if outcome == 200:
+                latencies.append(latency)
+
+    monitor = LoopLagMonitor()
+    monitor.start()
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+    await monitor.stop()
+
+    total = sum(outcomes.values())
+    errors = total - outcomes.get(200, 0)
+    return {
+        "requests": total,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 2) if elapsed else None,
+        "latency_ms": summarize(latencies),
+        "errors": errors,
+        "error_rate": round(errors / total, 4) if total else None,
+        "outcomes": {str(outcome): count for outcome, count in sorted(outcomes.items(), key=str)},
+        "loop_lag_ms": summarize(monitor.samples),
+    }
+
+
+async def main_async(args):
+    with open(args.queries, "r", encoding="utf-8") as f:
+        queries = json.load(f)
+
+    if args.url:
+        target, client_context = args.url, remote_client(args)
+    elif args.uvicorn:
+        target, client_context = "uvicorn", uvicorn_client(args)
+    else:
+        target, client_context = "in-process", in_process_client(args)
+
+    async with client_context as client:
+        # Agent startup and first-touch costs stay out of the measurement
+        for query in queries[:args.warmup]:
+            latency, outcome = await send(client, args.endpoint, query)
+            if outcome != 200:
+                log(f"[WARNING] Warmup request failed: {outcome}")
+
+        log(f"[LOAD] {target}: {args.endpoint} at concurrency {args.concurrency}, "
+            f"{f'{args.duration}s' if args.duration else f'{args.requests} requests'}")
+        result = await run_load(client, args, queries)
+
+    return {
+        "meta": {
+            "target": target,
+            "endpoint": args.endpoint,
+            "concurrency": args.concurrency,
+            "llm_latency_ms": args.llm_latency_ms if not args.url else None,
+            "plan_cache": not args.no_plan_cache if not args.url else None,
+            "queries": len(queries),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        "result": result,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test /plan-trip with a stub LLM.")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--uvicorn", action="store_true", help="Start a local uvicorn worker instead of in-process")
+    target.add_argument("--url", help="Test a server that is already running (e.g. http://127.0.0.1:8000)")
+    parser.add_argument("--port", type=int, default=8765, help="Port for --uvicorn")
+    parser.add_argument("-c", "--concurrency", type=int, default=16)
+    parser.add_argument("-n", "--requests", type=int, default=200, help="Total requests (ignored with --duration)")
+    parser.add_argument("-d", "--duration", type=float, help="Run for this many seconds instead")
+    parser.add_argument("--endpoint", default="/plan-trip")
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0, help="Stub LLM round trip")
+    parser.add_argument("--no-plan-cache", action="store_true", help="Plan every request from scratch")
+    parser.add_argument("--warmup", type=int, default=1, help="Requests sent before measuring")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout in seconds")
+    parser.add_argument("--queries", default=QUERIES_PATH)
+    parser.add_argument("-o", "--output", help="Write JSON here (default stdout)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Show app logs (INFO and up) on stderr")
+    args = parser.parse_args()
+    args.concurrency = max(1, args.concurrency)
+
+    try:
+        report = asyncio.run(main_async(args))
+    except RuntimeError as e:
+        log(f"[ERROR] {e}")
+        sys.exit(1)
+
+    result = report["result"]
+    latency, lag = result["latency_ms"], result["loop_lag_ms"]
+    log(f"   {result['requests']} requests in {result['elapsed_s']}s = {result['throughput_rps']} req/s, "
+        f"{result['errors']} errors ({result['outcomes']})")
+    log(f"   latency p50 {latency['p50']} ms  p90 {latency['p90']} ms  p99 {latency['p99']} ms  max {latency['max']} ms")
+    log(f"   loop lag p50 {lag['p50']} ms  p99 {lag['p99']} ms  max {lag['max']} ms")
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        log(f"[SUCCESS] Results written to {args.output}")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
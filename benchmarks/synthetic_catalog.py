@@ -0,0 +1,186 @@
+# synthetic_catalog.py - SCALED-UP CATALOGS FOR BENCHMARKING
+"""
+Builds synthetic travel catalogs of any size with the same schema (keyword
+tables, FTS5 indexes, coordinates, triggers) as travel_data.db.
+
+Every synthetic city is a perturbed copy of a random real city, so keyword
+co-occurrence ("wine" with "french"), keywords per city, activities per city
+and description text follow the real catalog that setup_database.py builds
+from database/destinations.json. Output is deterministic for a given seed.
+
+    python benchmarks/synthetic_catalog.py 10000 -o benchmarks/catalogs/catalog_10000.db
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+
+SOURCE_DB = 'travel_data.db'
+
+# Chance a template keyword is kept, and how many random ones get mixed in
+KEEP_KEYWORD = 0.8
+MAX_EXTRA_KEYWORDS = 2
+# Chance one template activity is swapped for a random one from the catalog
+SWAP_ACTIVITY = 0.5
+# Degrees of jitter around the template city's coordinates
+COORDINATE_JITTER = 1.5
+
+FTS_SHADOW_SUFFIXES = ('_data', '_idx', '_docsize', '_config', '_content')
+
+
+def load_source(path=SOURCE_DB):
+    """Real cities (with keyword and activity lists) and the catalog schema"""
+    conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    try:
+        schema = conn.execute(
+            "SELECT type, name, sql FROM sqlite_master "
+            "WHERE sql IS NOT NULL AND name NOT LIKE 'sqlite_%' ORDER BY rowid"
+        ).fetchall()
+
+        activities = {}
+        for city_id, activity, activity_keywords in conn.execute(
+            'SELECT city_id, activity, keywords FROM activities ORDER BY id'
+        ):
+            activities.setdefault(city_id, []).append((activity, activity_keywords or ''))
+
+        cities = [
+            {
+                'name': name, 'country': country, 'description': description,
+                'latitude': lat, 'longitude': lng,
+                'keywords': _split_keywords(keywords),
+                'activities': activities.get(city_id, []),
+            }
+            for city_id, name, country, description, keywords, lat, lng in conn.execute(
+                'SELECT id, name, country, description, keywords, latitude, longitude FROM cities ORDER BY id'
+            )
+        ]
+    finally:
+        conn.close()
+    return cities, schema
+
+
+def _split_keywords(keywords):
+    """Keyword column -> distinct keywords, normalized like the keyword triggers do"""
+    return list(dict.fromkeys(k.strip().lower() for k in (keywords or '').split(',') if k.strip()))
+
+
+def _schema_statements(schema):
+    """(tables and indexes, triggers) - FTS shadow tables are created by their virtual table"""
+    virtual = {name for type_, name, sql in schema if sql.upper().startswith('CREATE VIRTUAL TABLE')}
+    shadow = {v + suffix for v in virtual for suffix in FTS_SHADOW_SUFFIXES}
+    tables = [sql for type_, name, sql in schema if type_ != 'trigger' and name not in shadow]
+    triggers = [sql for type_, name, sql in schema if type_ == 'trigger']
+    return tables, triggers, virtual
+
+
+def synthesize(templates, num_cities, seed=0):
+    """num_cities synthetic city dicts modeled on the template cities"""
+    rng = random.Random(seed)
+    keyword_pool = [kw for city in templates for kw in city['keywords']]  # frequency-weighted
+    activity_pool = [act for city in templates for act in city['activities']]
+
+    cities = []
+    for i in range(num_cities):
+        template = rng.choice(templates)
+
+        keywords = [kw for kw in template['keywords'] if rng.random() < KEEP_KEYWORD]
+        for _ in range(rng.randint(0, MAX_EXTRA_KEYWORDS)):
+            keywords.append(rng.choice(keyword_pool))
+        keywords = list(dict.fromkeys(keywords))
+
+        activities = list(template['activities'])
+        if activities and rng.random() < SWAP_ACTIVITY:
+            activities[rng.randrange(len(activities))] = rng.choice(activity_pool)
+
+        lat, lng = template['latitude'], template['longitude']
+        if lat is not None and lng is not None:
+            lat = max(-89.0, min(89.0, lat + rng.gauss(0, COORDINATE_JITTER)))
+            lng = (lng + rng.gauss(0, COORDINATE_JITTER) + 180) % 360 - 180
+
+        cities.append({
+            'name': f"{template['name']} {i + 1}",
+            'country': template['country'],
+            'description': template['description'],
+            'latitude': lat, 'longitude': lng,
+            'keywords': keywords,
+            'activities': activities,
+        })
+    return cities
+
+
+def write_catalog(path, cities, schema):
+    """Create a catalog database at path (replacing it) holding the given cities"""
+    if os.path.exists(path):
+        os.remove(path)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    tables, triggers, virtual = _schema_statements(schema)
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute('PRAGMA journal_mode = OFF')
+        conn.execute('PRAGMA synchronous = OFF')
+        for sql in tables:
+            conn.execute(sql)
+
+        # Bulk load with the triggers off, then fill the derived tables in one go
+        city_rows, city_keyword_rows, activity_rows, activity_keyword_rows = [], [], [], []
+        activity_id = 0
+        for city_id, city in enumerate(cities, 1):
+            city_rows.append((city_id, city['name'], city['country'], city['description'],
+                              ','.join(city['keywords']), city['latitude'], city['longitude']))
+            city_keyword_rows.extend((city_id, kw) for kw in city['keywords'])
+            for activity, keywords in city['activities']:
+                activity_id += 1
+                activity_rows.append((activity_id, city_id, activity, keywords))
+                activity_keyword_rows.extend((activity_id, city_id, kw) for kw in _split_keywords(keywords))
+
+        conn.executemany(
+            'INSERT INTO cities (id, name, country, description, keywords, latitude, longitude) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)', city_rows
+        )
+        conn.executemany('INSERT INTO city_keywords (city_id, keyword, weight) VALUES (?, ?, 1.0)', city_keyword_rows)
+        conn.executemany('INSERT INTO activities (id, city_id, activity, keywords) VALUES (?, ?, ?, ?)', activity_rows)
+        conn.executemany(
+            'INSERT INTO activity_keywords (activity_id, city_id, keyword) VALUES (?, ?, ?)', activity_keyword_rows
+        )
+        for table in virtual:
+            conn.execute(f"INSERT INTO {table} ({table}) VALUES ('rebuild')")
+
+        for sql in triggers:
+            conn.execute(sql)
+        conn.commit()
+    finally:
+        conn.close()
+
+    return {'cities': len(city_rows), 'activities': len(activity_rows)}
+
+
+def generate_catalog(path, num_cities, seed=0, source=SOURCE_DB):
+    """Synthesize and write a catalog; returns its row counts"""
+    templates, schema = load_source(source)
+    return write_catalog(path, synthesize(templates, num_cities, seed), schema)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic travel catalog for benchmarks.")
+    parser.add_argument('cities', type=int, help="Number of cities")
+    parser.add_argument('-o', '--output', help="Database path (default benchmarks/catalogs/catalog_<cities>.db)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--source', default=SOURCE_DB, help="Real catalog to model the cities on")
+    args = parser.parse_args()
+
+    output = args.output or os.path.join('benchmarks', 'catalogs', f'catalog_{args.cities}.db')
+    if not os.path.exists(args.source):
+        print("[ERROR] Database not found! Run setup_database.py first.", file=sys.stderr)
+        sys.exit(1)
+
+    start = time.time()
+    counts = generate_catalog(output, args.cities, args.seed, args.source)
+    print(f"[SUCCESS] {output}: {counts['cities']} cities, {counts['activities']} activities "
+          f"in {time.time() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
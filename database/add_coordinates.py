@@ -0,0 +1,70 @@
+# add_coordinates.py - Latitude/longitude for every city
+"""
+Adds latitude / longitude columns to cities and fills them from
+database/coordinates.json: the city's own entry when there is one,
+otherwise its country's capital. Used by the itinerary route optimizer.
+Safe to run any number of times.
+"""
+import sqlite3
+import json
+import sys
+import os
+
+# Force UTF-8 output for Windows compatibility
+if sys.platform == 'win32':
+    import io
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
+
+print("\n[GEO] Adding city coordinates...\n")
+
+if not os.path.exists('travel_data.db'):
+    print("[ERROR] Database not found!")
+    sys.exit(1)
+
+coordinates_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'coordinates.json')
+with open(coordinates_path, 'r', encoding='utf-8') as f:
+    coordinates = json.load(f)
+
+conn = sqlite3.connect('travel_data.db')
+cursor = conn.cursor()
+
+cursor.execute('PRAGMA table_info(cities)')
+columns = {row[1] for row in cursor.fetchall()}
+for column in ('latitude', 'longitude'):
+    if column not in columns:
+        cursor.execute(f'ALTER TABLE cities ADD COLUMN {column} REAL')
+        print(f"[OK] Added cities.{column}")
+
+cursor.execute('SELECT id, name, country FROM cities')
+cities = cursor.fetchall()
+
+city_count = 0
+country_count = 0
+missing = []
+for city_id, name, country in cities:
+    point = coordinates['cities'].get(country, {}).get(name)
+    if point:
+        city_count += 1
+    else:
+        point = coordinates['countries'].get(country)
+        if point:
+            country_count += 1
+        else:
+            missing.append(f"{name}, {country}")
+            point = (None, None)
+    cursor.execute('UPDATE cities SET latitude = ?, longitude = ? WHERE id = ?', (point[0], point[1], city_id))
+
+conn.commit()
+conn.close()
+
+for city in missing:
+    print(f"[WARNING] No coordinates for {city}")
+
+print(f"\n{'='*60}")
+print("[SUCCESS] Coordinates added!")
+print(f"{'='*60}")
+print(f"   * From city entries: {city_count}")
+print(f"   * From country capitals: {country_count}")
+print(f"   * Missing: {len(missing)}")
+print(f"{'='*60}\n")
@@ -0,0 +1,42 @@
+# build_embeddings.py - Precompute city & activity vectors for embedding retrieval
+import sqlite3
+import sys
+import os
+import time
+
+# Allow "python database/build_embeddings.py" from the project root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.embeddings import EmbeddingIndex, get_embedder, EMBEDDINGS_DIR
+
+print("\n[EMBED] Building embedding index for city retrieval...\n")
+
+if not os.path.exists('travel_data.db'):
+    print("[ERROR] Database not found!")
+    sys.exit(1)
+
+conn = sqlite3.connect('travel_data.db')
+cursor = conn.cursor()
+
+cursor.execute('SELECT id, name, country, description, keywords FROM cities ORDER BY id')
+cities = cursor.fetchall()
+
+cursor.execute('SELECT city_id, activity FROM activities ORDER BY id')
+activities = cursor.fetchall()
+
+conn.close()
+
+embedder = get_embedder()
+print(f"[INFO] Backend: {embedder.name}")
+
+start = time.time()
+index = EmbeddingIndex.build(cities, activities, embedder)
+index.save(EMBEDDINGS_DIR)
+
+print(f"\n{'='*60}")
+print(f"[SUCCESS] Embedding index built in {time.time() - start:.1f}s")
+print(f"{'='*60}")
+print(f"   * Cities embedded: {len(cities)}")
+print(f"   * Activities embedded: {len(activities)}")
+print(f"   * Output folder: {EMBEDDINGS_DIR}/")
+print(f"{'='*60}\n")
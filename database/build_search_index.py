@@ -0,0 +1,98 @@
+# build_search_index.py - FTS5 full-text index over descriptions and activities
+"""
+Creates cities_fts / activities_fts (external-content FTS5 tables with
+porter stemming) plus triggers that keep them in step with later inserts,
+updates and deletes, then rebuilds both from the current rows.
+Safe to run any number of times.
+"""
+import sqlite3
+import sys
+import os
+
+# Force UTF-8 output for Windows compatibility
+if sys.platform == 'win32':
+    import io
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
+
+print("\n[FTS] Building full-text search index...\n")
+
+if not os.path.exists('travel_data.db'):
+    print("[ERROR] Database not found!")
+    sys.exit(1)
+
+conn = sqlite3.connect('travel_data.db')
+cursor = conn.cursor()
+
+try:
+    cursor.executescript('''
+    CREATE VIRTUAL TABLE IF NOT EXISTS cities_fts USING fts5(
+        description, content='cities', content_rowid='id',
+        tokenize='porter unicode61 remove_diacritics 2'
+    );
+
+    CREATE VIRTUAL TABLE IF NOT EXISTS activities_fts USING fts5(
+        activity, content='activities', content_rowid='id',
+        tokenize='porter unicode61 remove_diacritics 2'
+    );
+
+    DROP TRIGGER IF EXISTS trg_cities_fts_insert;
+    CREATE TRIGGER trg_cities_fts_insert AFTER INSERT ON cities BEGIN
+        INSERT INTO cities_fts (rowid, description) VALUES (NEW.id, NEW.description);
+    END;
+
+    DROP TRIGGER IF EXISTS trg_cities_fts_update;
+    CREATE TRIGGER trg_cities_fts_update AFTER UPDATE OF description ON cities BEGIN
+        INSERT INTO cities_fts (cities_fts, rowid, description) VALUES ('delete', OLD.id, OLD.description);
+        INSERT INTO cities_fts (rowid, description) VALUES (NEW.id, NEW.description);
+    END;
+
+    DROP TRIGGER IF EXISTS trg_cities_fts_delete;
+    CREATE TRIGGER trg_cities_fts_delete AFTER DELETE ON cities BEGIN
+        INSERT INTO cities_fts (cities_fts, rowid, description) VALUES ('delete', OLD.id, OLD.description);
+    END;
+
+    DROP TRIGGER IF EXISTS trg_activities_fts_insert;
+    CREATE TRIGGER trg_activities_fts_insert AFTER INSERT ON activities BEGIN
+        INSERT INTO activities_fts (rowid, activity) VALUES (NEW.id, NEW.activity);
+    END;
+
+    DROP TRIGGER IF EXISTS trg_activities_fts_update;
+    CREATE TRIGGER trg_activities_fts_update AFTER UPDATE OF activity ON activities BEGIN
+        INSERT INTO activities_fts (activities_fts, rowid, activity) VALUES ('delete', OLD.id, OLD.activity);
+        INSERT INTO activities_fts (rowid, activity) VALUES (NEW.id, NEW.activity);
+    END;
+
+    DROP TRIGGER IF EXISTS trg_activities_fts_delete;
+    CREATE TRIGGER trg_activities_fts_delete AFTER DELETE ON activities BEGIN
+        INSERT INTO activities_fts (activities_fts, rowid, activity) VALUES ('delete', OLD.id, OLD.activity);
+    END;
+    ''')
+except sqlite3.OperationalError as e:
+    # Python builds without FTS5 fall back to substring matching at runtime
+    print(f"[WARNING] FTS5 not available in this SQLite build: {e}")
+    conn.close()
+    sys.exit(0)
+
+# Index everything already in the tables
+cursor.execute("INSERT INTO cities_fts (cities_fts) VALUES ('rebuild')")
+cursor.execute("INSERT INTO activities_fts (activities_fts) VALUES ('rebuild')")
+cursor.execute("INSERT INTO cities_fts (cities_fts) VALUES ('optimize')")
+cursor.execute("INSERT INTO activities_fts (activities_fts) VALUES ('optimize')")
+
+conn.commit()
+
+cursor.execute('SELECT COUNT(*) FROM cities')
+total_cities = cursor.fetchone()[0]
+cursor.execute('SELECT COUNT(*) FROM activities')
+total_activities = cursor.fetchone()[0]
+
+conn.close()
+
+print(f"{'='*60}")
+print("[SUCCESS] Full-text index built!")
+print(f"{'='*60}")
+print(f"   * City descriptions indexed: {total_cities}")
+print(f"   * Activities indexed: {total_activities}")
+print("   * Tokenizer: porter stemming + unicode61")
+print(f"{'='*60}\n")
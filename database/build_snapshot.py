@@ -0,0 +1,62 @@
+# build_snapshot.py - Prebuild the ranking indexes so workers start without re-indexing
+"""
+Installs the catalog_revision counter (plus triggers that bump it on every
+write to the catalog tables), then builds the keyword vocabulary, inverted
+keyword index, score matrix and city coordinates and saves them to
+snapshots/ranking.pkl (RANKING_SNAPSHOT_PATH). Workers load the snapshot at
+startup while the revision still matches, and rebuild from SQLite otherwise.
+Safe to run any number of times.
+"""
+import sqlite3
+import sys
+import os
+import time
+
+# Allow "python database/build_snapshot.py" from the project root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.snapshot import RankingSnapshot, install_revision_tracking, RANKING_SNAPSHOT_PATH
+
+# Force UTF-8 output for Windows compatibility
+if sys.platform == 'win32':
+    import io
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
+
+print("\n[SNAPSHOT] Building ranking snapshot...\n")
+
+if not os.path.exists('travel_data.db'):
+    print("[ERROR] Database not found!")
+    sys.exit(1)
+
+conn = sqlite3.connect('travel_data.db')
+try:
+    install_revision_tracking(conn)
+except sqlite3.Error as e:
+    print(f"[ERROR] Could not install catalog revision tracking: {e}")
+    sys.exit(1)
+finally:
+    conn.close()
+
+start = time.time()
+snapshot = RankingSnapshot.build('travel_data.db')
+snapshot.save(RANKING_SNAPSHOT_PATH)
+elapsed = time.time() - start
+
+load_start = time.time()
+loaded = RankingSnapshot.load(RANKING_SNAPSHOT_PATH, 'travel_data.db')
+if loaded is None:
+    print("[ERROR] Snapshot could not be read back")
+    sys.exit(1)
+
+print(f"\n{'='*60}")
+print(f"[SUCCESS] Ranking snapshot built in {elapsed:.1f}s")
+print(f"{'='*60}")
+print(f"   * Version: {snapshot.version}")
+print(f"   * Cities indexed: {len(snapshot.keyword_index)}")
+print(f"   * Keywords: {len(snapshot.vocabulary)}")
+print(f"   * Cities with coordinates: {len(snapshot.coordinates)}")
+print(f"   * Size: {os.path.getsize(RANKING_SNAPSHOT_PATH) / 1024:.0f} KB")
+print(f"   * Load time: {(time.time() - load_start) * 1000:.0f} ms")
+print(f"   * Output file: {RANKING_SNAPSHOT_PATH}")
+print(f"{'='*60}\n")
@@ -12,6 +12,10 @@ conn = sqlite3.connect('travel_data.db')
 cursor = conn.cursor()
 
 # Drop existing tables
+cursor.execute('DROP TABLE IF EXISTS activities_fts')
+cursor.execute('DROP TABLE IF EXISTS cities_fts')
+cursor.execute('DROP TABLE IF EXISTS activity_keywords')
+cursor.execute('DROP TABLE IF EXISTS city_keywords')
 cursor.execute('DROP TABLE IF EXISTS activities')
 cursor.execute('DROP TABLE IF EXISTS cities')
 
@@ -22,7 +26,8 @@ CREATE TABLE cities (
     name TEXT NOT NULL,
     country TEXT NOT NULL,
     description TEXT,
-    keywords TEXT
+    keywords TEXT,
+    UNIQUE (name, country)
 )
 ''')
 
@@ -36,6 +41,9 @@ CREATE TABLE activities (
 )
 ''')
 
+# Activities are always looked up by city
+cursor.execute('CREATE INDEX IF NOT EXISTS idx_activities_city_id ON activities(city_id)')
+
 print("[OK] Database tables created\n")
 
 # ====================
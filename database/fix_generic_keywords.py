@@ -36,8 +36,12 @@ generic_keywords = [
     'visit',
 ]
 
-# Get all cities
-cursor.execute('SELECT id, name, country, keywords FROM cities')
+# Only cities carrying a generic keyword (index seek on city_keywords)
+placeholders = ','.join('?' * len(generic_keywords))
+cursor.execute(f'''
+    SELECT id, name, country, keywords FROM cities
+    WHERE id IN (SELECT city_id FROM city_keywords WHERE keyword IN ({placeholders}))
+''', generic_keywords)
 cities = cursor.fetchall()
 
 fixed_count = 0
@@ -0,0 +1,154 @@
+# migrate_keywords.py - Normalized keyword tables, indexes and sync triggers
+"""
+Moves keyword lookups off the comma-separated TEXT columns.
+
+Creates city_keywords / activity_keywords (one indexed row per keyword),
+a UNIQUE (name, country) index on cities and triggers that keep the new
+tables in step with cities.keywords / activities.keywords. The build
+scripts keep writing the TEXT columns as before; the triggers do the rest.
+Safe to run any number of times.
+"""
+import sqlite3
+import sys
+import os
+
+# Force UTF-8 output for Windows compatibility
+if sys.platform == 'win32':
+    import io
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
+
+print("\n[MIGRATE] Normalizing keyword columns...\n")
+
+if not os.path.exists('travel_data.db'):
+    print("[ERROR] Database not found!")
+    sys.exit(1)
+
+conn = sqlite3.connect('travel_data.db')
+cursor = conn.cursor()
+
+# WAL lets the app's read-only connections keep reading while setup scripts write
+cursor.execute('PRAGMA journal_mode=WAL')
+
+# 'a,b,c' -> JSON array '["a","b","c"]' so json_each can split it inside a trigger
+# (triggers can't use recursive CTEs)
+def split_keywords(column):
+    return (
+        f"""json_each('["' || replace(replace(replace(COALESCE({column}, ''), '\\', '\\\\'), '"', '\\"'), ',', '","') || '"]')"""
+    )
+
+city_rows = f"""
+    SELECT NEW.id, lower(trim(value)), 1.0 FROM {split_keywords('NEW.keywords')}
+    WHERE trim(value) != ''
+"""
+activity_rows = f"""
+    SELECT NEW.id, NEW.city_id, lower(trim(value)) FROM {split_keywords('NEW.keywords')}
+    WHERE trim(value) != ''
+"""
+
+cursor.executescript(f'''
+CREATE TABLE IF NOT EXISTS city_keywords (
+    city_id INTEGER NOT NULL REFERENCES cities(id) ON DELETE CASCADE,
+    keyword TEXT NOT NULL,
+    weight REAL NOT NULL DEFAULT 1.0,
+    PRIMARY KEY (city_id, keyword)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS activity_keywords (
+    activity_id INTEGER NOT NULL REFERENCES activities(id) ON DELETE CASCADE,
+    city_id INTEGER NOT NULL,
+    keyword TEXT NOT NULL,
+    PRIMARY KEY (activity_id, keyword)
+) WITHOUT ROWID;
+
+-- "Which cities have keyword X" is an index seek
+CREATE INDEX IF NOT EXISTS idx_city_keywords_keyword ON city_keywords(keyword, city_id);
+CREATE INDEX IF NOT EXISTS idx_activity_keywords_keyword ON activity_keywords(keyword, city_id);
+CREATE INDEX IF NOT EXISTS idx_activity_keywords_city_id ON activity_keywords(city_id);
+
+-- Activities are always looked up by city
+CREATE INDEX IF NOT EXISTS idx_activities_city_id ON activities(city_id);
+
+-- Keep the TEXT columns and the keyword tables in sync
+DROP TRIGGER IF EXISTS trg_cities_keywords_insert;
+CREATE TRIGGER trg_cities_keywords_insert AFTER INSERT ON cities BEGIN
+    INSERT OR IGNORE INTO city_keywords (city_id, keyword, weight) {city_rows};
+END;
+
+DROP TRIGGER IF EXISTS trg_cities_keywords_update;
+CREATE TRIGGER trg_cities_keywords_update AFTER UPDATE OF keywords ON cities BEGIN
+    DELETE FROM city_keywords WHERE city_id = OLD.id;
+    INSERT OR IGNORE INTO city_keywords (city_id, keyword, weight) {city_rows};
+END;
+
+DROP TRIGGER IF EXISTS trg_cities_keywords_delete;
+CREATE TRIGGER trg_cities_keywords_delete AFTER DELETE ON cities BEGIN
+    DELETE FROM city_keywords WHERE city_id = OLD.id;
+END;
+
+DROP TRIGGER IF EXISTS trg_activities_keywords_insert;
+CREATE TRIGGER trg_activities_keywords_insert AFTER INSERT ON activities BEGIN
+    INSERT OR IGNORE INTO activity_keywords (activity_id, city_id, keyword) {activity_rows};
+END;
+
+DROP TRIGGER IF EXISTS trg_activities_keywords_update;
+CREATE TRIGGER trg_activities_keywords_update AFTER UPDATE OF keywords, city_id ON activities BEGIN
+    DELETE FROM activity_keywords WHERE activity_id = OLD.id;
+    INSERT OR IGNORE INTO activity_keywords (activity_id, city_id, keyword) {activity_rows};
+END;
+
+DROP TRIGGER IF EXISTS trg_activities_keywords_delete;
+CREATE TRIGGER trg_activities_keywords_delete AFTER DELETE ON activities BEGIN
+    DELETE FROM activity_keywords WHERE activity_id = OLD.id;
+END;
+''')
+print("[OK] Keyword tables, indexes and triggers ready")
+
+# Duplicate (name, country) rows would block the unique index - keep the first
+cursor.execute('''
+    SELECT name, country, MIN(id), COUNT(*) FROM cities
+    GROUP BY name, country HAVING COUNT(*) > 1
+''')
+duplicates = cursor.fetchall()
+for name, country, keep_id, count in duplicates:
+    cursor.execute('SELECT id FROM cities WHERE name = ? AND country = ? AND id != ?', (name, country, keep_id))
+    drop_ids = [row[0] for row in cursor.fetchall()]
+    for city_id in drop_ids:
+        cursor.execute('DELETE FROM activities WHERE city_id = ?', (city_id,))
+        cursor.execute('DELETE FROM cities WHERE id = ?', (city_id,))
+    print(f"[DEDUP] {name}, {country}: removed {count - 1} duplicate(s)")
+
+cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_cities_name_country ON cities(name, country)')
+
+# Backfill from the TEXT columns (rows written before the triggers existed)
+cursor.execute('DELETE FROM city_keywords')
+cursor.execute(f'''
+    INSERT OR IGNORE INTO city_keywords (city_id, keyword, weight)
+    SELECT cities.id, lower(trim(value)), 1.0 FROM cities, {split_keywords('cities.keywords')}
+    WHERE trim(value) != ''
+''')
+cursor.execute('DELETE FROM activity_keywords')
+cursor.execute(f'''
+    INSERT OR IGNORE INTO activity_keywords (activity_id, city_id, keyword)
+    SELECT activities.id, activities.city_id, lower(trim(value)) FROM activities, {split_keywords('activities.keywords')}
+    WHERE trim(value) != ''
+''')
+
+conn.commit()
+
+cursor.execute('SELECT COUNT(*) FROM city_keywords')
+city_keyword_count = cursor.fetchone()[0]
+cursor.execute('SELECT COUNT(*) FROM activity_keywords')
+activity_keyword_count = cursor.fetchone()[0]
+cursor.execute('SELECT COUNT(DISTINCT keyword) FROM city_keywords')
+distinct_count = cursor.fetchone()[0]
+
+conn.close()
+
+print(f"\n{'='*60}")
+print("[SUCCESS] Keyword migration complete!")
+print(f"{'='*60}")
+print(f"   * City keywords: {city_keyword_count} ({distinct_count} distinct)")
+print(f"   * Activity keywords: {activity_keyword_count}")
+print(f"   * Duplicate cities removed: {len(duplicates)}")
+print(f"{'='*60}\n")
@@ -1,14 +1,28 @@
 # main.py
 from dotenv import load_dotenv
 load_dotenv()
+import codecs
+import io
+import json
 import os
 import sys
+import tempfile
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse, HTMLResponse
+from fastapi.responses import JSONResponse, HTMLResponse, StreamingResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 
+from agents.logs import configure_logging, get_logger, RequestContextMiddleware
 from agents.master_agent import MasterAgent
+from agents.batch_planner import BatchPlanner
+from agents import metrics
+
+# /plan-trips bodies up to this size stay in memory, larger ones spill to a temp file
+BATCH_SPOOL_BYTES = 1024 * 1024
+
+# Log records are written by a background thread, never on the request path
+configure_logging()
+log = get_logger(__name__)
 
 app = FastAPI()
 
@@ -20,6 +34,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# In-flight requests, latency and status per endpoint for /metrics
+app.add_middleware(metrics.MetricsMiddleware)
+
+# Request ids on every log record; "X-Trace: 1" turns on DEBUG tracing for one request
+app.add_middleware(RequestContextMiddleware)
+
 # Serve static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
@@ -58,23 +78,22 @@ async def plan_trip(request: Request):
                 status_code=400
             )
 
-        print(f"\n{'='*50}")
-        print(f"Planning trip: '{user_input}' for {total_days} days")
-        print(f"{'='*50}\n")
+        log.info("Planning trip", user_input=user_input, days=total_days)
 
         # Get itinerary from MasterAgent
         trip_agent = get_agent()
-        itinerary, matched_interests, activity_interest_map = trip_agent.generate_itinerary(
+        itinerary, matched_interests, activity_interest_map = await trip_agent.generate_itinerary_async(
             user_input=user_input,
             days=total_days
         )
 
-        # Log results
-        print(f"\nGenerated itinerary with {len(itinerary)} cities:")
+        # Per-city summary only when tracing
         for i, city in enumerate(itinerary):
-            print(f"  {i+1}. {city['destination']}, {city['country']} - {city.get('days', 1)} days (Score: {city.get('score', 0)}%)")
-            print(f"     Matched interests: {matched_interests[i]}")
-            print(f"     Activity matches: {len(activity_interest_map[i])} activities")
+            log.debug(
+                "Itinerary city", position=i + 1, city=city['destination'], country=city['country'],
+                days=city.get('days', 1), score=city.get('score', 0),
+                matched=matched_interests[i], activity_matches=len(activity_interest_map[i])
+            )
 
         return JSONResponse(
             content={
@@ -83,15 +102,91 @@ async def plan_trip(request: Request):
                 "activity_interest_map": activity_interest_map
             }
         )
-    except Exception as e:
-        print(f"\n[ERROR] Error planning trip: {e}")
-        import traceback
-        traceback.print_exc()
+    except Exception:
+        log.exception("Error planning trip")
         return JSONResponse(
             content={"error": "Error planning trip. Please try again."},
             status_code=500
         )
 
+@app.post("/plan-trip/stream")
+async def plan_trip_stream(request: Request):
+    """
+    /plan-trip as Server-Sent Events, so the page can render while the AI
+    works: "interests" once preferences are extracted, "cities" with the
+    ranked and routed itinerary, one "suggestion" per city as its daily plan
+    finishes, then "done" (or "error").
+    """
+    try:
+        data = await request.json()
+        user_input = data.get("user_input", "")
+        total_days = int(data.get("days", 3))
+    except Exception:
+        return JSONResponse(content={"error": "Invalid request."}, status_code=400)
+    
+    if total_days < 1 or total_days > 30:
+        return JSONResponse(
+            content={"error": "Please choose between 1 and 30 days."},
+            status_code=400
+        )
+    
+    trip_agent = get_agent()
+    
+    async def events():
+        try:
+            async for event, payload in trip_agent.stream_itinerary_async(user_input=user_input, days=total_days):
+                yield _sse(event, payload)
+        except Exception:
+            log.exception("Error streaming trip")
+            yield _sse("error", {"error": "Error planning trip."})
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _sse(event, payload):
+    """One Server-Sent Events frame"""
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+@app.post("/plan-trips")
+async def plan_trips(request: Request):
+    """
+    Batch planning: one JSON request per line in, one JSON result per line
+    out (NDJSON), streamed as each plan finishes. Results carry the input
+    "line" number and "id" (if given) since they arrive out of order.
+    """
+    # Spool the upload (to disk past BATCH_SPOOL_BYTES) so a large batch is never
+    # held in memory whole; plans are then read back one line at a time
+    body = tempfile.SpooledTemporaryFile(max_size=BATCH_SPOOL_BYTES)
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    try:
+        async for chunk in request.stream():
+            decoder.decode(chunk)
+            body.write(chunk)
+        decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        body.close()
+        return JSONResponse(content={"error": "Request body must be UTF-8 JSON lines."}, status_code=400)
+    except BaseException:
+        body.close()
+        raise
+    body.seek(0)
+    lines = io.TextIOWrapper(body, encoding="utf-8")
+    
+    planner = BatchPlanner(get_agent())
+    
+    async def results():
+        try:
+            async for result in planner.plan(lines):
+                yield json.dumps(result, ensure_ascii=False) + "\n"
+            log.info("Batch done", **planner.stats())
+        finally:
+            lines.close()
+    
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
 @app.get("/")
 async def root():
     """Serve the main HTML page"""
@@ -114,9 +209,20 @@ async def health():
         ]
     }
 
+@app.get("/ready")
+async def ready():
+    """Readiness probe: 200 once the agents are built, with the ranking snapshot they loaded"""
+    if agent is None:
+        return JSONResponse(content={"status": "starting"}, status_code=503)
+    return {"status": "ready", **agent.readiness(), "catalog_pool": agent.destination_agent.db.stats()}
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus metrics: stage latencies, LLM usage, cache hit ratios, in-flight requests"""
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
 if __name__ == "__main__":
     import uvicorn
-    print("\n[START] Starting AI Travel Planner...")
-    print("[URL] http://127.0.0.1:8000")
-    print("[FEATURES] AI-powered semantic matching, multi-day planning\n")
+    log.info("Starting AI Travel Planner", url="http://127.0.0.1:8000")
     uvicorn.run("main:app", host="127.0.0.1", port=8000, reload=True)
\ No newline at end of file
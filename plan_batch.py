@@ -0,0 +1,75 @@
+# plan_batch.py - Plan a JSONL file of trips from the command line
+"""
+Plans every request in a JSONL file (one {"user_input": ..., "days": ...,
+"id": optional} object per line) and writes one JSON result per line as
+each plan finishes - the same output as POST /plan-trips.
+
+    python plan_batch.py trips.jsonl -o plans.jsonl
+    cat trips.jsonl | python plan_batch.py > plans.jsonl
+
+Agent logs go to stderr so stdout stays valid JSONL.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from agents.batch_planner import BatchPlanner, BATCH_CONCURRENCY
+from agents.logs import configure_logging
+
+# Force UTF-8 output for Windows compatibility
+if sys.platform == 'win32':
+    import io
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
+
+
+async def run(lines, output, concurrency):
+    from agents.master_agent import MasterAgent
+    planner = BatchPlanner(MasterAgent(), concurrency=concurrency)
+    
+    planned = failed = 0
+    async for result in planner.plan(lines):
+        output.write(json.dumps(result, ensure_ascii=False) + "\n")
+        output.flush()
+        if "error" in result:
+            failed += 1
+        else:
+            planned += 1
+    return planned, failed, planner.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Plan a batch of trips from JSON lines")
+    parser.add_argument("input", nargs="?", default="-", help="JSONL file of requests (default: stdin)")
+    parser.add_argument("-o", "--output", default="-", help="where to write results (default: stdout)")
+    parser.add_argument("-c", "--concurrency", type=int, default=BATCH_CONCURRENCY,
+                        help=f"plans in flight at once (default: {BATCH_CONCURRENCY})")
+    args = parser.parse_args()
+    
+    # Agent logs stay out of the results
+    configure_logging(stream=sys.stderr)
+    
+    source = sys.stdin if args.input == "-" else open(args.input, "r", encoding="utf-8")
+    output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    
+    start = time.perf_counter()
+    try:
+        planned, failed, stats = asyncio.run(run(source, output, args.concurrency))
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+    
+    elapsed = time.perf_counter() - start
+    print(f"\n[BATCH] {planned} planned, {failed} failed in {elapsed:.1f}s - {stats}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
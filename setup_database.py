@@ -92,12 +92,13 @@ def get_database_stats():
         queries = {
             'Total cities': 'SELECT COUNT(*) FROM cities',
             'Total activities': 'SELECT COUNT(*) FROM activities',
-            'Ski destinations': 'SELECT COUNT(*) FROM cities WHERE keywords LIKE "%skiing%"',
-            'Beach destinations': 'SELECT COUNT(*) FROM cities WHERE keywords LIKE "%beaches%"',
-            'Food destinations': 'SELECT COUNT(*) FROM cities WHERE keywords LIKE "%food%"',
-            'Car destinations': 'SELECT COUNT(*) FROM cities WHERE keywords LIKE "%car%" OR keywords LIKE "%automotive%"',
-            'Golf destinations': 'SELECT COUNT(*) FROM cities WHERE keywords LIKE "%golf%"',
-            'Adventure destinations': 'SELECT COUNT(*) FROM cities WHERE keywords LIKE "%adventure%" OR keywords LIKE "%hiking%"',
+            # Index seeks on city_keywords instead of LIKE scans
+            'Ski destinations': "SELECT COUNT(DISTINCT city_id) FROM city_keywords WHERE keyword = 'skiing'",
+            'Beach destinations': "SELECT COUNT(DISTINCT city_id) FROM city_keywords WHERE keyword = 'beaches'",
+            'Food destinations': "SELECT COUNT(DISTINCT city_id) FROM city_keywords WHERE keyword = 'food'",
+            'Car destinations': "SELECT COUNT(DISTINCT city_id) FROM city_keywords WHERE keyword IN ('cars', 'car', 'automotive')",
+            'Golf destinations': "SELECT COUNT(DISTINCT city_id) FROM city_keywords WHERE keyword = 'golf'",
+            'Adventure destinations': "SELECT COUNT(DISTINCT city_id) FROM city_keywords WHERE keyword IN ('adventure', 'hiking')",
         }
         
         stats = {}
@@ -126,6 +127,10 @@ def main():
     print("  * Capital cities from REST Countries API")
     print("  * Auto-fix: Ensure all cities have proper activities")
     print("  * Auto-fix: Remove generic keywords for better matching")
+    print("  * Full-text (BM25) index over descriptions and activities")
+    print("  * City coordinates for shortest-route itineraries")
+    print("  * Embedding index for offline semantic city retrieval")
+    print("  * Ranking snapshot for fast worker startup")
     
     print("\n[INFO] All database files are in the 'database/' folder")
     print("[INFO] This will take about 5-10 seconds")
@@ -138,6 +143,12 @@ def main():
         (os.path.join(database_dir, 'create_database.py'), 
          "Creating base database from JSON"),
         
+        (os.path.join(database_dir, 'migrate_keywords.py'), 
+         "Creating indexed keyword tables"),
+        
+        (os.path.join(database_dir, 'build_search_index.py'), 
+         "Creating full-text search index"),
+        
         (os.path.join(database_dir, 'add_ski_destinations.py'), 
          "Adding ski & winter destinations"),
         
@@ -164,6 +175,15 @@ def main():
         
         (os.path.join(database_dir, 'fix_generic_keywords.py'), 
          "Removing generic keywords"),
+        
+        (os.path.join(database_dir, 'add_coordinates.py'), 
+         "Adding city coordinates for route planning"),
+        
+        (os.path.join(database_dir, 'build_embeddings.py'), 
+         "Building embedding index for city retrieval"),
+        
+        (os.path.join(database_dir, 'build_snapshot.py'), 
+         "Building ranking snapshot for fast startup"),
     ]
     
     total_steps = len(steps)
@@ -18,189 +18,302 @@ document.getElementById("planTripButton").addEventListener("click", async () =>
     }
 
     try {
-        const response = await fetch("/plan-trip", {
-            method: "POST",
-            headers: { "Content-Type": "application/json" },
-            body: JSON.stringify({ user_input: userInput, days: totalDays })
-        });
-
-        if (!response.ok) {
-            throw new Error(`Server error: ${response.status}`);
+        // Stream the plan when the browser can read response bodies, so cities
+        // show up before the AI has written every daily plan
+        if (window.ReadableStream && window.TextDecoder) {
+            await planTripStreaming(resultsDiv, userInput, totalDays);
+        } else {
+            await planTripOnce(resultsDiv, userInput, totalDays);
         }
+    } catch (error) {
+        resultsDiv.innerHTML = `<p class='error'>❌ Error planning trip: ${error.message}. Please try again.</p>`;
+        console.error("Error:", error);
+    }
+});
 
-        const data = await response.json();
-        
+// Whole plan in one response
+async function planTripOnce(resultsDiv, userInput, totalDays) {
+    const response = await fetch("/plan-trip", {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ user_input: userInput, days: totalDays })
+    });
+
+    if (!response.ok) {
+        throw new Error(`Server error: ${response.status}`);
+    }
+
+    const data = await response.json();
+    
+    if (data.error) {
+        resultsDiv.innerHTML = `<p class='error'>⚠️ ${data.error}</p>`;
+        return;
+    }
+
+    renderTrip(resultsDiv, data, userInput, totalDays);
+}
+
+// Plan as Server-Sent Events: interests, then cities, then each city's suggestion
+async function planTripStreaming(resultsDiv, userInput, totalDays) {
+    const response = await fetch("/plan-trip/stream", {
+        method: "POST",
+        headers: { "Content-Type": "application/json", "Accept": "text/event-stream" },
+        body: JSON.stringify({ user_input: userInput, days: totalDays })
+    });
+
+    if (!response.ok) {
+        const data = await response.json().catch(() => ({}));
         if (data.error) {
             resultsDiv.innerHTML = `<p class='error'>⚠️ ${data.error}</p>`;
             return;
         }
+        throw new Error(`Server error: ${response.status}`);
+    }
 
-        const itinerary = data.itinerary || [];
-        const matched_interests = data.matched_interests || [];
-        const activity_interest_map = data.activity_interest_map || [];
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
 
-        resultsDiv.innerHTML = "";
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
 
-        if (itinerary.length === 0) {
-            resultsDiv.innerHTML = "<p class='error'>😕 No destinations found. Try different interests like 'beaches', 'food', 'hiking', or 'culture'.</p>";
-            return;
+        // Frames end with a blank line
+        let boundary;
+        while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+            const frame = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            const { event, data } = parseEvent(frame);
+            if (event === "error") {
+                resultsDiv.innerHTML = `<p class='error'>⚠️ ${data.error}</p>`;
+                return;
+            }
+            handleTripEvent(resultsDiv, event, data, userInput, totalDays);
         }
+    }
+}
 
-        // Calculate total cities and region changes
-        const numCities = itinerary.length;
-        let currentRegion = null;
-        let regionChanges = 0;
-        
-        itinerary.forEach((city, idx) => {
-            const region = city.region || 'Other';
-            if (idx > 0 && region !== currentRegion && currentRegion !== null) {
-                regionChanges++;
-            }
-            currentRegion = region;
-        });
+function parseEvent(frame) {
+    let event = "message";
+    const dataLines = [];
+    frame.split("\n").forEach(line => {
+        if (line.startsWith("event:")) event = line.slice(6).trim();
+        else if (line.startsWith("data:")) dataLines.push(line.slice(5).trim());
+    });
+    return { event, data: dataLines.length ? JSON.parse(dataLines.join("\n")) : {} };
+}
+
+function handleTripEvent(resultsDiv, event, data, userInput, totalDays) {
+    if (event === "interests") {
+        const interests = data.interests || [];
+        resultsDiv.innerHTML = interests.length > 0
+            ? `<p class='loading'>🌍 Finding destinations for ${interests.slice(0, 6).join(", ")}...</p>`
+            : "<p class='loading'>🌍 Picking popular destinations...</p>";
+    } else if (event === "cities") {
+        renderTrip(resultsDiv, data, userInput, totalDays);
+    } else if (event === "suggestion") {
+        fillSuggestion(data.index, data.itinerary_suggestion);
+    }
+}
+
+function renderTrip(resultsDiv, data, userInput, totalDays) {
+    const itinerary = data.itinerary || [];
+    const matched_interests = data.matched_interests || [];
+    const activity_interest_map = data.activity_interest_map || [];
+
+    resultsDiv.innerHTML = "";
+
+    if (itinerary.length === 0) {
+        resultsDiv.innerHTML = "<p class='error'>😕 No destinations found. Try different interests like 'beaches', 'food', 'hiking', or 'culture'.</p>";
+        return;
+    }
+
+    resultsDiv.innerHTML += summaryHTML(itinerary, userInput, totalDays);
+
+    // Display timeline with region headers
+    let currentDay = 1;
+    let lastRegion = null;
+    
+    itinerary.forEach((city, idx) => {
+        const cityDays = city.days || 1;
+        const startDay = currentDay;
+        const endDay = currentDay + cityDays - 1;
+        currentDay = endDay + 1;
+
+        // Check if we're entering a new region
+        const currentRegion = city.region || 'Other';
+        let regionHeaderHTML = '';
         
-        // Add a summary header
-        const summaryHTML = `
-            <div class="trip-summary">
-                <h2>Your ${totalDays}-Day Adventure</h2>
-                <p>Visiting <strong>${numCities} amazing ${numCities === 1 ? 'destination' : 'destinations'}</strong> based on your interests: <strong>${userInput}</strong></p>
-                ${regionChanges > 0 ? `<p class="route-info">✈️ Optimized route with ${regionChanges} ${regionChanges === 1 ? 'region change' : 'region changes'} to minimize travel</p>` : ''}
-                <div class="trip-stats">
-                    <div class="stat">
-                        <div class="stat-value">${totalDays}</div>
-                        <div class="stat-label">Days</div>
-                    </div>
-                    <div class="stat">
-                        <div class="stat-value">${numCities}</div>
-                        <div class="stat-label">${numCities === 1 ? 'City' : 'Cities'}</div>
-                    </div>
-                    <div class="stat">
-                        <div class="stat-value">${itinerary.reduce((sum, city) => sum + (city.activities?.length || 0), 0)}</div>
-                        <div class="stat-label">Activities</div>
-                    </div>
+        if (currentRegion !== lastRegion && currentRegion !== 'Other') {
+            regionHeaderHTML = `
+                <div class="region-header">
+                    <div class="region-icon">🌍</div>
+                    <div class="region-name">${currentRegion}</div>
+                </div>
+            `;
+            lastRegion = currentRegion;
+        }
+
+        resultsDiv.innerHTML += regionHeaderHTML + cityCardHTML(
+            city, idx, startDay, endDay, matched_interests[idx] || [], activity_interest_map[idx] || {}
+        );
+    });
+
+    resultsDiv.innerHTML += tipsHTML(totalDays);
+}
+
+function summaryHTML(itinerary, userInput, totalDays) {
+    // Calculate total cities and region changes
+    const numCities = itinerary.length;
+    let currentRegion = null;
+    let regionChanges = 0;
+    
+    itinerary.forEach((city, idx) => {
+        const region = city.region || 'Other';
+        if (idx > 0 && region !== currentRegion && currentRegion !== null) {
+            regionChanges++;
+        }
+        currentRegion = region;
+    });
+    
+    return `
+        <div class="trip-summary">
+            <h2>Your ${totalDays}-Day Adventure</h2>
+            <p>Visiting <strong>${numCities} amazing ${numCities === 1 ? 'destination' : 'destinations'}</strong> based on your interests: <strong>${userInput}</strong></p>
+            ${regionChanges > 0 ? `<p class="route-info">✈️ Optimized route with ${regionChanges} ${regionChanges === 1 ? 'region change' : 'region changes'} to minimize travel</p>` : ''}
+            <div class="trip-stats">
+                <div class="stat">
+                    <div class="stat-value">${totalDays}</div>
+                    <div class="stat-label">Days</div>
+                </div>
+                <div class="stat">
+                    <div class="stat-value">${numCities}</div>
+                    <div class="stat-label">${numCities === 1 ? 'City' : 'Cities'}</div>
+                </div>
+                <div class="stat">
+                    <div class="stat-value">${itinerary.reduce((sum, city) => sum + (city.activities?.length || 0), 0)}</div>
+                    <div class="stat-label">Activities</div>
                 </div>
             </div>
-        `;
-        resultsDiv.innerHTML += summaryHTML;
+        </div>
+    `;
+}
 
-        // Display timeline with region headers
-        let currentDay = 1;
-        let lastRegion = null;
-        
-        itinerary.forEach((city, idx) => {
-            const cityDays = city.days || 1;
-            const startDay = currentDay;
-            const endDay = currentDay + cityDays - 1;
-            currentDay = endDay + 1;
+function cityCardHTML(city, idx, startDay, endDay, cityMatchedInterests, activityMap) {
+    const cityDays = city.days || 1;
+    const matchPercentage = city.score || 0;
+    const matchColor = getMatchColor(matchPercentage);
+    
+    // Create activity list with AI-matched interests
+    const activitiesHTML = city.activities.map(activity => {
+        const matchedForActivity = activityMap[activity] || [];
+        if (matchedForActivity.length > 0) {
+            const badges = matchedForActivity.map(interest => 
+                `<span class="activity-badge">${interest}</span>`
+            ).join(" ");
+            return `<li class="matched-activity">
+                ${activity} 
+                <div class="activity-matches">${badges}</div>
+            </li>`;
+        }
+        return `<li>${activity}</li>`;
+    }).join("");
 
-            const matchPercentage = city.score || 0;
-            const cityMatchedInterests = matched_interests[idx] || [];
-            const activityMap = activity_interest_map[idx] || {};
+    const interestBadges = cityMatchedInterests.length > 0 
+        ? cityMatchedInterests.map(i => `<span class="badge">${i}</span>`).join(" ")
+        : '<span class="badge no-match">Popular destination</span>';
 
-            const matchColor = getMatchColor(matchPercentage);
+    // Format day range
+    const dayRange = cityDays === 1 
+        ? `Day ${startDay}` 
+        : `Days ${startDay}-${endDay}`;
+    
+    const dayInfo = cityDays === 1 
+        ? '1 day' 
+        : `${cityDays} days`;
+
+    // Multi-day cities get a suggestion box; while streaming it waits for the AI
+    let suggestionHTML = '';
+    if (cityDays > 1 && city.itinerary_suggestion) {
+        suggestionHTML = `
+            <div class="itinerary-suggestion" id="suggestion-${idx}">
+                <strong>Suggested Itinerary:</strong>
+                <p>${formatSuggestion(city.itinerary_suggestion)}</p>
+            </div>
+        `;
+    } else if (cityDays > 1) {
+        suggestionHTML = `
+            <div class="itinerary-suggestion pending" id="suggestion-${idx}">
+                <strong>Suggested Itinerary:</strong>
+                <p>✍️ Writing your day-by-day plan...</p>
+            </div>
+        `;
+    }
+
+    return `
+        <div class="day-card">
+            <div class="day-header">
+                <div class="day-info-group">
+                    <div class="day-number">${dayRange}</div>
+                    <div class="duration-badge">${dayInfo}</div>
+                </div>
+                <div class="match-score" style="background-color: ${matchColor}">
+                    ${matchPercentage}% match
+                </div>
+            </div>
             
-            // Check if we're entering a new region
-            const currentRegion = city.region || 'Other';
-            let regionHeaderHTML = '';
+            <h3 class="destination-name">
+                ${city.destination}, ${city.country}
+            </h3>
             
-            if (currentRegion !== lastRegion && currentRegion !== 'Other') {
-                regionHeaderHTML = `
-                    <div class="region-header">
-                        <div class="region-icon">🌍</div>
-                        <div class="region-name">${currentRegion}</div>
-                    </div>
-                `;
-                lastRegion = currentRegion;
-            }
+            <p class="description">${city.description}</p>
             
-            // Create activity list with AI-matched interests
-            const activitiesHTML = city.activities.map(activity => {
-                const matchedForActivity = activityMap[activity] || [];
-                if (matchedForActivity.length > 0) {
-                    const badges = matchedForActivity.map(interest => 
-                        `<span class="activity-badge">${interest}</span>`
-                    ).join(" ");
-                    return `<li class="matched-activity">
-                        ${activity} 
-                        <div class="activity-matches">${badges}</div>
-                    </li>`;
-                }
-                return `<li>${activity}</li>`;
-            }).join("");
-
-            const interestBadges = cityMatchedInterests.length > 0 
-                ? cityMatchedInterests.map(i => `<span class="badge">${i}</span>`).join(" ")
-                : '<span class="badge no-match">Popular destination</span>';
-
-            // Format day range
-            const dayRange = cityDays === 1 
-                ? `Day ${startDay}` 
-                : `Days ${startDay}-${endDay}`;
+            <div class="interests-section">
+                <strong>Why this destination:</strong>
+                <div class="interest-badges">${interestBadges}</div>
+            </div>
             
-            const dayInfo = cityDays === 1 
-                ? '1 day' 
-                : `${cityDays} days`;
-
-            const cityHTML = `
-                ${regionHeaderHTML}
-                <div class="day-card">
-                    <div class="day-header">
-                        <div class="day-info-group">
-                            <div class="day-number">${dayRange}</div>
-                            <div class="duration-badge">${dayInfo}</div>
-                        </div>
-                        <div class="match-score" style="background-color: ${matchColor}">
-                            ${matchPercentage}% match
-                        </div>
-                    </div>
-                    
-                    <h3 class="destination-name">
-                        ${city.destination}, ${city.country}
-                    </h3>
-                    
-                    <p class="description">${city.description}</p>
-                    
-                    <div class="interests-section">
-                        <strong>Why this destination:</strong>
-                        <div class="interest-badges">${interestBadges}</div>
-                    </div>
-                    
-                    <div class="activities-section">
-                        <strong>Things to do (${city.activities.length} activities):</strong>
-                        <ul class="activities-list">${activitiesHTML}</ul>
-                    </div>
-                    
-                    ${cityDays > 1 && city.itinerary_suggestion ? `
-                        <div class="itinerary-suggestion">
-                            <strong>Suggested Itinerary:</strong>
-                            <p>${city.itinerary_suggestion.replace(/\*/g, '').trim()}</p>
-                        </div>
-                    ` : ''}
-                </div>
-            `;
-            resultsDiv.innerHTML += cityHTML;
-        });
-
-        // Add travel tips
-        const tipsHTML = `
-            <div class="trip-tips">
-                <h3>💡 Travel Tips</h3>
-                <ul>
-                    <li><strong>Day Distribution:</strong> ${totalDays <= 3 ? 'Short trips focus on one destination per day for deeper exploration' : totalDays <= 7 ? 'We recommend 2-3 days per city to really experience each destination' : totalDays <= 14 ? 'Spending 3-4 days per city gives you time to explore like a local' : 'Longer stays (4-5 days) let you discover hidden gems and enjoy a relaxed pace'}</li>
-                    <li><strong>Highlighted Activities:</strong> Activities with badges specifically match your interests based on AI analysis</li>
-                    <li><strong>Geographic Routing:</strong> Cities are grouped by region to minimize long-haul flights and maximize your time exploring</li>
-                    <li><strong>Book in Advance:</strong> Reserve accommodations and popular attractions early, especially during peak seasons</li>
-                    <li><strong>Local Transportation:</strong> Research transit options between cities and within each destination</li>
-                </ul>
+            <div class="activities-section">
+                <strong>Things to do (${city.activities.length} activities):</strong>
+                <ul class="activities-list">${activitiesHTML}</ul>
             </div>
-        `;
-        resultsDiv.innerHTML += tipsHTML;
+            
+            ${suggestionHTML}
+        </div>
+    `;
+}
 
-    } catch (error) {
-        resultsDiv.innerHTML = `<p class='error'>❌ Error planning trip: ${error.message}. Please try again.</p>`;
-        console.error("Error:", error);
+// Fill in a streamed suggestion (or drop the placeholder if there isn't one)
+function fillSuggestion(idx, suggestion) {
+    const box = document.getElementById(`suggestion-${idx}`);
+    if (!box) return;
+    if (!suggestion) {
+        box.remove();
+        return;
     }
-});
+    box.classList.remove("pending");
+    box.querySelector("p").innerHTML = formatSuggestion(suggestion);
+}
+
+function formatSuggestion(suggestion) {
+    return suggestion.replace(/\*/g, '').trim();
+}
+
+function tipsHTML(totalDays) {
+    return `
+        <div class="trip-tips">
+            <h3>💡 Travel Tips</h3>
+            <ul>
+                <li><strong>Day Distribution:</strong> ${totalDays <= 3 ? 'Short trips focus on one destination per day for deeper exploration' : totalDays <= 7 ? 'We recommend 2-3 days per city to really experience each destination' : totalDays <= 14 ? 'Spending 3-4 days per city gives you time to explore like a local' : 'Longer stays (4-5 days) let you discover hidden gems and enjoy a relaxed pace'}</li>
+                <li><strong>Highlighted Activities:</strong> Activities with badges specifically match your interests based on AI analysis</li>
+                <li><strong>Geographic Routing:</strong> Cities are grouped by region to minimize long-haul flights and maximize your time exploring</li>
+                <li><strong>Book in Advance:</strong> Reserve accommodations and popular attractions early, especially during peak seasons</li>
+                <li><strong>Local Transportation:</strong> Research transit options between cities and within each destination</li>
+            </ul>
+        </div>
+    `;
+}
 
 // Helper function to get color based on match percentage
 function getMatchColor(percentage) {
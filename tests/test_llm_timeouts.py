@@ -0,0 +1,59 @@
+# test_llm_timeouts.py - AI CALLS THAT RUN PAST THEIR TIMEOUT FALL BACK CLEANLY
+import logging
+from types import SimpleNamespace
+
+import httpx
+import openai
+
+from agents import llm_client
+from agents.destination_agent import DestinationAgent
+from agents.itinerary_agent import ItineraryAgent
+
+
+class SDKTimeoutClient:
+    """Chat client whose every call fails the way the OpenAI SDK does on a timeout"""
+
+    def __init__(self):
+        self.calls = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model, messages, **kwargs):
+        self.calls.append(kwargs)
+        raise openai.APITimeoutError(request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions"))
+
+
+def test_sdk_clients_skip_retries_when_asked(monkeypatch):
+    monkeypatch.setattr(llm_client, "LLM_BACKEND", "openai")
+    monkeypatch.setattr(llm_client, "OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(llm_client, "get_llm_cache", lambda: None)
+
+    assert llm_client.create_client("test", max_retries=0).client.max_retries == 0
+    assert llm_client.create_async_client("test", max_retries=0).client.max_retries == 0
+    assert llm_client.create_client("test").client.max_retries == openai.DEFAULT_MAX_RETRIES
+
+
+def test_ai_scoring_sdk_timeout_uses_default_scores(caplog):
+    client = SDKTimeoutClient()
+    agent = DestinationAgent(client=client)
+    summaries = [f"City {i}, Country: somewhere" for i in range(20)]
+
+    with caplog.at_level(logging.WARNING, logger="voyage.destination_agent"):
+        scores = agent._ai_score_cities_detailed(summaries, ["museums"])
+
+    assert scores == [40] * 20
+    assert [call["timeout"] for call in client.calls] == [agent.ai_timeout] * 2
+    assert sum("missed its deadline" in r.getMessage() for r in caplog.records) == 2
+
+
+def test_suggestion_sdk_timeout_uses_generic_plan(caplog):
+    client = SDKTimeoutClient()
+    agent = ItineraryAgent()
+    agent.client = client
+    cities = [{"destination": f"City {i}", "country": "Somewhere", "matched": [], "activities": []} for i in range(3)]
+
+    with caplog.at_level(logging.WARNING, logger="voyage.itinerary_agent"):
+        suggestions = agent._generate_suggestions(cities, [3, 3, 3], ["food"])
+
+    assert suggestions == [agent._generate_generic(city["destination"], 3) for city in cities]
+    assert [call["timeout"] for call in client.calls] == [agent.suggestion_timeout] * 3
+    assert sum("AI timed out" in r.getMessage() for r in caplog.records) == 3